@@ -3,6 +3,10 @@ ASGI config for edalauncher_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve this (e.g. ``uvicorn edalauncher_project.asgi:application``) rather
+than WSGI when live log streaming (/run/<id>/stream/) is used: the stream
+view is async, so open EventSource connections don't pin a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -127,3 +127,99 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+
+# Background tool-run workers (python manage.py run_workers)
+EDA_WORKER_COUNT = 2
+EDA_WORKER_POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+EDA_WORKER_MAX_ATTEMPTS = 3  # claims before a run whose worker keeps dying is failed
+
+# Live log streaming (/run/<id>/stream/, served best by the ASGI app)
+EDA_LOG_STREAM_INTERVAL = 0.5  # seconds between log tail polls
+EDA_LOG_STREAM_BATCH_BYTES = 64 * 1024
+
+# ToolRun stdout/stderr storage (<run_dir>/logs/*.log.gz)
+EDA_LOG_SEGMENT_BYTES = 8 * 1024 * 1024  # uncompressed bytes per gzip segment
+EDA_LOG_EXCERPT_CHARS = 4000  # head / tail kept on the ToolRun row
+
+# Log snippets on slides (sidecar <log>.lidx line index)
+EDA_LOG_INDEX_STRIDE = 1000  # lines between index checkpoints
+EDA_LOG_SNIPPET_LINES = 200  # default / max lines per snippet window
+
+# KLayout batch extraction
+EDA_KLAYOUT_EXTRACT_SCRIPT = BASE_DIR / "scripts" / "klayout_extract.py"
+EDA_KLAYOUT_RENDER_SIZE = 1024  # preview.png is N x N pixels (exports; zooming uses tiles)
+EDA_KLAYOUT_CACHE_BYTES = 5 * 1024 ** 3  # extraction cache disk budget (LRU)
+
+# Persistent KLayout workers (scripts/klayout_server.py), one per job worker
+EDA_KLAYOUT_PERSISTENT = True  # False → one-shot `klayout -b -r` per run
+EDA_KLAYOUT_SERVER_SCRIPT = BASE_DIR / "scripts" / "klayout_server.py"
+EDA_KLAYOUT_STARTUP_TIMEOUT = 60  # seconds
+EDA_KLAYOUT_PING_TIMEOUT = 10
+EDA_KLAYOUT_JOB_TIMEOUT = 1800
+EDA_KLAYOUT_MAX_JOBS_PER_WORKER = 200  # recycle after N extractions
+
+# Deep-zoom layout preview tiles (rendered by tile workers on first view, cached per GDS)
+EDA_KLAYOUT_TILE_SIZE = 256  # px
+EDA_KLAYOUT_TILE_MAX_ZOOM = 10  # level z = 2^z x 2^z tiles
+EDA_KLAYOUT_TILE_TIMEOUT = 60  # seconds per tile
+EDA_KLAYOUT_TILE_VIEWS = 4  # layouts each tile worker keeps loaded for panning
+EDA_TILE_WORKER_COUNT = 1  # run_workers processes that only render tiles
+EDA_TILE_POLL_INTERVAL = 0.2  # seconds between tile queue polls when idle
+
+# Parallel preview rendering: split the layout into a grid of regions
+# rendered by separate KLayouts, then composite (Pillow). Helpers are
+# granted from EDA_BUILD_CPU_TOKENS and stopped after the render.
+# Tool.render_parallelism overrides the default per tool.
+EDA_KLAYOUT_RENDER_PARALLELISM = 1  # 1 → single render
+EDA_KLAYOUT_PARALLEL_MIN_BYTES = 50 * 1024 * 1024  # smaller GDS → single render
+
+# Verilator build + simulate (obj_dir cache, see launcher/verilator_build.py)
+EDA_VERILATOR_FLAGS = "-Wall --Wno-EOFNEWLINE --trace --output-split 20000"
+EDA_VERILATOR_BUILD_TIMEOUT = 1800  # seconds
+EDA_VERILATOR_SIM_TIMEOUT = 600
+EDA_VERILATOR_CACHE_BYTES = 10 * 1024 ** 3
+EDA_VERILATOR_WAVE_FORMAT = "vcd.gz"  # per-run default: vcd / vcd.gz / fst
+
+# CPU tokens shared by all concurrent compiles (launcher/build_tokens.py)
+EDA_BUILD_CPU_TOKENS = None  # None → os.cpu_count()
+
+# Indexed waveforms (<run_dir>/wave.vcd.idx/, see launcher/waveform.py)
+EDA_WAVEFORM_FLUSH_BYTES = 64 * 1024 * 1024  # parser buffer before writing to the index
+EDA_WAVEFORM_MAX_WIDTH = 4000  # max pixel columns (min/max buckets) per query
+EDA_WAVEFORM_MAX_SIGNALS = 64  # signals per window query
+EDA_FST2VCD = "fst2vcd"  # GTKWave converter, streamed into the indexer for FST runs
+
+# Regression batches (/tool/<slug>/batch/): one parent run, one child per source x seed
+EDA_BATCH_MAX_RUNS = 2000
+
+# License wait queue (launcher/licenses.py): fair share over recent seat usage
+EDA_LICENSE_FAIR_SHARE_BY = "user"  # "user" or "group" (first auth group)
+EDA_LICENSE_FAIR_SHARE_WINDOW = 7 * 24 * 3600  # seconds of usage history
+EDA_LICENSE_AGING = 1.0  # seat-seconds of priority gained per second waited
+EDA_LICENSE_ETA_SAMPLES = 50  # recent runs averaged for the wait estimate
+EDA_LICENSE_LEASE_SECONDS = 120  # allocation lease, renewed by the holder's heartbeat
+EDA_LICENSE_HEARTBEAT_INTERVAL = 30
+EDA_LICENSE_REAP_INTERVAL = 30  # run_workers supervisor reclaims expired leases this often
+
+# License dashboard (/api/licenses/)
+EDA_LICENSE_UTILIZATION_CACHE_SECONDS = 60  # per-tool timeseries cache
+EDA_LICENSE_UTILIZATION_MAX_BUCKETS = 2000
+
+# /uploads/ responses (launcher/fileserve.py)
+EDA_UPLOAD_IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # content-addressed blobs / cache entries (views.IMMUTABLE_UPLOAD_PATH)
+EDA_UPLOAD_MAX_RANGES = 32  # more ranges than this → whole file
+# "sendfile" (Django FileResponse; os.sendfile under gunicorn's file_wrapper),
+# "x-accel" (nginx), "x-sendfile" (Apache/lighttpd), or a dotted path.
+# x-accel needs an internal location, e.g.
+#   location /protected-uploads/ { internal; alias <MEDIA_ROOT>/; }
+EDA_FILE_DELIVERY = "sendfile"
+EDA_X_ACCEL_PREFIX = "/protected-uploads/"
+
+# Precompressed .br / .gz siblings of text run outputs (launcher/precompress.py)
+EDA_PRECOMPRESS_MIN_BYTES = 1024
+EDA_PRECOMPRESS_MAX_BYTES = 8 * 1024 ** 3
+EDA_PRECOMPRESS_MAX_EFFORT_BYTES = 16 * 1024 ** 2  # above this: streaming brotli 5 / gzip -9
+EDA_PRECOMPRESS_BROTLI_QUALITY = 11
+
+# Image renditions for slides / exports (launcher/renditions.py)
+EDA_RENDITION_JPEG_QUALITY = 85
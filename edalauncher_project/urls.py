@@ -29,15 +29,12 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+
+    # MEDIA_URL is served by launcher.views.serve_upload (launcher/urls.py)
+    # in every mode, so uploads go through its checks and delivery backend
     path("", include("launcher.urls")),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
-
 """
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -0,0 +1,119 @@
+"""
+Content-addressed store for uploaded design files.
+
+Uploads are hashed (SHA-256) while their chunks are written, then kept
+once under MEDIA_ROOT/blobs/<aa>/<bb>/<sha256>. Run directories get a
+reflink or hardlink to the blob instead of a copy. Blob files are made
+read-only so a hardlinked run file can't silently rewrite the blob.
+
+Every upload and link refreshes last_used_at. References aren't
+counted: run directories are deleted outside the app, so `manage.py
+gc_blobs` counts the runs whose directory still exists, and only
+collects blobs with none that weren't used within its grace window.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import UploadBlob
+
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def blob_root():
+    return Path(settings.MEDIA_ROOT) / "blobs"
+
+
+def blob_path(sha256):
+    return blob_root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def store_upload(upload):
+    """
+    Write an UploadedFile into the store, hashing chunk by chunk.
+    Returns the UploadBlob (existing one if the content was seen before).
+    """
+    tmp_dir = blob_root() / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / uuid.uuid4().hex
+
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in upload.chunks():
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        final = blob_path(sha256)
+
+        if final.exists():
+            tmp_path.unlink()
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, final)
+
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    blob, created = UploadBlob.objects.get_or_create(
+        sha256=sha256,
+        defaults={
+            "size": size,
+            "file_path": str(final.relative_to(settings.MEDIA_ROOT)),
+            "original_name": upload.name,
+        },
+    )
+    if not created:
+        # Dedupe hit: keeps gc_blobs from collecting it in the grace window
+        blob.last_used_at = timezone.now()
+        UploadBlob.objects.filter(pk=blob.pk).update(last_used_at=blob.last_used_at)
+
+    return blob
+
+
+def link_file(src, dest):
+    """
+    Reflink (copy-on-write) when the filesystem supports it, otherwise
+    hardlink, otherwise fall back to a plain copy.
+    """
+    src, dest = str(src), str(dest)
+
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        if os.path.exists(dest):
+            os.unlink(dest)
+
+    try:
+        os.link(src, dest)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(src, dest)
+        return "copy"
+
+
+def link_blob(blob, dest):
+    """
+    Materialise a blob at `dest` (inside a run directory).
+    """
+    link_file(blob.absolute_path(), dest)
+
+    UploadBlob.objects.filter(pk=blob.pk).update(last_used_at=timezone.now())
+    return dest
@@ -0,0 +1,114 @@
+"""
+Global CPU token budget for compiles.
+
+EDA_BUILD_CPU_TOKENS tokens (default: all cores) are shared by every
+worker process. A build waits in FIFO order and is then granted its
+fair slice, budget / (builds holding or waiting for tokens), capped
+by what is free. A lone build therefore gets every core, and a busy
+box splits them. The grant becomes the build's `make -j`.
+
+Tokens are taken with a conditional UPDATE on one BuildTokenPool row,
+and each run remembers its share in ToolRun.build_tokens, so the
+tokens of crashed workers are returned when their runs are requeued.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BuildTokenPool, ToolRun
+
+
+POOL = "cpu"
+
+
+def budget():
+    return settings.EDA_BUILD_CPU_TOKENS or os.cpu_count() or 1
+
+
+def _pool():
+    pool, _ = BuildTokenPool.objects.get_or_create(name=POOL)
+    return pool
+
+
+def fair_share(run):
+    waiting = ToolRun.objects.filter(build_waiting_since__isnull=False)
+
+    # FIFO: only the longest waiting build may take tokens
+    first = waiting.order_by("build_waiting_since", "id").values_list("id", flat=True).first()
+    if first is not None and first != run.id:
+        return 0
+
+    holders = ToolRun.objects.filter(build_tokens__gt=0).count()
+    share = max(1, budget() // max(1, holders + waiting.count()))
+
+    free = budget() - _pool().in_use
+    return min(share, free)
+
+
+def acquire(run, poll_interval=0.5, limit=None):
+    """
+    Block until tokens are granted (at most `limit`); returns how many.
+    """
+    started = time.monotonic()
+    ToolRun.objects.filter(pk=run.pk).update(build_waiting_since=timezone.now())
+    run.build_waiting_since = timezone.now()
+
+    try:
+        while True:
+            want = fair_share(run)
+            if limit:
+                want = min(want, limit)
+
+            if want > 0:
+                granted = BuildTokenPool.objects.filter(
+                    name=POOL,
+                    in_use__lte=budget() - want,
+                ).update(in_use=F("in_use") + want)
+
+                if granted:
+                    break
+
+            time.sleep(poll_interval)
+    finally:
+        run.build_waiting_since = None
+        run.build_wait_seconds = round(time.monotonic() - started, 3)
+        ToolRun.objects.filter(pk=run.pk).update(
+            build_waiting_since=None,
+            build_wait_seconds=run.build_wait_seconds,
+        )
+
+    run.build_tokens = want
+    ToolRun.objects.filter(pk=run.pk).update(build_tokens=want)
+    return want
+
+
+def release(run):
+    tokens = ToolRun.objects.filter(pk=run.pk).values_list("build_tokens", flat=True).first()
+
+    if tokens:
+        BuildTokenPool.objects.filter(name=POOL).update(in_use=F("in_use") - tokens)
+        ToolRun.objects.filter(pk=run.pk).update(build_tokens=0)
+
+    run.build_tokens = 0
+
+
+@contextmanager
+def cpu_tokens(run, limit=None):
+    tokens = acquire(run, limit=limit)
+    try:
+        yield tokens
+    finally:
+        release(run)
+
+
+def release_orphaned(runs):
+    """
+    Give back tokens held by runs whose worker died.
+    """
+    for run in runs.filter(build_tokens__gt=0):
+        release(run)
+    runs.filter(build_waiting_since__isnull=False).update(build_waiting_since=None)
@@ -0,0 +1,349 @@
+"""
+Background PDF / PPTX export of presentations, cached per revision.
+
+A revision is the SHA-256 of everything an export is rendered from:
+title, run / tool, template and theme, slides and items (with their
+config), and the mtime + size of every artifact they show. Exporting
+(request_export, on POST) looks up the PresentationExport for the
+current revision; an unchanged deck is served from the file rendered
+last time, anything else queues a job. Reads (current_export) never
+queue anything.
+
+Jobs go through the same DB queue pattern as ToolRuns: `run_workers`
+processes pick them up between runs (claim_next_export, one conditional
+UPDATE) and write MEDIA_ROOT/exports/<presentation>/<revision>.<ext>.
+Once the current revision is ready, the files of older ones are
+removed; their rows stay as "superseded" and point to the new export,
+so clients still polling an old id are sent on instead of getting 404.
+
+Images are embedded as renditions (renditions.py): "print" in the PDF,
+"slide" in the PPTX, never the full-size preview.
+"""
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import renditions
+from .models import PresentationExport, SlideItem
+
+
+# Bump when the renderers change so cached files are rebuilt
+EXPORT_VERSION = "2"
+
+FORMATS = {
+    "pdf": "application/pdf",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def revision(presentation):
+    """
+    SHA-256 of the presentation's export inputs (two queries).
+    """
+    run = presentation.run
+    state = {
+        "version": EXPORT_VERSION,
+        "title": presentation.title,
+        "description": presentation.description,
+        "run": [run.id, run.tool.name] if run else None,
+        "template": [presentation.template.key, presentation.template.base_template] if presentation.template else None,
+        "theme": [presentation.theme.key, presentation.theme.css_file] if presentation.theme else None,
+        "slides": [
+            [str(slide_id), title, order]
+            for slide_id, title, order in presentation.slides.values_list("id", "title", "order")
+        ],
+        "items": [
+            [
+                str(item.id),
+                str(item.slide_id),
+                item.item_type,
+                item.config,
+                item.artifact.file_path,
+                _file_state(Path(settings.MEDIA_ROOT) / item.artifact.file_path),
+            ]
+            for item in (
+                SlideItem.objects
+                .filter(slide__presentation=presentation)
+                .select_related("artifact")
+                .order_by("slide__order", "id")
+            )
+        ],
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def export_path(export):
+    return Path(settings.MEDIA_ROOT) / export.file_path
+
+
+def current_export(presentation, fmt):
+    """
+    The PresentationExport of the current revision, or None. Read-only:
+    nothing is created or queued.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    return PresentationExport.objects.filter(
+        presentation=presentation,
+        format=fmt,
+        revision=revision(presentation),
+    ).first()
+
+
+def request_export(presentation, fmt):
+    """
+    The PresentationExport of the current revision, queued if it
+    isn't rendered yet (or failed, or its file went missing).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    export, created = PresentationExport.objects.get_or_create(
+        presentation=presentation,
+        format=fmt,
+        revision=revision(presentation),
+    )
+    if created:
+        return export
+
+    # A superseded revision comes back when the deck is edited back to it
+    stale = export.status in ("failed", "superseded") or (export.status == "ready" and not export_path(export).exists())
+    if stale:
+        requeued = PresentationExport.objects.filter(id=export.id, status=export.status).update(
+            status="queued",
+            worker_id="",
+            error="",
+            superseded_by=None,
+            started_at=None,
+            completed_at=None,
+        )
+        if requeued:
+            export.status = "queued"
+
+    return export
+
+
+def claim_next_export(worker_id):
+    """
+    Atomically move the oldest queued export to "running".
+    """
+    for export_id in PresentationExport.objects.filter(status="queued").order_by("created_at").values_list("id", flat=True)[:10]:
+        claimed = PresentationExport.objects.filter(id=export_id, status="queued").update(
+            status="running",
+            worker_id=worker_id,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return PresentationExport.objects.select_related("presentation").get(id=export_id)
+
+    return None
+
+
+def requeue_orphaned_exports(*, worker_id=None, host=None):
+    qs = PresentationExport.objects.filter(status="running")
+
+    if worker_id:
+        qs = qs.filter(worker_id=worker_id)
+    else:
+        qs = qs.filter(worker_id__startswith=f"{host}:")
+
+    return qs.update(status="queued", worker_id="", started_at=None)
+
+
+def run_export(export):
+    """
+    Render one claimed export to its file.
+    """
+    rel = f"exports/{export.presentation_id}/{export.revision}.{export.format}"
+    path = Path(settings.MEDIA_ROOT) / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        RENDERERS[export.format](export.presentation, tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        export.status = "failed"
+        export.error = str(e)
+        export.completed_at = timezone.now()
+        export.save(update_fields=["status", "error", "completed_at"])
+        return export
+
+    export.status = "ready"
+    export.file_path = rel
+    export.size = path.stat().st_size
+    export.completed_at = timezone.now()
+    export.save(update_fields=["status", "file_path", "size", "completed_at"])
+
+    # A late job for a revision that was edited away supersedes nothing
+    if export.revision == revision(export.presentation):
+        supersede_older(export)
+
+    return export
+
+
+def supersede_older(export):
+    """
+    Drop the files of the deck's other finished exports and point
+    their rows at `export`.
+    """
+    older = (
+        PresentationExport.objects
+        .filter(presentation_id=export.presentation_id, format=export.format)
+        .exclude(id=export.id)
+        .exclude(status__in=("queued", "running"))
+    )
+
+    for old in older.exclude(file_path=""):
+        export_path(old).unlink(missing_ok=True)
+
+    return older.update(
+        status="superseded",
+        superseded_by=export,
+        file_path="",
+        size=None,
+    )
+
+
+# =====================================================
+# RENDERERS
+# =====================================================
+
+def render_pdf(presentation, path):
+    from weasyprint import HTML
+
+    from .services import slide_item_text
+
+    slides = presentation.slides.prefetch_related("items__artifact").all()
+
+    for slide in slides:
+        for item in slide.items.all():
+            item.inline_content = ""
+
+            if item.artifact:
+                # Print-size rendition for images; normalize Windows paths to URL paths
+                src = renditions.rendition(item.artifact, "print") if item.item_type == "image" else item.artifact.file_path
+                item.artifact.url_path = src.replace("\\", "/")
+
+            if item.item_type in ("attachment", "log_snippet") and item.artifact:
+                item.inline_content = slide_item_text(item) or ""
+
+    html = render_to_string(
+        "launcher/presentation/detail_pdf.html",
+        {
+            "presentation": presentation,
+            "slides": slides,
+            "now": timezone.now(),
+        }
+    )
+
+    HTML(string=html, base_url=str(settings.MEDIA_ROOT)).write_pdf(str(path))
+
+
+def render_pptx(presentation, path):
+    from pptx import Presentation as PPTPresentation
+    from pptx.util import Inches, Pt
+
+    from .services import slide_item_text
+
+    slides = presentation.slides.prefetch_related("items__artifact")
+
+    # Create Presentation (default theme)
+    prs = PPTPresentation()
+
+    # Standard 16:9
+    prs.slide_width = Inches(13.33)
+    prs.slide_height = Inches(7.5)
+
+    # --------------------------------------------------
+    # TITLE SLIDE
+    # --------------------------------------------------
+    title_layout = prs.slide_layouts[0]
+    title_slide = prs.slides.add_slide(title_layout)
+
+    title_slide.shapes.title.text = presentation.title
+
+    subtitle = title_slide.placeholders[1]
+    subtitle.text = f"Run {presentation.run.id} • {presentation.run.tool.name}" if presentation.run else ""
+
+    # --------------------------------------------------
+    # CONTENT SLIDES
+    # --------------------------------------------------
+    for slide in slides:
+
+        # Use built-in Title + Content layout
+        layout = prs.slide_layouts[1]
+        ppt_slide = prs.slides.add_slide(layout)
+
+        ppt_slide.shapes.title.text = slide.title
+
+        content_placeholder = ppt_slide.placeholders[1]
+        tf = content_placeholder.text_frame
+        tf.clear()
+
+        image_added = False
+
+        for item in slide.items.all():
+
+            # ------------------------------------------
+            # IMAGE HANDLING
+            # ------------------------------------------
+            if item.item_type == "image" and item.artifact:
+                img_path = Path(settings.MEDIA_ROOT) / renditions.rendition(item.artifact, "slide")
+
+                if img_path.exists():
+
+                    # Remove content placeholder cleanly
+                    sp = content_placeholder.element
+                    sp.getparent().remove(sp)
+
+                    # Add centered image
+                    ppt_slide.shapes.add_picture(
+                        str(img_path),
+                        Inches(1.5),
+                        Inches(1.3),
+                        width=Inches(10)
+                    )
+
+                    image_added = True
+
+            # ------------------------------------------
+            # TEXT HANDLING (Logs / Metadata)
+            # ------------------------------------------
+            elif item.item_type in ("attachment", "log_snippet") and item.artifact:
+                text = slide_item_text(item, max_lines=40)
+
+                if text:
+                    for line in text.splitlines():
+                        p = tf.add_paragraph()
+                        p.text = line
+                        p.font.size = Pt(12)
+                        p.level = 0
+
+        # If no content was added, keep slide clean
+        if not image_added and not tf.text.strip():
+            tf.text = "No content available"
+
+    prs.save(str(path))
+
+
+RENDERERS = {
+    "pdf": render_pdf,
+    "pptx": render_pptx,
+}
@@ -0,0 +1,326 @@
+"""
+File responses with HTTP caching and byte ranges for serve_upload.
+
+Every file gets a strong ETag and Last-Modified, so a reload answers
+304 instead of re-sending the body (django.utils.cache does the
+If-None-Match / If-Modified-Since / If-Match work). The ETag is the
+SHA-256 for content-addressed blobs and inode-mtime-size otherwise,
+which changes whenever a file is rewritten or replaced.
+
+Range requests get 206 with one range, or multipart/byteranges for
+several; If-Range falls back to the full file when the copy changed.
+Unsatisfiable ranges get 416, and requests with more than
+EDA_UPLOAD_MAX_RANGES ranges are served whole rather than as hundreds
+of tiny parts.
+
+Delivery (EDA_FILE_DELIVERY): once the view has checked the path and
+conditional headers, "x-accel" (nginx) and "x-sendfile" (Apache /
+lighttpd) hand the body to the front proxy, which also applies Range.
+"sendfile" serves it from Django as a FileResponse over the file (or a
+RangeFile for one range), which WSGI servers with wsgi.file_wrapper
+(gunicorn) send with os.sendfile. A dotted path names a custom backend:
+a callable (path, content_type) returning the response, or None to
+serve locally. Multipart ranges are always streamed by Django.
+
+Encoding: if precompress.py left a fresh .br / .gz sibling, the one
+the client prefers in Accept-Encoding is served as-is with
+Content-Encoding (ranges then apply to the encoded bytes, and its
+ETag is suffixed so representations never share a tag).
+"""
+import io
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import import_string
+
+from .blobstore import blob_root
+from .precompress import ENCODINGS, fresh_sibling
+
+
+CHUNK = 64 * 1024
+
+RANGE_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def file_etag(path, st):
+    """
+    Strong ETag: the content hash for blobs, else inode-mtime-size.
+    """
+    path = os.path.abspath(path)
+    if os.path.dirname(os.path.dirname(os.path.dirname(path))) == os.path.abspath(blob_root()):
+        return f'"{os.path.basename(path)}"'
+    return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    [(start, end)] inclusive byte ranges of a "bytes=..." header,
+    sorted and merged. None means ignore the header (serve the whole
+    file), [] means nothing satisfiable (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        m = RANGE_RE.match(part)
+        if not m or m.groups() == ("", ""):
+            return None
+        first, last = m.groups()
+
+        if first == "":
+            # Suffix range: the last N bytes
+            n = int(last)
+            if n:
+                ranges.append((max(0, size - n), size - 1))
+            continue
+
+        first = int(first)
+        if last != "" and int(last) < first:
+            return None
+        last = size - 1 if last == "" else min(int(last), size - 1)
+        if first < size:
+            ranges.append((first, last))
+
+    if len(ranges) > settings.EDA_UPLOAD_MAX_RANGES:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _accepted(header):
+    """
+    {coding: q} from an Accept-Encoding header.
+    """
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = [p.strip() for p in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def negotiate(request, path, st):
+    """
+    (encoding, sibling path) of the best precompressed variant the
+    client accepts, or (None, None) for the plain file.
+    """
+    accepted = _accepted(request.headers.get("Accept-Encoding", ""))
+    best, best_q = (None, None), 0.0
+
+    for encoding, suffix in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            candidate = fresh_sibling(path, st, suffix)
+            if candidate is not None:
+                best, best_q = (encoding, candidate), q
+
+    return best
+
+
+def _has_variants(path, st):
+    return any(fresh_sibling(path, st, suffix) for _, suffix in ENCODINGS)
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.headers.get("If-Range")
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith(('"', 'W/')):
+        return value == etag  # strong comparison: weak tags never match
+    date = parse_http_date_safe(value)
+    return date is not None and int(mtime) <= date
+
+
+def _read(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = f.read(min(CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class RangeFile:
+    """
+    Read-only view of bytes [start, end] of a file. Positions stay
+    absolute so FileResponse measures the range as Content-Length and a
+    sendfile-capable file_wrapper starts at tell() with fileno().
+    """
+
+    def __init__(self, path, start, end):
+        self.file = open(path, "rb")
+        self.name = self.file.name
+        self.stop = end + 1
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        remaining = max(0, self.stop - self.file.tell())
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            return self.file.seek(self.stop + offset)
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+# =====================================================
+# DELIVERY BACKENDS
+# =====================================================
+
+def _x_accel(path, content_type):
+    rel = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    response = HttpResponse(content_type=content_type)
+    response["X-Accel-Redirect"] = settings.EDA_X_ACCEL_PREFIX.rstrip("/") + "/" + quote(rel)
+    return response
+
+
+def _x_sendfile(path, content_type):
+    response = HttpResponse(content_type=content_type)
+    response["X-Sendfile"] = os.path.abspath(path)
+    return response
+
+
+DELIVERY_BACKENDS = {
+    "sendfile": lambda path, content_type: None,
+    "x-accel": _x_accel,
+    "x-sendfile": _x_sendfile,
+}
+
+
+def delivery_backend():
+    name = settings.EDA_FILE_DELIVERY
+    return DELIVERY_BACKENDS.get(name) or import_string(name)
+
+
+def _part_header(boundary, content_type, start, end, size):
+    return (
+        f"\r\n--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+    ).encode()
+
+
+def _multipart(path, ranges, size, content_type, boundary):
+    for start, end in ranges:
+        yield _part_header(boundary, content_type, start, end, size)
+        yield from _read(path, start, end)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def _multipart_length(ranges, size, content_type, boundary):
+    return sum(
+        len(_part_header(boundary, content_type, start, end, size)) + end - start + 1
+        for start, end in ranges
+    ) + len(f"\r\n--{boundary}--\r\n")
+
+
+def _cache_headers(response, etag, mtime, immutable):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    response["Accept-Ranges"] = "bytes"
+    if immutable:
+        response["Cache-Control"] = f"private, max-age={settings.EDA_UPLOAD_IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def serve_file(request, path, immutable=False):
+    """
+    Response for `path` honouring conditional, Range and
+    Accept-Encoding headers. `immutable` files are cached without
+    revalidation for EDA_UPLOAD_IMMUTABLE_MAX_AGE.
+    """
+    st = os.stat(path)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    filename = os.path.basename(path)
+
+    varies = _has_variants(path, st)
+    encoding, encoded = negotiate(request, path, st) if varies else (None, None)
+
+    etag = file_etag(path, st)
+    if encoding:
+        path, etag = encoded, f'{etag[:-1]}-{encoding}"'
+        st = os.stat(path)
+    size = st.st_size
+
+    def finish(response):
+        if varies:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        if encoding and response.status_code != 304:
+            response["Content-Encoding"] = encoding
+        return _cache_headers(response, etag, st.st_mtime, immutable)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if conditional is not None:
+        return finish(conditional)
+
+    offloaded = delivery_backend()(path, content_type)
+    if offloaded is not None:
+        return finish(offloaded)
+
+    header = request.headers.get("Range")
+    ranges = None
+    if header and request.method in ("GET", "HEAD") and _if_range_matches(request, etag, st.st_mtime):
+        ranges = parse_range(header, size)
+
+    if ranges is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type, filename=filename)
+
+    elif not ranges:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = FileResponse(RangeFile(path, start, end), status=206, content_type=content_type, filename=filename)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    else:
+        boundary = uuid.uuid4().hex
+        response = StreamingHttpResponse(
+            _multipart(path, ranges, size, content_type, boundary),
+            status=206,
+            content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response["Content-Length"] = str(_multipart_length(ranges, size, content_type, boundary))
+
+    return finish(response)
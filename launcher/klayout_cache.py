@@ -0,0 +1,228 @@
+"""
+Persistent cache of KLayout extraction results.
+
+Entries are keyed by (GDS content hash, extraction script version,
+render size) and live under MEDIA_ROOT/cache/klayout/<key>/. A hit
+links the cached preview.png / metadata.json / cells.json into the
+run directory instead of starting KLayout. Least recently hit entries
+are evicted once the cache grows past EDA_KLAYOUT_CACHE_BYTES.
+
+Deep-zoom preview tiles are rendered by tile workers (layout_tiles.py)
+and kept under MEDIA_ROOT/cache/tiles/<key>/<z>/<x>_<y>.png, shared by
+every run of the same GDS. Each tile folder is a LayoutTileSet sharing
+the same byte budget and LRU order as the extraction entries.
+"""
+import hashlib
+import heapq
+import os
+import shutil
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .blobstore import link_file
+from .models import ExtractionCacheEntry, LayoutTileSet
+
+
+CACHED_FILES = ("preview.png", "metadata.json", "cells.json")
+
+
+@lru_cache(maxsize=None)
+def _script_version(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def extraction_script_version():
+    """
+    Changes whenever scripts/klayout_extract.py is edited.
+    """
+    path = settings.EDA_KLAYOUT_EXTRACT_SCRIPT
+    return _script_version(str(path), os.stat(path).st_mtime)
+
+
+def cache_key(gds_sha256, render_size):
+    raw = f"{gds_sha256}:{extraction_script_version()}:{render_size}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_dir(key):
+    return Path(settings.MEDIA_ROOT) / "cache" / "klayout" / key
+
+
+def lookup(gds_sha256, render_size, dest_dir):
+    """
+    Link cached outputs into `dest_dir`. Returns the entry on a hit.
+    """
+    if not gds_sha256:
+        return None
+
+    key = cache_key(gds_sha256, render_size)
+    entry = ExtractionCacheEntry.objects.filter(key=key).first()
+    if entry is None:
+        return None
+
+    folder = cache_dir(key)
+    if not all((folder / name).exists() for name in CACHED_FILES):
+        entry.delete()
+        return None
+
+    for name in CACHED_FILES:
+        dest = Path(dest_dir) / name
+        if dest.exists():
+            dest.unlink()
+        link_file(folder / name, dest)
+
+    ExtractionCacheEntry.objects.filter(pk=entry.pk).update(
+        hit_count=F("hit_count") + 1,
+        last_hit_at=timezone.now(),
+    )
+    return entry
+
+
+def store(gds_sha256, render_size, src_dir):
+    """
+    Save a successful run's outputs into the cache, then evict.
+    """
+    if not gds_sha256:
+        return None
+
+    src = Path(src_dir)
+    if not all((src / name).exists() for name in CACHED_FILES):
+        return None
+
+    key = cache_key(gds_sha256, render_size)
+    folder = cache_dir(key)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    size = 0
+    for name in CACHED_FILES:
+        dest = folder / name
+        if not dest.exists():
+            shutil.copyfile(src / name, dest)
+            os.chmod(dest, 0o444)
+        size += dest.stat().st_size
+
+    entry, _ = ExtractionCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            "gds_sha256": gds_sha256,
+            "script_version": extraction_script_version(),
+            "render_size": render_size,
+            "size_bytes": size,
+            "last_hit_at": timezone.now(),
+        },
+    )
+
+    evict()
+    return entry
+
+
+def cache_bytes():
+    extractions = ExtractionCacheEntry.objects.aggregate(t=Sum("size_bytes"))["t"] or 0
+    tiles = LayoutTileSet.objects.aggregate(t=Sum("size_bytes"))["t"] or 0
+    return extractions + tiles
+
+
+def _drop_folder(folder):
+    if folder.exists():
+        for path in folder.rglob("*"):
+            if path.is_file():
+                os.chmod(path, 0o644)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def evict(budget=None):
+    """
+    Drop least recently hit extraction entries and tile sets until the
+    cache fits the budget.
+    """
+    budget = settings.EDA_KLAYOUT_CACHE_BYTES if budget is None else budget
+
+    total = cache_bytes()
+    if total <= budget:
+        return 0
+
+    oldest_first = heapq.merge(
+        ExtractionCacheEntry.objects.order_by("last_hit_at").iterator(),
+        LayoutTileSet.objects.order_by("last_hit_at").iterator(),
+        key=lambda entry: entry.last_hit_at,
+    )
+
+    evicted = 0
+    for entry in oldest_first:
+        if total <= budget:
+            break
+
+        if isinstance(entry, LayoutTileSet):
+            _drop_folder(tile_root() / entry.key)
+        else:
+            _drop_folder(cache_dir(entry.key))
+
+        total -= entry.size_bytes
+        entry.delete()
+        evicted += 1
+
+    return evicted
+
+
+# =====================================================
+# PREVIEW TILE PYRAMID
+# =====================================================
+
+def tile_key(gds_sha256):
+    return cache_key(gds_sha256, f"tiles:{settings.EDA_KLAYOUT_TILE_SIZE}")
+
+
+def tile_root():
+    return Path(settings.MEDIA_ROOT) / "cache" / "tiles"
+
+
+def tile_dir(gds_sha256):
+    return tile_root() / tile_key(gds_sha256)
+
+
+def tile_path(gds_sha256, z, x, y):
+    return tile_dir(gds_sha256) / str(z) / f"{x}_{y}.png"
+
+
+def valid_tile(z, x, y):
+    if not 0 <= z <= settings.EDA_KLAYOUT_TILE_MAX_ZOOM:
+        return False
+    return 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def store_tile(gds_sha256, nbytes):
+    """
+    Count a freshly written tile against the cache budget, then evict.
+    """
+    key = tile_key(gds_sha256)
+    now = timezone.now()
+
+    tile_set, _ = LayoutTileSet.objects.get_or_create(
+        key=key,
+        defaults={"gds_sha256": gds_sha256, "last_hit_at": now},
+    )
+    LayoutTileSet.objects.filter(pk=tile_set.pk).update(
+        size_bytes=F("size_bytes") + nbytes,
+        tile_count=F("tile_count") + 1,
+        last_hit_at=now,
+    )
+
+    evict()
+
+
+def touch_tiles(gds_sha256):
+    """
+    Mark a GDS's tiles as recently used. Throttled to one UPDATE a
+    minute per tile set, since a viewer requests dozens of tiles.
+    """
+    now = timezone.now()
+    LayoutTileSet.objects.filter(
+        key=tile_key(gds_sha256),
+        last_hit_at__lt=now - timedelta(minutes=1),
+    ).update(last_hit_at=now)
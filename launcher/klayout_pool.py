@@ -0,0 +1,243 @@
+"""
+Persistent KLayout batch processes (scripts/klayout_server.py).
+
+Every job worker process (manage.py run_workers) keeps its own
+long-lived KLayout, so the pool is as large as EDA_WORKER_COUNT. Each
+extraction skips the `wsl bash -lc` login shell and the KLayout
+startup. A worker is pinged before each job and restarted if it has
+died, hangs or crashes mid-job.
+
+Tile workers (layout_tiles.py) get one too for deep-zoom preview
+tiles; a lock keeps concurrent callers from interleaving on the pipe.
+Parallel preview rendering borrows extra KLayouts from
+get_render_pool().
+
+Loaded layouts are what costs memory, so they are bounded pool-wide:
+only tile workers keep layouts between jobs (EDA_KLAYOUT_TILE_VIEWS
+each, for panning). Everyone else keeps one, dropped once a parallel
+render is done. Render helpers only live for one render and are
+granted from the shared CPU token budget (build_tokens), so all
+workers together never run more than that many at once.
+"""
+import json
+import queue
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+
+from .klayout_cache import extraction_script_version
+
+
+RESULT = "@@RESULT "
+
+
+class KLayoutWorkerError(RuntimeError):
+    pass
+
+
+class KLayoutWorker:
+    def __init__(self, max_views=1):
+        self.max_views = max_views
+        self.proc = None
+        self.lines = None
+        self.jobs_done = 0
+        self.script_version = None
+        self.lock = threading.Lock()
+
+    # -------------------------
+    # Process lifecycle
+    # -------------------------
+    def start(self):
+        from .services import wsl_path
+
+        script = wsl_path(str(settings.EDA_KLAYOUT_SERVER_SCRIPT))
+
+        self.proc = subprocess.Popen(
+            ["wsl", "bash", "-lc", f"exec klayout -b -rd max_views={int(self.max_views)} -r '{script}'"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.jobs_done = 0
+        self.script_version = extraction_script_version()
+
+        # Reader thread → queue, so reads can time out
+        self.lines = queue.Queue()
+        threading.Thread(
+            target=self._pump, args=(self.proc.stdout, self.lines), daemon=True
+        ).start()
+
+        self._read_result(settings.EDA_KLAYOUT_STARTUP_TIMEOUT)
+
+    @staticmethod
+    def _pump(pipe, lines):
+        for line in pipe:
+            lines.put(line)
+        lines.put(None)
+
+    def stop(self):
+        if self.proc is None:
+            return
+
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    # -------------------------
+    # Protocol
+    # -------------------------
+    def _read_result(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stop()
+                raise KLayoutWorkerError(f"KLayout worker timed out after {timeout}s")
+
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+
+            if line is None:
+                self.stop()
+                raise KLayoutWorkerError("KLayout worker exited")
+
+            if line.startswith(RESULT):
+                return json.loads(line[len(RESULT):])
+
+    def request(self, job, timeout):
+        if not self.alive():
+            raise KLayoutWorkerError("KLayout worker is not running")
+
+        try:
+            self.proc.stdin.write(json.dumps(job) + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            self.stop()
+            raise KLayoutWorkerError(f"KLayout worker pipe closed: {e}")
+
+        return self._read_result(timeout)
+
+    def healthy(self):
+        if not self.alive():
+            return False
+        try:
+            return self.request({"op": "ping"}, settings.EDA_KLAYOUT_PING_TIMEOUT)["ok"]
+        except KLayoutWorkerError:
+            return False
+
+    def ensure_started(self):
+        # Recycle periodically to bound memory growth in the KLayout process
+        if self.alive() and self.jobs_done >= settings.EDA_KLAYOUT_MAX_JOBS_PER_WORKER:
+            self.stop()
+
+        # klayout_extract.py is imported once → pick up edits
+        if self.alive() and self.script_version != extraction_script_version():
+            self.stop()
+
+        if not self.healthy():
+            self.stop()
+            self.start()
+
+    def call(self, job, timeout):
+        """
+        Send one job. Restarts a dead or wedged worker and retries once
+        before giving up.
+        """
+        with self.lock:
+            for attempt in (1, 2):
+                self.ensure_started()
+                try:
+                    result = self.request(job, timeout)
+                    self.jobs_done += 1
+                    return result
+                except KLayoutWorkerError:
+                    if attempt == 2:
+                        raise
+
+    def extract(self, gds, png, meta, log, size):
+        """
+        Run one extraction (paths as seen inside WSL).
+        """
+        job = {
+            "op": "extract",
+            "gds": gds,
+            "png": png,
+            "meta": meta,
+            "log": log,
+            "size": size,
+        }
+        return self.call(job, settings.EDA_KLAYOUT_JOB_TIMEOUT)
+
+    def drop_views(self):
+        """
+        Unload cached layouts, if the process is up.
+        """
+        with self.lock:
+            if not self.alive():
+                return
+            try:
+                self.request({"op": "drop"}, settings.EDA_KLAYOUT_PING_TIMEOUT)
+            except KLayoutWorkerError:
+                pass
+
+    def tile(self, gds, png, z, x, y, size):
+        job = {"op": "tile", "gds": gds, "png": png, "z": z, "x": x, "y": y, "size": size}
+        return self.call(job, settings.EDA_KLAYOUT_TILE_TIMEOUT)
+
+    def render(self, gds, png, box, width, height):
+        job = {"op": "render", "gds": gds, "png": png, "box": box, "width": width, "height": height}
+        return self.call(job, settings.EDA_KLAYOUT_JOB_TIMEOUT)
+
+
+_worker = None
+
+
+def get_worker(max_views=1):
+    """
+    The persistent KLayout owned by this (job worker or web) process,
+    keeping up to `max_views` layouts loaded (set by the first call).
+    """
+    global _worker
+    if _worker is None:
+        _worker = KLayoutWorker(max_views)
+    return _worker
+
+
+_render_workers = []
+
+
+def get_render_pool(size):
+    """
+    `size` KLayouts for region rendering: this process's own worker
+    plus helpers, until release_render_pool().
+    """
+    while len(_render_workers) < size - 1:
+        _render_workers.append(KLayoutWorker())
+    return [get_worker()] + _render_workers[:size - 1]
+
+
+def release_render_pool():
+    """
+    Stop the helpers and unload the layout from this process's worker.
+    """
+    while _render_workers:
+        _render_workers.pop().stop()
+    if _worker is not None:
+        _worker.drop_views()
+
+
+def stop_all():
+    for worker in [_worker] + _render_workers:
+        if worker is not None:
+            worker.stop()
@@ -0,0 +1,126 @@
+"""
+Deep-zoom layout preview tiles, rendered off the request path.
+
+A tile that isn't on disk yet is queued as a LayoutTileJob and the
+view answers 202; tile_viewer.js retries the image shortly after.
+Tile workers (run_workers starts EDA_TILE_WORKER_COUNT of them next to
+the run workers) claim jobs with the same conditional UPDATE as
+ToolRuns and render them through their own persistent KLayout, so no
+web process ever starts or waits on KLayout.
+
+Written tiles are counted into the extraction cache budget
+(klayout_cache.store_tile) and evicted with it. The job row is deleted
+once its PNG exists; a failed job keeps its error until the tile is
+requested again.
+"""
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import klayout_cache, klayout_pool
+from .models import LayoutTileJob
+
+
+def request_tile(blob, z, x, y):
+    """
+    (path, None) when the tile exists, else (None, job) with the job
+    that will render it.
+    """
+    path = klayout_cache.tile_path(blob.sha256, z, x, y)
+    if path.exists():
+        klayout_cache.touch_tiles(blob.sha256)
+        return path, None
+
+    job, created = LayoutTileJob.objects.get_or_create(blob=blob, z=z, x=x, y=y)
+
+    if not created and job.status == "failed":
+        # Report the failure once, then let the next request retry
+        LayoutTileJob.objects.filter(id=job.id, status="failed").update(
+            status="queued",
+            worker_id="",
+            error="",
+            started_at=None,
+        )
+
+    return None, job
+
+
+def claim_next_tile(worker_id):
+    """
+    Atomically move the oldest queued tile job to "running".
+    """
+    for job_id in LayoutTileJob.objects.filter(status="queued").order_by("created_at").values_list("id", flat=True)[:10]:
+        claimed = LayoutTileJob.objects.filter(id=job_id, status="queued").update(
+            status="running",
+            worker_id=worker_id,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return LayoutTileJob.objects.select_related("blob").get(id=job_id)
+
+    return None
+
+
+def requeue_orphaned_tiles(*, worker_id=None, host=None):
+    qs = LayoutTileJob.objects.filter(status="running")
+
+    if worker_id:
+        qs = qs.filter(worker_id=worker_id)
+    else:
+        qs = qs.filter(worker_id__startswith=f"{host}:")
+
+    return qs.update(status="queued", worker_id="", started_at=None)
+
+
+def render_tile(job):
+    """
+    Render one claimed tile job through this process's KLayout.
+    """
+    from .services import wsl_path
+
+    blob = job.blob
+    path = klayout_cache.tile_path(blob.sha256, job.z, job.x, job.y)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp.png")
+
+        try:
+            result = klayout_pool.get_worker(settings.EDA_KLAYOUT_TILE_VIEWS).tile(
+                wsl_path(str(blob.absolute_path())),
+                wsl_path(str(tmp)),
+                job.z, job.x, job.y,
+                settings.EDA_KLAYOUT_TILE_SIZE,
+            )
+            if not result.get("ok") or not tmp.exists():
+                raise klayout_pool.KLayoutWorkerError(result.get("error") or "Tile render failed")
+
+            nbytes = tmp.stat().st_size
+            os.replace(tmp, path)
+        except (OSError, klayout_pool.KLayoutWorkerError) as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.save(update_fields=["status", "error"])
+            return job
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        klayout_cache.store_tile(blob.sha256, nbytes)
+
+    job.delete()
+    return job
+
+
+def run_tile_worker_loop(worker_id, poll_interval=None):
+    poll_interval = poll_interval or settings.EDA_TILE_POLL_INTERVAL
+
+    while True:
+        job = claim_next_tile(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        render_tile(job)
@@ -0,0 +1,530 @@
+"""
+License seat checkout for tools with requires_license.
+
+A seat is taken with one conditional UPDATE
+
+    UPDATE license SET active_count = active_count + 1
+    WHERE id = ? AND active_count < pool_size
+
+so concurrent launches never oversubscribe a pool and never wait on a
+row lock held across the launch. The LicenseAllocation is created in
+the same transaction, and a second UPDATE derives the pool status from
+the new count (_refresh_status; not in the same SET list, whose
+evaluation order differs between databases). Releasing flips the allocation to "released"
+with another conditional UPDATE first, so a seat is only returned once
+however many code paths try to release it.
+
+Allocations are leases: the holder (a job through held(), or the
+desktop-launch watcher) renews lease_expires_at every
+EDA_LICENSE_HEARTBEAT_INTERVAL. reap_expired() — run by the
+run_workers supervisor and `manage.py reap_licenses` — reclaims leases
+whose holder died without releasing.
+
+Wait queue: every queued run of a licensed tool is waiting for a seat.
+Workers only claim such a run when its tool has a free seat and the
+run is among the first in fair-share order (claimable_runs):
+least license usage (seat-seconds over the last
+EDA_LICENSE_FAIR_SHARE_WINDOW, per user or group) first, minus a
+bonus for time already waited so heavy users aren't starved. Waiting
+never holds a worker; a seat freed by release() is picked up on the
+next claim. A run whose tool has no unexpired pool at all is claimed
+anyway and fails with NoLicensePool.
+
+Dashboard: pools_with_holders() lists every pool with its holders in
+a fixed number of queries, queued_counts() the queue length per tool; utilization() serves per-tool seat usage
+over time, cached per tool and bucket.
+"""
+import heapq
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, ExpressionWrapper, F, Prefetch, Q, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import License, LicenseAllocation, ToolRun
+
+
+class LicenseUnavailable(Exception):
+    pass
+
+
+class NoLicensePool(LicenseUnavailable):
+    """
+    The tool has no unexpired pool at all: no release will ever free a
+    seat, so waiting for one is pointless.
+    """
+
+
+def _valid_pools():
+    now = timezone.now()
+    return (
+        License.objects
+        .exclude(status="expired")
+        .filter(Q(expiry_date__isnull=True) | Q(expiry_date__gt=now))
+    )
+
+
+def _pools(tool):
+    # Least loaded pool first
+    return _valid_pools().filter(tool=tool).order_by(F("active_count") - F("pool_size"), "id")
+
+
+def _refresh_status(license_id):
+    License.objects.filter(id=license_id).exclude(status="expired").update(
+        status=Case(
+            When(active_count__gte=F("pool_size"), then=Value("in_use")),
+            default=Value("available"),
+        ),
+    )
+
+
+def checkout(tool, user=None, run=None):
+    """
+    Take one seat for `tool`. Returns the LicenseAllocation, or None
+    for tools that don't need a license. Raises LicenseUnavailable
+    when every pool is full, NoLicensePool when there is none.
+    """
+    if not tool.requires_license:
+        return None
+
+    pool_ids = list(_pools(tool).values_list("id", flat=True))
+    if not pool_ids:
+        raise NoLicensePool(f"No {tool.name} license pool is configured")
+
+    for pool_id in pool_ids:
+        with transaction.atomic():
+            taken = License.objects.filter(id=pool_id, active_count__lt=F("pool_size")).update(
+                active_count=F("active_count") + 1,
+            )
+            if taken:
+                _refresh_status(pool_id)
+                return LicenseAllocation.objects.create(
+                    license_id=pool_id,
+                    user=user,
+                    run=run,
+                    lease_expires_at=lease_deadline(),
+                )
+
+    raise LicenseUnavailable(f"No {tool.name} license seats available")
+
+
+def release(allocation):
+    """
+    Return the seat held by `allocation`. Returns False if it was
+    already released.
+    """
+    if allocation is None:
+        return False
+
+    with transaction.atomic():
+        released = LicenseAllocation.objects.filter(id=allocation.id, status="active").update(
+            status="released",
+            released_at=timezone.now(),
+        )
+        if released:
+            License.objects.filter(id=allocation.license_id, active_count__gt=0).update(
+                active_count=F("active_count") - 1,
+            )
+            _refresh_status(allocation.license_id)
+
+    return bool(released)
+
+
+def release_for_runs(runs):
+    """
+    Return every seat still held by `runs` (ToolRuns or a queryset).
+    """
+    released = 0
+    for allocation in LicenseAllocation.objects.filter(run__in=runs, status="active"):
+        released += release(allocation)
+    return released
+
+
+@contextmanager
+def held(allocation):
+    """
+    Keep `allocation` (may be None) renewed while the block runs and
+    release it when the block ends.
+    """
+    stop = threading.Event()
+    if allocation is not None:
+        threading.Thread(target=_heartbeat, args=(allocation, stop), daemon=True).start()
+
+    try:
+        yield allocation
+    finally:
+        stop.set()
+        release(allocation)
+
+
+# =====================================================
+# LEASES
+# =====================================================
+
+def lease_deadline():
+    return timezone.now() + timedelta(seconds=settings.EDA_LICENSE_LEASE_SECONDS)
+
+
+def renew(allocation):
+    """
+    Extend the lease. Returns False once the allocation was released
+    or reclaimed.
+    """
+    return bool(
+        LicenseAllocation.objects.filter(id=allocation.id, status="active").update(
+            lease_expires_at=lease_deadline(),
+        )
+    )
+
+
+def _heartbeat(allocation, stop):
+    try:
+        while not stop.wait(settings.EDA_LICENSE_HEARTBEAT_INTERVAL):
+            if not renew(allocation):
+                break
+    finally:
+        connection.close()
+
+
+def reap_expired():
+    """
+    Reclaim every active allocation whose lease ran out: one UPDATE
+    flipping the allocations and one adjusting active_count per pool.
+    Rows without a lease (older allocations) expire one lease after
+    they started. Returns the number of seats reclaimed.
+    """
+    now = timezone.now()
+    expired = LicenseAllocation.objects.filter(status="active").filter(
+        Q(lease_expires_at__lt=now)
+        | Q(lease_expires_at__isnull=True, started_at__lt=now - timedelta(seconds=settings.EDA_LICENSE_LEASE_SECONDS))
+    )
+
+    reclaimed = 0
+    for license_id in expired.values_list("license_id", flat=True).distinct():
+        with transaction.atomic():
+            ids = list(expired.filter(license_id=license_id).values_list("id", flat=True))
+
+            # Only rows still active count: a holder may release concurrently
+            n = LicenseAllocation.objects.filter(id__in=ids, status="active").update(
+                status="released",
+                released_at=now,
+            )
+            if n:
+                License.objects.filter(id=license_id).update(
+                    active_count=Greatest(F("active_count") - n, 0),
+                )
+                _refresh_status(license_id)
+        reclaimed += n
+
+    return reclaimed
+
+
+# =====================================================
+# WAIT QUEUE
+# =====================================================
+
+def free_seats():
+    """
+    {tool_id: free seats} over the unexpired pools of licensed tools.
+    """
+    rows = (
+        _valid_pools()
+        .filter(tool__requires_license=True)
+        .values("tool_id")
+        .annotate(size=Sum("pool_size"), used=Sum("active_count"))
+    )
+    return {r["tool_id"]: max(0, r["size"] - r["used"]) for r in rows}
+
+
+def _share_key(user_id, groups):
+    if settings.EDA_LICENSE_FAIR_SHARE_BY == "group" and groups.get(user_id):
+        return ("group", groups[user_id])
+    return ("user", user_id)
+
+
+def _user_groups(user_ids):
+    from django.contrib.auth import get_user_model
+
+    through = get_user_model().groups.through
+    groups = {}
+    for row in through.objects.filter(user_id__in=user_ids).order_by("group_id").values("user_id", "group_id"):
+        groups.setdefault(row["user_id"], row["group_id"])
+    return groups
+
+
+def usage(tool_ids):
+    """
+    {tool_id: {user_id: seat-seconds}} used on each tool over the
+    fair-share window, summed by the database in one query.
+    """
+    now = timezone.now()
+    since = now - timedelta(seconds=settings.EDA_LICENSE_FAIR_SHARE_WINDOW)
+
+    held = ExpressionWrapper(
+        Coalesce("released_at", Value(now, output_field=DateTimeField()))
+        - Greatest("started_at", Value(since, output_field=DateTimeField())),
+        output_field=DurationField(),
+    )
+    rows = (
+        LicenseAllocation.objects
+        .filter(license__tool_id__in=tool_ids)
+        .filter(Q(released_at__isnull=True) | Q(released_at__gt=since))
+        .values("license__tool_id", "user_id")
+        .annotate(held=Sum(held))
+        .order_by()
+    )
+
+    used = {}
+    for row in rows:
+        seconds = max(0, row["held"].total_seconds()) if row["held"] else 0
+        used.setdefault(row["license__tool_id"], {})[row["user_id"]] = seconds
+    return used
+
+
+def queues(tool_ids):
+    """
+    {tool_id: queued runs in the order seats are handed out} for the
+    given licensed tools: three queries however many tools and runs.
+    """
+    runs = (
+        ToolRun.objects
+        .filter(tool_id__in=tool_ids, status="queued")
+        .exclude(job_type="")
+        .only("id", "tool_id", "user_id", "created_at")
+    )
+    by_tool = {}
+    for run in runs:
+        by_tool.setdefault(run.tool_id, []).append(run)
+    if not by_tool:
+        return {}
+
+    used = usage(list(by_tool))
+    groups = _user_groups(
+        {run.user_id for tool_runs in by_tool.values() for run in tool_runs}
+        | {user_id for tool_used in used.values() for user_id in tool_used}
+    )
+    now = timezone.now()
+    aging = settings.EDA_LICENSE_AGING
+
+    ordered = {}
+    for tool_id, tool_runs in by_tool.items():
+        # Fair share is per user or per group: fold users into their key
+        shares = {}
+        for user_id, seconds in used.get(tool_id, {}).items():
+            key = _share_key(user_id, groups)
+            shares[key] = shares.get(key, 0) + seconds
+
+        def priority(run):
+            waited = (now - run.created_at).total_seconds()
+            return (shares.get(_share_key(run.user_id, groups), 0) - aging * waited, run.created_at, run.id)
+
+        ordered[tool_id] = sorted(tool_runs, key=priority)
+    return ordered
+
+
+def queue(tool):
+    """
+    Queued runs of a licensed tool in the order seats are handed out.
+    """
+    tool_id = getattr(tool, "pk", tool)
+    return queues([tool_id]).get(tool_id, [])
+
+
+def claimable_runs():
+    """
+    Ids of waiting runs that may be claimed now: the first N in queue
+    order for every licensed tool with N free seats, plus runs of
+    licensed tools without any unexpired pool, which the worker then
+    fails (NoLicensePool) instead of leaving them waiting forever.
+    Fair-share order is computed once for all tools with free seats.
+    """
+    free = free_seats()
+    ordered = queues([tool_id for tool_id, seats in free.items() if seats])
+
+    ids = []
+    for tool_id, runs in ordered.items():
+        ids += [run.id for run in runs[:free[tool_id]]]
+
+    ids += (
+        ToolRun.objects
+        .filter(status="queued", tool__requires_license=True)
+        .exclude(job_type="")
+        .exclude(tool_id__in=list(free))
+        .values_list("id", flat=True)[:10]
+    )
+    return ids
+
+
+def typical_duration(tool):
+    """
+    Mean wall time of the tool's recent finished runs (ETA basis).
+    """
+    runs = (
+        ToolRun.objects
+        .filter(tool=tool, status__in=("success", "failed"))
+        .exclude(started_at=None)
+        .exclude(completed_at=None)
+        .order_by("-completed_at")
+        .values_list("started_at", "completed_at")[:settings.EDA_LICENSE_ETA_SAMPLES]
+    )
+    durations = [(done - start).total_seconds() for start, done in runs]
+    return sum(durations) / len(durations) if durations else None
+
+
+def queue_status(run):
+    """
+    Position of a queued run in its license queue and an ETA: seats
+    held now free up after the typical duration minus their age, and
+    every run ahead then holds a seat for the typical duration.
+    """
+    order = [r.id for r in queue(run.tool)]
+    if run.id not in order:
+        return None
+
+    position = order.index(run.id)
+    seats = sum(_pools(run.tool).values_list("pool_size", flat=True))
+    duration = typical_duration(run.tool)
+
+    status = {"position": position + 1, "ahead": position, "pool_size": seats, "eta_seconds": None}
+    if duration is None or not seats:
+        return status
+
+    now = timezone.now()
+    free_at = [
+        max(0.0, duration - (now - started).total_seconds())
+        for started in LicenseAllocation.objects
+        .filter(license__tool=run.tool, status="active")
+        .values_list("started_at", flat=True)[:seats]
+    ]
+    free_at += [0.0] * (seats - len(free_at))
+    heapq.heapify(free_at)
+
+    for _ in range(position):
+        heapq.heappush(free_at, heapq.heappop(free_at) + duration)
+
+    status["eta_seconds"] = round(heapq.heappop(free_at), 1)
+    return status
+
+
+# =====================================================
+# DASHBOARD
+# =====================================================
+
+def pools_with_holders():
+    """
+    Every pool with its tool, active holders (prefetched into
+    active_allocations) and held count: two queries however many pools
+    and holders there are. Queued runs belong to the tool, not to a
+    pool; see queued_counts().
+    """
+    holders = (
+        LicenseAllocation.objects
+        .filter(status="active")
+        .select_related("user")
+        .order_by("started_at")
+    )
+
+    return (
+        License.objects
+        .select_related("tool")
+        .annotate(held=Count("allocations", filter=Q(allocations__status="active")))
+        .prefetch_related(Prefetch("allocations", queryset=holders, to_attr="active_allocations"))
+        .order_by("tool__name", "id")
+    )
+
+
+def queued_counts(tool_ids):
+    """
+    {tool_id: runs waiting in the license queue}, in one query.
+    """
+    rows = (
+        ToolRun.objects
+        .filter(tool_id__in=tool_ids, status="queued")
+        .exclude(job_type="")
+        .values("tool_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    counts = {r["tool_id"]: r["n"] for r in rows}
+    return {tool_id: counts.get(tool_id, 0) for tool_id in tool_ids}
+
+
+def _utilization_key(tool_id, end, hours, bucket):
+    return f"license-util:{tool_id}:{end}:{hours}:{bucket}"
+
+
+def utilization(tool_ids, hours=24, bucket=900):
+    """
+    {tool_id: {"pool_size", "start", "bucket", "seats": [...]}} where
+    seats[i] is the mean number of seats in use during bucket i.
+
+    Buckets are aligned to `bucket` seconds and the cache key names the
+    last one, so a cached series (EDA_LICENSE_UTILIZATION_CACHE_SECONDS)
+    never spans a bucket boundary. Only tools missing from the cache are
+    computed, with one allocation query between them. pool_size is the
+    current size; resized pools aren't tracked historically.
+    """
+    now = timezone.now().timestamp()
+    end = int(now // bucket + 1) * bucket
+    start = end - int(hours * 3600 // bucket) * bucket
+
+    keys = {tool_id: _utilization_key(tool_id, end, hours, bucket) for tool_id in tool_ids}
+    cached = cache.get_many(keys.values())
+    series = {tool_id: cached[key] for tool_id, key in keys.items() if key in cached}
+
+    missing = [tool_id for tool_id in tool_ids if tool_id not in series]
+    if not missing:
+        return series
+
+    since = datetime.fromtimestamp(start, tz=dt_timezone.utc)
+    sizes = dict(
+        _valid_pools()
+        .filter(tool_id__in=missing)
+        .values("tool_id")
+        .annotate(size=Sum("pool_size"))
+        .values_list("tool_id", "size")
+    )
+    allocations = (
+        LicenseAllocation.objects
+        .filter(license__tool_id__in=missing)
+        .filter(Q(released_at__isnull=True) | Q(released_at__gt=since))
+        .values_list("license__tool_id", "started_at", "released_at")
+    )
+
+    buckets = (end - start) // bucket
+    seconds = {tool_id: [0.0] * buckets for tool_id in missing}
+
+    for tool_id, started, released in allocations:
+        lo = max(started.timestamp(), start)
+        hi = min(released.timestamp() if released else now, end)
+
+        # Spread the held interval over the buckets it overlaps
+        while lo < hi:
+            i = int((lo - start) // bucket)
+            edge = min(start + (i + 1) * bucket, hi)
+            seconds[tool_id][i] += edge - lo
+            lo = edge
+
+    fresh = {}
+    for tool_id in missing:
+        fresh[tool_id] = {
+            "pool_size": sizes.get(tool_id, 0),
+            "start": start,
+            "bucket": bucket,
+            "seats": [round(s / bucket, 2) for s in seconds[tool_id]],
+        }
+
+    cache.set_many(
+        {keys[tool_id]: data for tool_id, data in fresh.items()},
+        timeout=settings.EDA_LICENSE_UTILIZATION_CACHE_SECONDS,
+    )
+    series.update(fresh)
+    return series
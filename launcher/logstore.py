@@ -0,0 +1,272 @@
+"""
+Compressed on-disk storage for ToolRun stdout / stderr.
+
+Full output lives under <run_dir>/logs/ as gzip segments
+(stdout.0000.log.gz, stdout.0001.log.gz, ...). The ToolRun row only
+keeps a short head/tail excerpt and the total byte size per stream,
+so log listings never pull whole logs out of the database.
+
+Plain-text log artifacts (klayout.log, run.log) get a sidecar line
+index (<log>.lidx) so slide snippets can seek straight to a line window.
+"""
+import gzip
+import os
+import re
+import struct
+import uuid
+from collections import namedtuple
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+
+
+STREAMS = ("stdout", "stderr")
+
+
+def segment_dir(run):
+    return Path(run.run_dir) / "logs"
+
+
+def segment_paths(run, stream):
+    if not run.run_dir:
+        return []
+
+    folder = segment_dir(run)
+    if not folder.exists():
+        return []
+
+    return sorted(folder.glob(f"{stream}.*.log.gz"))
+
+
+def ensure_run_dir(run):
+    """
+    Older runs (and lint-only runs) may not have a run directory yet.
+    """
+    if not run.run_dir:
+        run.run_dir = os.path.join(settings.MEDIA_ROOT, "runs", uuid.uuid4().hex)
+    os.makedirs(run.run_dir, exist_ok=True)
+
+
+class LogSegmentWriter:
+    """
+    File-like sink for one output stream of a run.
+
+    Text is gzip-compressed into a new segment every
+    EDA_LOG_SEGMENT_BYTES of input. On close() the run's
+    <stream>_bytes / _head / _tail fields are updated; the caller
+    is responsible for saving the run.
+    """
+
+    def __init__(self, run, stream):
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown log stream: {stream}")
+
+        ensure_run_dir(run)
+        segment_dir(run).mkdir(exist_ok=True)
+
+        self.run = run
+        self.stream = stream
+        self.segment_bytes = settings.EDA_LOG_SEGMENT_BYTES
+        self.excerpt_chars = settings.EDA_LOG_EXCERPT_CHARS
+
+        self.index = len(segment_paths(run, stream))
+        self.file = None
+        self.written = 0
+
+        self.nbytes = getattr(run, f"{stream}_bytes") or 0
+        self.head = getattr(run, f"{stream}_head") or ""
+        self.tail = getattr(run, f"{stream}_tail") or ""
+
+    def _open_segment(self):
+        path = segment_dir(self.run) / f"{self.stream}.{self.index:04d}.log.gz"
+        self.file = gzip.open(path, "wb", compresslevel=6)
+        self.written = 0
+        self.index += 1
+
+    def write(self, text):
+        if not text:
+            return
+
+        data = text.encode("utf-8", errors="replace")
+
+        if self.file is None or self.written >= self.segment_bytes:
+            if self.file is not None:
+                self.file.close()
+            self._open_segment()
+
+        self.file.write(data)
+        self.written += len(data)
+        self.nbytes += len(data)
+
+        # Excerpt: first N chars, then a rolling window of the last N
+        room = self.excerpt_chars - len(self.head)
+        if room > 0:
+            self.head += text[:room]
+            text = text[room:]
+        if text:
+            self.tail = (self.tail + text)[-self.excerpt_chars:]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        setattr(self.run, f"{self.stream}_bytes", self.nbytes)
+        setattr(self.run, f"{self.stream}_head", self.head)
+        setattr(self.run, f"{self.stream}_tail", self.tail)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def append_run_output(run, stream, text):
+    with LogSegmentWriter(run, stream) as w:
+        w.write(text)
+
+
+def iter_run_output(run, stream, chunk_size=64 * 1024):
+    """
+    Yield the full output of a stream as decoded text chunks,
+    decompressing one segment at a time.
+    """
+    for path in segment_paths(run, stream):
+        with gzip.open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk.decode("utf-8", errors="replace")
+
+
+def output_excerpt(run, stream):
+    head = getattr(run, f"{stream}_head") or ""
+    tail = getattr(run, f"{stream}_tail") or ""
+    total = getattr(run, f"{stream}_bytes") or 0
+
+    kept = len(head.encode("utf-8")) + len(tail.encode("utf-8"))
+    if kept >= total:
+        return head + tail
+
+    return f"{head}\n\n... [{total - kept} bytes omitted] ...\n\n{tail}"
+
+
+# =====================================================
+# LINE INDEX FOR LOG ARTIFACTS
+# =====================================================
+# <log>.lidx layout: two little-endian uint64 (stride, line count)
+# followed by the byte offset of every `stride`-th line (0, stride, ...).
+# A window read seeks to the nearest checkpoint and skips < stride lines.
+
+_INDEX_HEADER = struct.Struct("<QQ")
+_INDEX_ENTRY = struct.Struct("<Q")
+_NEWLINE = re.compile(b"\n")
+
+
+def line_index_path(log_path):
+    return Path(f"{log_path}.lidx")
+
+
+def build_line_index(log_path, stride=None):
+    stride = stride or settings.EDA_LOG_INDEX_STRIDE
+    log_path = Path(log_path)
+    index_path = line_index_path(log_path)
+    tmp_path = index_path.with_suffix(".lidx.tmp")
+
+    newlines = 0
+    offset = 0
+    last = b""
+
+    with open(log_path, "rb") as src, open(tmp_path, "wb") as out:
+        out.write(_INDEX_HEADER.pack(stride, 0))
+
+        entries = [0]
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+
+            # Every stride-th newline starts a checkpoint line
+            skip = (-newlines - 1) % stride
+            for m in islice(_NEWLINE.finditer(chunk), skip, None, stride):
+                entries.append(offset + m.end())
+
+            newlines += chunk.count(b"\n")
+            offset += len(chunk)
+            last = chunk[-1:]
+
+            out.write(b"".join(_INDEX_ENTRY.pack(e) for e in entries[:-1]))
+            entries = entries[-1:]
+
+        lines = newlines + (1 if last and last != b"\n" else 0)
+
+        # A trailing newline doesn't start another line
+        if lines and entries[0] < offset:
+            out.write(_INDEX_ENTRY.pack(entries[0]))
+
+        out.seek(0)
+        out.write(_INDEX_HEADER.pack(stride, lines))
+
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def _fresh_index(log_path):
+    index_path = line_index_path(log_path)
+    try:
+        if index_path.stat().st_mtime >= Path(log_path).stat().st_mtime:
+            return index_path
+    except FileNotFoundError:
+        pass
+    return build_line_index(log_path)
+
+
+# Lines start..end (1-based, inclusive) actually returned; `clamped`
+# when the requested end was cut to `max_lines`
+LineWindow = namedtuple("LineWindow", "text start end clamped")
+
+
+def read_line_window(log_path, start=None, end=None, max_lines=None):
+    """
+    Read lines start..end (1-based, inclusive) of a log file without
+    reading the rest of it. Missing bounds default to the first
+    `max_lines` (EDA_LOG_SNIPPET_LINES) lines from `start`; longer
+    windows are cut to `max_lines`. Returns a LineWindow with the range
+    that was actually read.
+    """
+    max_lines = max_lines or settings.EDA_LOG_SNIPPET_LINES
+
+    start = max(int(start or 1), 1)
+    end = int(end) if end else start + max_lines - 1
+    clamped = end > start + max_lines - 1
+    end = min(end, start + max_lines - 1)
+
+    if end < start:
+        return LineWindow("", start, start - 1, clamped)
+
+    with open(_fresh_index(log_path), "rb") as idx:
+        stride, total = _INDEX_HEADER.unpack(idx.read(_INDEX_HEADER.size))
+        if start > total:
+            return LineWindow("", start, start - 1, clamped)
+        end = min(end, total)
+
+        checkpoint = (start - 1) // stride
+        idx.seek(_INDEX_HEADER.size + checkpoint * _INDEX_ENTRY.size)
+        (offset,) = _INDEX_ENTRY.unpack(idx.read(_INDEX_ENTRY.size))
+
+    out = []
+    with open(log_path, "rb") as f:
+        f.seek(offset)
+        line_no = checkpoint * stride + 1
+
+        for raw in f:
+            if line_no > end:
+                break
+            if line_no >= start:
+                out.append(raw.decode("utf-8", errors="replace"))
+            line_no += 1
+
+    return LineWindow("".join(out), start, end, clamped)
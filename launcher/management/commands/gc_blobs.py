@@ -0,0 +1,60 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from launcher.models import UploadBlob
+
+
+class Command(BaseCommand):
+    help = "Delete upload blobs no existing run directory links to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep unreferenced blobs used more recently than this",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        freed = 0
+        deleted = 0
+
+        for blob in UploadBlob.objects.prefetch_related("runs"):
+
+            # A reference is a run whose directory still exists
+            refs = sum(
+                1 for run in blob.runs.all()
+                if run.run_dir and os.path.isdir(run.run_dir)
+            )
+
+            if refs or blob.last_used_at > cutoff:
+                continue
+
+            if not options["dry_run"]:
+                # Uploaded or linked again since it was read → keep it
+                removed, _ = UploadBlob.objects.filter(pk=blob.pk, last_used_at__lte=cutoff).delete()
+                if not removed:
+                    continue
+
+                path = blob.absolute_path()
+                if path.exists():
+                    os.chmod(path, 0o644)
+                    path.unlink()
+
+            self.stdout.write(f"Reclaim {blob} ({blob.size} bytes)")
+            freed += blob.size
+            deleted += 1
+
+        verb = "Would free" if options["dry_run"] else "Freed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {freed} bytes from {deleted} blob(s)"
+        ))
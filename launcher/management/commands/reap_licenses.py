@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from launcher.licenses import reap_expired
+
+
+class Command(BaseCommand):
+    help = "Reclaim license seats whose lease expired (holder stopped heartbeating)"
+
+    def handle(self, *args, **options):
+        reclaimed = reap_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclaimed {reclaimed} expired license lease(s)"
+        ))
@@ -0,0 +1,139 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from launcher.klayout_pool import stop_all
+from launcher.exports import requeue_orphaned_exports
+from launcher.layout_tiles import requeue_orphaned_tiles, run_tile_worker_loop
+from launcher.licenses import reap_expired
+from launcher.services import requeue_orphaned_runs, run_worker_loop
+from launcher.waveform import requeue_orphaned_index_jobs
+
+
+def _interrupt(signum, frame):
+    # SIGTERM takes the same cleanup path as Ctrl+C
+    raise KeyboardInterrupt
+
+
+class Command(BaseCommand):
+    help = "Run a pool of background workers that execute queued ToolRuns"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.EDA_WORKER_COUNT,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--tile-workers",
+            type=int,
+            default=settings.EDA_TILE_WORKER_COUNT,
+            help="Number of worker processes that only render layout tiles",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.EDA_WORKER_POLL_INTERVAL,
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--child",
+            action="store_true",
+            help="Internal: run a single worker loop in this process",
+        )
+        parser.add_argument(
+            "--tiles",
+            action="store_true",
+            help="Internal: with --child, render layout tiles only",
+        )
+
+    def handle(self, *args, **options):
+        host = socket.gethostname()
+        signal.signal(signal.SIGTERM, _interrupt)
+
+        if options["child"]:
+            worker_id = f"{host}:{os.getpid()}"
+            try:
+                if options["tiles"]:
+                    run_tile_worker_loop(worker_id)
+                else:
+                    run_worker_loop(worker_id, poll_interval=options["poll_interval"])
+            except KeyboardInterrupt:
+                pass
+            finally:
+                # Or the KLayout processes outlive the worker
+                stop_all()
+            return
+
+        # One pool per host: anything still "running" under this host
+        # belongs to a previous pool that is gone.
+        requeued = requeue_orphaned_runs(host=host)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} orphaned run(s)"))
+        requeued = requeue_orphaned_exports(host=host)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} orphaned export(s)"))
+        requeue_orphaned_tiles(host=host)
+        requeue_orphaned_index_jobs(host=host)
+
+        cmd = [
+            sys.executable, os.path.abspath(sys.argv[0]), "run_workers",
+            "--child", "--poll-interval", str(options["poll_interval"]),
+        ]
+
+        # Tile workers stay free for interactive viewers while runs take minutes
+        cmds = [cmd] * options["workers"] + [cmd + ["--tiles"]] * options["tile_workers"]
+
+        procs = [subprocess.Popen(c) for c in cmds]
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {options['workers']} worker(s) and {options['tile_workers']} tile worker(s)"
+        ))
+
+        next_reap = 0
+
+        try:
+            while True:
+                time.sleep(1)
+
+                # License seats whose holder stopped heartbeating
+                if time.monotonic() >= next_reap:
+                    next_reap = time.monotonic() + settings.EDA_LICENSE_REAP_INTERVAL
+                    reclaimed = reap_expired()
+                    if reclaimed:
+                        self.stdout.write(self.style.WARNING(
+                            f"Reclaimed {reclaimed} expired license lease(s)"
+                        ))
+
+                for i, proc in enumerate(procs):
+                    if proc.poll() is None:
+                        continue
+
+                    # Worker died: release its run and restart it
+                    requeue_orphaned_runs(worker_id=f"{host}:{proc.pid}")
+                    requeue_orphaned_exports(worker_id=f"{host}:{proc.pid}")
+                    requeue_orphaned_tiles(worker_id=f"{host}:{proc.pid}")
+                    requeue_orphaned_index_jobs(worker_id=f"{host}:{proc.pid}")
+                    self.stdout.write(self.style.WARNING(
+                        f"Worker {proc.pid} exited ({proc.returncode}), restarting"
+                    ))
+                    procs[i] = subprocess.Popen(cmds[i])
+
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+
+        finally:
+            for proc in procs:
+                if proc.poll() is None:
+                    proc.terminate()
+            for proc in procs:
+                try:
+                    proc.wait(timeout=30)
+                except (subprocess.TimeoutExpired, KeyboardInterrupt):
+                    proc.kill()
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolrun',
+            name='job_args',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='job_type',
+            field=models.CharField(blank=True, help_text='Worker handler key, e.g. klayout / verilator', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='worker_id',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='toolrun',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], default='running', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='toolrun',
+            index=models.Index(fields=['status', 'created_at'], name='launcher_to_status_bdc48d_idx'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:05
+
+import gzip
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of logstore's segment layout as of this migration, so
+# later changes to LogSegmentWriter don't change what it does
+SEGMENT_BYTES = 8 * 1024 * 1024
+EXCERPT_CHARS = 4000
+STREAMS = ("stdout", "stderr")
+
+
+def _segments(run_dir, stream):
+    folder = Path(run_dir) / "logs"
+    return sorted(folder.glob(f"{stream}.*.log.gz")) if folder.is_dir() else []
+
+
+def move_output_to_segments(apps, schema_editor):
+    ToolRun = apps.get_model("launcher", "ToolRun")
+
+    runs = ToolRun.objects.exclude(stdout="", stderr="")
+    for run in runs.iterator():
+        if not run.run_dir:
+            run.run_dir = os.path.join(settings.MEDIA_ROOT, "runs", uuid.uuid4().hex)
+        folder = Path(run.run_dir) / "logs"
+        folder.mkdir(parents=True, exist_ok=True)
+
+        for stream in STREAMS:
+            text = getattr(run, stream)
+            if not text:
+                continue
+
+            data = text.encode("utf-8", errors="replace")
+            first = len(_segments(run.run_dir, stream))
+            for i, pos in enumerate(range(0, len(data), SEGMENT_BYTES)):
+                with gzip.open(folder / f"{stream}.{first + i:04d}.log.gz", "wb", compresslevel=6) as f:
+                    f.write(data[pos:pos + SEGMENT_BYTES])
+
+            setattr(run, f"{stream}_bytes", len(data))
+            setattr(run, f"{stream}_head", text[:EXCERPT_CHARS])
+            setattr(run, f"{stream}_tail", text[EXCERPT_CHARS:][-EXCERPT_CHARS:])
+        run.save()
+
+
+def restore_output_from_segments(apps, schema_editor):
+    ToolRun = apps.get_model("launcher", "ToolRun")
+
+    for run in ToolRun.objects.exclude(run_dir="").iterator():
+        changed = False
+        for stream in STREAMS:
+            parts = []
+            for path in _segments(run.run_dir, stream):
+                with gzip.open(path, "rb") as f:
+                    parts.append(f.read())
+            if parts:
+                setattr(run, stream, b"".join(parts).decode("utf-8", errors="replace"))
+                changed = True
+        if changed:
+            run.save(update_fields=list(STREAMS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0002_toolrun_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolrun',
+            name='stderr_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='stderr_head',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='stderr_tail',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='stdout_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='stdout_head',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='stdout_tail',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(move_output_to_segments, restore_output_from_segments),
+        migrations.RemoveField(
+            model_name='toolrun',
+            name='stderr',
+        ),
+        migrations.RemoveField(
+            model_name='toolrun',
+            name='stdout',
+        ),
+    ]
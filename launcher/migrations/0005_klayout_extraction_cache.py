@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0004_upload_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('gds_sha256', models.CharField(db_index=True, max_length=64)),
+                ('script_version', models.CharField(max_length=32)),
+                ('render_size', models.IntegerField()),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0005_klayout_extraction_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tool',
+            name='render_parallelism',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0006_tool_render_parallelism'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layoutmetadata',
+            name='cells',
+            field=models.JSONField(blank=True, help_text='Per-cell instances, placements, shapes and bbox', null=True),
+        ),
+        migrations.AddField(
+            model_name='layoutmetadata',
+            name='top_cell',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='LayerStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.IntegerField()),
+                ('datatype', models.IntegerField()),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('shape_count', models.BigIntegerField(default=0)),
+                ('area', models.FloatField(default=0, help_text='Drawn area in um^2')),
+                ('bbox', models.JSONField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='layer_stats', to='launcher.toolrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['layer', 'datatype'], name='launcher_la_layer_18eaae_idx'), models.Index(fields=['shape_count'], name='launcher_la_shape_c_6053df_idx'), models.Index(fields=['area'], name='launcher_la_area_4f3bd9_idx')],
+                'unique_together': {('run', 'layer', 'datatype')},
+            },
+        ),
+    ]
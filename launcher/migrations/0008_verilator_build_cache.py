@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0007_layout_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerilatorBuildEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('top_module', models.CharField(max_length=255)),
+                ('flags', models.TextField(blank=True)),
+                ('sim_main_version', models.CharField(max_length=32)),
+                ('source_sha256', models.CharField(blank=True, max_length=64)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('build_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='build_cache',
+            field=models.CharField(blank=True, choices=[('hit', 'Hit'), ('incremental', 'Incremental rebuild'), ('miss', 'Miss')], max_length=12),
+        ),
+    ]
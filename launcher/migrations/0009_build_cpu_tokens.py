@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0008_verilator_build_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildTokenPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('in_use', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='build_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='build_wait_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='toolrun',
+            name='build_waiting_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
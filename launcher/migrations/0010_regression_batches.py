@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0009_build_cpu_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolrun',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='launcher.toolrun'),
+        ),
+        migrations.AlterField(
+            model_name='toolrun',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('waiting', 'Waiting for child runs'), ('success', 'Success'), ('failed', 'Failed')], default='running', max_length=20),
+        ),
+    ]
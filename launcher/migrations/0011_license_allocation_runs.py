@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0010_regression_batches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licenseallocation',
+            name='released_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='licenseallocation',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='license_allocations', to='launcher.toolrun'),
+        ),
+        migrations.AddIndex(
+            model_name='licenseallocation',
+            index=models.Index(fields=['license', 'status'], name='launcher_li_license_451417_idx'),
+        ),
+    ]
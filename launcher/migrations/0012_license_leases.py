@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0011_license_allocation_runs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licenseallocation',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='licenseallocation',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='launcher_li_status_8fe9e0_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0012_license_leases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresentationExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('pptx', 'PPTX')], max_length=10)),
+                ('revision', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('ready', 'Ready'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('worker_id', models.CharField(blank=True, default='', max_length=100)),
+                ('error', models.TextField(blank=True, default='')),
+                ('file_path', models.CharField(blank=True, default='', max_length=500)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('presentation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to='launcher.presentation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='launcher_pr_status_eab737_idx')],
+                'unique_together': {('presentation', 'format', 'revision')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0013_presentation_exports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LayoutTileSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('gds_sha256', models.CharField(db_index=True, max_length=64)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('tile_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LayoutTileJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('z', models.IntegerField()),
+                ('x', models.IntegerField()),
+                ('y', models.IntegerField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('worker_id', models.CharField(blank=True, default='', max_length=100)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tile_jobs', to='launcher.uploadblob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='launcher_la_status_3d9200_idx')],
+                'unique_together': {('blob', 'z', 'x', 'y')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0014_layout_tile_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaveformIndexJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('worker_id', models.CharField(blank=True, default='', max_length=100)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('run', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waveform_index_job', to='launcher.toolrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='launcher_wa_status_60a3c5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0015_waveform_index_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentationexport',
+            name='superseded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='launcher.presentationexport'),
+        ),
+        migrations.AlterField(
+            model_name='presentationexport',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('ready', 'Ready'), ('failed', 'Failed'), ('superseded', 'Superseded')], default='queued', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0016_presentation_export_superseded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolrun',
+            name='post_run_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
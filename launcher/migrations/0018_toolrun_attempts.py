@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0017_toolrun_post_run_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolrun',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
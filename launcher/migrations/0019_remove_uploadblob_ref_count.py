@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('launcher', '0018_toolrun_attempts'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='uploadblob',
+            name='ref_count',
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from pathlib import Path
 import uuid
 
 
@@ -47,6 +49,10 @@ class Tool(models.Model):
     icon = models.CharField(max_length=200, blank=True, null=True)
     visible = models.BooleanField(default=True)
 
+    # KLayout processes rendering preview regions in parallel
+    # (0 → EDA_KLAYOUT_RENDER_PARALLELISM)
+    render_parallelism = models.PositiveSmallIntegerField(default=0)
+
     def __str__(self):
         return self.name
 
@@ -86,6 +92,25 @@ class LicenseAllocation(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS, default='active')
 
+    # Job holding the seat (None for desktop sessions), see licenses.py
+    run = models.ForeignKey(
+        'ToolRun',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='license_allocations'
+    )
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    # Renewed by the holder's heartbeat; expired leases are reclaimed
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['license', 'status']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
     def __str__(self):
         return f"{self.license.tool.name} → {self.user}"
 
@@ -163,9 +188,33 @@ class LayoutMetadata(models.Model):
     def __str__(self):
         return f"Layout metadata for run {self.run.id}"
 """
+# =====================================================
+# CONTENT-ADDRESSED UPLOADS (see blobstore.py)
+# =====================================================
+class UploadBlob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+
+    # MUST be relative to MEDIA_ROOT
+    file_path = models.CharField(max_length=500)
+    original_name = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Refreshed by every upload and link (gc_blobs grace window)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    def absolute_path(self):
+        return settings.MEDIA_ROOT / self.file_path
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.original_name})"
+
+
 class ToolRun(models.Model):
     STATUS = [
+        ("queued", "Queued"),
         ("running", "Running"),
+        ("waiting", "Waiting for child runs"),
         ("success", "Success"),
         ("failed", "Failed"),
     ]
@@ -184,6 +233,13 @@ class ToolRun(models.Model):
     )
 
     input_file = models.CharField(max_length=255, blank=True)
+    input_blob = models.ForeignKey(
+        UploadBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="runs"
+    )
     run_dir = models.CharField(max_length=500,blank=True,default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -195,13 +251,227 @@ class ToolRun(models.Model):
         default="running"
     )
 
-    stdout = models.TextField(blank=True)
-    stderr = models.TextField(blank=True)
+    # -------------------------
+    # Output (full logs: <run_dir>/logs/*.log.gz, see logstore.py)
+    # -------------------------
+    stdout_bytes = models.BigIntegerField(default=0)
+    stderr_bytes = models.BigIntegerField(default=0)
+    stdout_head = models.TextField(blank=True)
+    stdout_tail = models.TextField(blank=True)
+    stderr_head = models.TextField(blank=True)
+    stderr_tail = models.TextField(blank=True)
+
+    # -------------------------
+    # Background job queue
+    # -------------------------
+    job_type = models.CharField(
+        max_length=30,
+        blank=True,
+        help_text="Worker handler key, e.g. klayout / verilator"
+    )
+    job_args = models.JSONField(default=dict, blank=True)
+    worker_id = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    # Times a worker claimed the run (see requeue_orphaned_runs)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Finished outside the workers (extraction cache hit): a worker
+    # still owes it the post-run stage (services.post_run)
+    post_run_pending = models.BooleanField(default=False, db_index=True)
+
+    # Verilator build cache outcome (see verilator_build.py)
+    BUILD_CACHE = [
+        ("hit", "Hit"),
+        ("incremental", "Incremental rebuild"),
+        ("miss", "Miss"),
+    ]
+    build_cache = models.CharField(max_length=12, choices=BUILD_CACHE, blank=True)
+
+    # CPU tokens held while compiling (see build_tokens.py)
+    build_tokens = models.IntegerField(default=0)
+    build_waiting_since = models.DateTimeField(null=True, blank=True)
+    build_wait_seconds = models.FloatField(null=True, blank=True)
+
+    # Regression batches: one parent (job_type verilator_batch) rolls up
+    # the pass / fail results of its child simulations
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="children"
+    )
+
+    # Log files tailed by /run/<id>/stream/, in order of preference
+    LIVE_LOG_NAMES = ("run.log", "klayout.log")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def stdout_excerpt(self):
+        from .logstore import output_excerpt
+        return output_excerpt(self, "stdout")
+
+    def stderr_excerpt(self):
+        from .logstore import output_excerpt
+        return output_excerpt(self, "stderr")
+
+    def live_log_path(self):
+        """
+        Log file the running job is writing to (None until it exists)
+        """
+        if not self.run_dir:
+            return None
+
+        for name in self.LIVE_LOG_NAMES:
+            path = Path(self.run_dir) / name
+            if path.exists():
+                return path
+
+        return None
 
     def __str__(self):
         return f"{self.tool.name} run @ {self.created_at}"
 
 
+# =====================================================
+# KLAYOUT EXTRACTION CACHE (see klayout_cache.py)
+# =====================================================
+class ExtractionCacheEntry(models.Model):
+    # sha256 of (gds hash, script version, render size)
+    key = models.CharField(max_length=64, unique=True)
+
+    gds_sha256 = models.CharField(max_length=64, db_index=True)
+    script_version = models.CharField(max_length=32)
+    render_size = models.IntegerField()
+
+    size_bytes = models.BigIntegerField(default=0)
+    hit_count = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"KLayout cache {self.gds_sha256[:12]} @ {self.render_size}px"
+
+
+class LayoutTileSet(models.Model):
+    # Tile pyramid folder of one GDS (klayout_cache.tile_key), counted
+    # against EDA_KLAYOUT_CACHE_BYTES together with extraction entries
+    key = models.CharField(max_length=64, unique=True)
+    gds_sha256 = models.CharField(max_length=64, db_index=True)
+
+    size_bytes = models.BigIntegerField(default=0)
+    tile_count = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Tiles {self.gds_sha256[:12]} ({self.tile_count})"
+
+
+class LayoutTileJob(models.Model):
+    # One missing tile queued for a tile worker (see layout_tiles.py);
+    # the row is deleted once the PNG is written
+    STATUS = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("failed", "Failed"),
+    ]
+
+    blob = models.ForeignKey(UploadBlob, on_delete=models.CASCADE, related_name="tile_jobs")
+    z = models.IntegerField()
+    x = models.IntegerField()
+    y = models.IntegerField()
+
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    worker_id = models.CharField(max_length=100, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("blob", "z", "x", "y")
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Tile {self.z}/{self.x}/{self.y} of {self.blob_id[:12]} ({self.status})"
+
+
+# =====================================================
+# VERILATOR BUILD CACHE (see verilator_build.py)
+# =====================================================
+class VerilatorBuildEntry(models.Model):
+    # sha256 of (top module, flags, sim_main.cpp version) → one obj_dir
+    key = models.CharField(max_length=64, unique=True)
+
+    top_module = models.CharField(max_length=255)
+    flags = models.TextField(blank=True)
+    sim_main_version = models.CharField(max_length=32)
+
+    # Normalised source hash the obj_dir was last built from
+    source_sha256 = models.CharField(max_length=64, blank=True)
+
+    size_bytes = models.BigIntegerField(default=0)
+    hit_count = models.IntegerField(default=0)
+    build_count = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Verilator build {self.top_module} ({self.key[:12]})"
+
+
+class BuildTokenPool(models.Model):
+    """
+    CPU tokens handed out to concurrent compiles (see build_tokens.py)
+    """
+    name = models.CharField(max_length=50, unique=True)
+    in_use = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.in_use} tokens in use"
+
+
+# =====================================================
+# WAVEFORM INDEX JOBS (see waveform.py)
+# =====================================================
+class WaveformIndexJob(models.Model):
+    # (Re)index of a run's waveform for the viewer, for runs the
+    # simulation worker didn't index (older runs, INDEX_VERSION bumps);
+    # the row is deleted once the index is written
+    STATUS = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("failed", "Failed"),
+    ]
+
+    run = models.OneToOneField(ToolRun, on_delete=models.CASCADE, related_name="waveform_index_job")
+
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    worker_id = models.CharField(max_length=100, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Waveform index of run {self.run_id} ({self.status})"
+
+
 # =====================================================
 # KLAYOUT METADATA (PHASE 2)
 # =====================================================
@@ -227,6 +497,14 @@ class LayoutMetadata(models.Model):
         help_text="List of layers"
     )
 
+    top_cell = models.CharField(max_length=255, blank=True)
+
+    cells = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Per-cell instances, placements, shapes and bbox"
+    )
+
     png_preview = models.CharField(
         max_length=255,
         blank=True,
@@ -235,6 +513,37 @@ class LayoutMetadata(models.Model):
 
     def __str__(self):
         return f"Layout metadata for run {self.run.id}"
+
+
+class LayerStatistic(models.Model):
+    """
+    One row per (run, GDS layer) so layers can be sorted / filtered
+    across runs without reopening GDS files.
+    """
+    run = models.ForeignKey(
+        ToolRun,
+        on_delete=models.CASCADE,
+        related_name="layer_stats"
+    )
+
+    layer = models.IntegerField()
+    datatype = models.IntegerField()
+    name = models.CharField(max_length=255, blank=True)
+
+    shape_count = models.BigIntegerField(default=0)
+    area = models.FloatField(default=0, help_text="Drawn area in um^2")
+    bbox = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("run", "layer", "datatype")
+        indexes = [
+            models.Index(fields=["layer", "datatype"]),
+            models.Index(fields=["shape_count"]),
+            models.Index(fields=["area"]),
+        ]
+
+    def __str__(self):
+        return f"{self.layer}/{self.datatype} (run {self.run_id})"
     
 # =====================================================
 # DESIGN REVIEW / PRESENTATION MODEL
@@ -328,7 +637,6 @@ class Slide(models.Model):
     def __str__(self):
         return f"{self.presentation.title} - Slide {self.order}"
 
-from django.conf import settings
 
 class RunArtifact(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -407,3 +715,56 @@ class SlideItem(models.Model):
 
     def __str__(self):
         return f"{self.item_type} on {self.slide}"
+
+
+# =====================================================
+# Presentation exports (PDF / PPTX, see exports.py)
+# =====================================================
+class PresentationExport(models.Model):
+    STATUS = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    ]
+
+    presentation = models.ForeignKey(
+        Presentation,
+        on_delete=models.CASCADE,
+        related_name='exports'
+    )
+    format = models.CharField(max_length=10, choices=[('pdf', 'PDF'), ('pptx', 'PPTX')])
+
+    # sha256 of everything the file is rendered from
+    revision = models.CharField(max_length=64)
+
+    status = models.CharField(max_length=20, choices=STATUS, default='queued')
+    worker_id = models.CharField(max_length=100, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+
+    # MUST be relative to MEDIA_ROOT
+    file_path = models.CharField(max_length=500, blank=True, default='')
+    size = models.BigIntegerField(null=True, blank=True)
+
+    # Newer export of the same deck once this revision's file is gone
+    superseded_by = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('presentation', 'format', 'revision')
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.presentation} {self.format} @ {self.revision[:12]} ({self.status})"
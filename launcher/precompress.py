@@ -0,0 +1,129 @@
+"""
+Precompressed .br / .gz siblings of text run outputs.
+
+After a run finishes, its compressible artifacts (metadata, logs,
+reports) plus run.log and wave.vcd get <name>.br (brotli) and
+<name>.gz (zopfli) written next to them. serve_upload picks one from
+Accept-Encoding (fileserve.negotiate) so nothing is compressed at
+request time.
+
+A sibling carries its source's mtime and is only used while the two
+still match, so a rewritten file falls back to the plain copy until it
+is compressed again. Files above EDA_PRECOMPRESS_MAX_EFFORT_BYTES are
+compressed in a streaming pass (brotli quality 5, zlib gzip -9) since
+zopfli and brotli 11 need the whole file in memory and minutes per GB.
+Siblings that don't save at least 10% are not kept. A fresh
+wave.vcd.gz is therefore known to be an encoding of wave.vcd, not a
+vcd.gz simulator output (waveform.find_waveform skips it).
+"""
+import os
+import uuid
+import zlib
+from pathlib import Path
+
+import brotli
+import zopfli.gzip
+from django.conf import settings
+
+
+# RunArtifact.artifact_type values worth compressing
+COMPRESSIBLE_TYPES = ("metadata", "log", "report")
+
+TEXT_SUFFIXES = {".json", ".log", ".txt", ".rpt", ".csv", ".vcd", ".html", ".svg"}
+
+# Run outputs that aren't registered as artifacts
+RUN_TEXT_FILES = ("run.log", "wave.vcd")
+
+# Content-Encoding → sibling suffix, in preference order
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CHUNK = 1024 * 1024
+
+
+def sibling(path, suffix):
+    return Path(f"{path}{suffix}")
+
+
+def fresh_sibling(path, st, suffix):
+    """
+    The sibling of `path` if it was compressed from the current copy.
+    """
+    candidate = sibling(path, suffix)
+    try:
+        return candidate if os.stat(candidate).st_mtime_ns == st.st_mtime_ns else None
+    except OSError:
+        return None
+
+
+def _compressor(suffix):
+    # (feed, finish) of a streaming compressor
+    if suffix == ".br":
+        c = brotli.Compressor(quality=5)
+        return c.process, c.finish
+    c = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return c.compress, c.flush
+
+
+def _write_sibling(path, st, suffix):
+    target = sibling(path, suffix)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(path, "rb") as src, open(tmp, "wb") as out:
+            if st.st_size <= settings.EDA_PRECOMPRESS_MAX_EFFORT_BYTES:
+                data = src.read()
+                if suffix == ".br":
+                    out.write(brotli.compress(data, quality=settings.EDA_PRECOMPRESS_BROTLI_QUALITY))
+                else:
+                    out.write(zopfli.gzip.compress(data))
+            else:
+                feed, finish = _compressor(suffix)
+                for chunk in iter(lambda: src.read(CHUNK), b""):
+                    out.write(feed(chunk))
+                out.write(finish())
+
+        if os.path.getsize(tmp) > st.st_size * 0.9:
+            target.unlink(missing_ok=True)
+            return False
+
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+        return True
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def compress_file(path):
+    """
+    Write the missing or stale siblings of one file. Returns how many
+    were written.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0
+
+    if Path(path).suffix.lower() not in TEXT_SUFFIXES:
+        return 0
+    if not settings.EDA_PRECOMPRESS_MIN_BYTES <= st.st_size <= settings.EDA_PRECOMPRESS_MAX_BYTES:
+        return 0
+
+    return sum(
+        _write_sibling(path, st, suffix)
+        for _, suffix in ENCODINGS
+        if fresh_sibling(path, st, suffix) is None
+    )
+
+
+def precompress_run(run):
+    """
+    Post-run stage: compress the run's text artifacts and outputs.
+    """
+    paths = {
+        Path(artifact.absolute_path())
+        for artifact in run.artifacts.filter(artifact_type__in=COMPRESSIBLE_TYPES)
+    }
+    if run.run_dir:
+        paths |= {Path(run.run_dir) / name for name in RUN_TEXT_FILES}
+
+    return sum(compress_file(path) for path in sorted(paths))
@@ -0,0 +1,173 @@
+"""
+Downscaled renditions of image artifacts (layout previews).
+
+Previews are rendered at 2000 px or more; a deck embedding them as-is
+grows by megabytes per slide. Each image RunArtifact gets:
+
+    thumb   320 px          listings (media_extras.rendition_url)
+    slide   1280 px         detail.html canvas, PPTX (10 in wide)
+    print   1500x1080 PNG   PDF (page width / 520 px box at ~200 dpi)
+
+thumb and slide are written as JPEG or PNG, whichever is smaller.
+
+Renditions are built by workers only: the post-run stage
+(services.post_run) builds all of them, exports build what they embed.
+Pages never run Pillow; until a rendition exists they link the
+original (existing_rendition).
+
+They live under MEDIA_ROOT/cache/renditions/<artifact>/<state>/, with
+<artifact> a hash of the source path and <state> one of its mtime,
+size and RENDITION_VERSION. A changed preview gets new files (and URLs,
+which serve_upload caches as immutable), and writing them removes the
+artifact's older states.
+"""
+import hashlib
+import io
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+
+# Bump when sizes / encoding change
+RENDITION_VERSION = "1"
+
+# name → (max width, max height, candidate formats; the smallest wins)
+RENDITIONS = {
+    "thumb": (320, 320, ("JPEG", "PNG")),
+    "slide": (1280, 1280, ("JPEG", "PNG")),
+    "print": (1500, 1080, ("PNG",)),
+}
+
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png"}
+
+
+def _source(artifact):
+    return Path(settings.MEDIA_ROOT) / artifact.file_path
+
+
+def _artifact_dir(artifact):
+    key = hashlib.sha256(artifact.file_path.encode()).hexdigest()
+    return f"cache/renditions/{key}"
+
+
+def rendition_dir(artifact):
+    """
+    Folder (relative to MEDIA_ROOT) of the renditions of the artifact's
+    current file, or None when the source image is missing.
+    """
+    try:
+        st = os.stat(_source(artifact))
+    except OSError:
+        return None
+
+    state = hashlib.sha256(f"{st.st_mtime_ns}:{st.st_size}:{RENDITION_VERSION}".encode()).hexdigest()
+    return f"{_artifact_dir(artifact)}/{state[:32]}"
+
+
+def _prune(folder):
+    # Renditions of earlier versions of the same source file
+    for old in folder.parent.iterdir():
+        if old.name != folder.name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _flatten(img):
+    # JPEG has no alpha: composite onto white like the slide background
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _encode(img, fmt):
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        _flatten(img).save(
+            out,
+            "JPEG",
+            quality=settings.EDA_RENDITION_JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    else:
+        img.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def _write(source, folder, name):
+    """
+    Downscale once, encode in each candidate format and keep the
+    smallest: flat layout art is often smaller as PNG than as JPEG.
+    """
+    width, height, formats = RENDITIONS[name]
+
+    with Image.open(source) as img:
+        img.draft("RGB", (width, height))
+        img.thumbnail((width, height), Image.Resampling.LANCZOS)
+        data, fmt = min(((_encode(img, f), f) for f in formats), key=lambda c: len(c[0]))
+
+    dest = folder / f"{name}.{EXTENSIONS[fmt]}"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    _prune(folder)
+    return dest
+
+
+def existing_rendition(artifact, name):
+    """
+    Path of the rendition relative to MEDIA_ROOT if it has been built,
+    else the original file. Never builds (safe in requests).
+    """
+    rel = rendition_dir(artifact)
+    if rel is None:
+        return artifact.file_path
+
+    folder = Path(settings.MEDIA_ROOT) / rel
+    for fmt in RENDITIONS[name][2]:
+        if (folder / f"{name}.{EXTENSIONS[fmt]}").exists():
+            return f"{rel}/{name}.{EXTENSIONS[fmt]}"
+
+    return artifact.file_path
+
+
+def rendition(artifact, name):
+    """
+    Path of the rendition relative to MEDIA_ROOT, built if needed
+    (workers only). Falls back to the original file when it can't be
+    built (missing, or not an image Pillow can read).
+    """
+    found = existing_rendition(artifact, name)
+    if found != artifact.file_path:
+        return found
+
+    rel = rendition_dir(artifact)
+    if rel is None:
+        return artifact.file_path
+
+    try:
+        dest = _write(_source(artifact), Path(settings.MEDIA_ROOT) / rel, name)
+    except (OSError, Image.DecompressionBombError):
+        return artifact.file_path
+
+    return f"{rel}/{dest.name}"
+
+
+def build_all(artifact):
+    """
+    Every rendition of an image artifact (post-run stage, see
+    services.post_run).
+    """
+    return {name: rendition(artifact, name) for name in RENDITIONS}
@@ -13,13 +13,22 @@ class ToolSerializer(serializers.ModelSerializer):
         fields = ['id','name','display_name','type','launcher_cmd','env_template','icon','license_server_id','envs']
 
 class LicenseSerializer(serializers.ModelSerializer):
+    """
+    Expects licenses.pools_with_holders(): holders come from the
+    prefetched active_allocations, held is an annotation.
+    """
+    tool_name = serializers.CharField(source='tool.name', read_only=True)
+    held = serializers.IntegerField(read_only=True)
     holders = serializers.SerializerMethodField()
     class Meta:
         model = License
-        fields = ['id','tool','license_key','pool_size','expiry_date','server_info','status','holders']
+        fields = ['id','tool','tool_name','pool_size','active_count','held','expiry_date','status','holders']
 
     def get_holders(self, obj):
-        return [alloc.user.username for alloc in obj.allocations.filter(status='active') if alloc.user]
+        return [
+            {'user': alloc.user.username if alloc.user else None, 'run_id': alloc.run_id, 'since': alloc.started_at}
+            for alloc in obj.active_allocations
+        ]
 
 from rest_framework import serializers
 from .models import SlideItem, RunArtifact
@@ -1,9 +1,21 @@
-from .models import ToolRun
+from .models import ToolRun, RunArtifact, Presentation, Slide, SlideItem, LayoutMetadata, LayerStatistic
+from .blobstore import link_file
+from . import build_tokens, exports, klayout_cache, klayout_pool, licenses, precompress, renditions, verilator_build, waveform
+from .logstore import LogSegmentWriter, append_run_output, build_line_index, read_line_window
+import io
+import json
+import math
 import uuid
 import subprocess
 import os
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
 
 
 def execute_tool_run(*, tool, user, upload_filename):
@@ -14,7 +26,7 @@ def execute_tool_run(*, tool, user, upload_filename):
     os.makedirs(run_dir, exist_ok=True)
 
     source = os.path.join(base, "uploads", upload_filename)
-    shutil.copy(source, run_dir)
+    link_file(source, os.path.join(run_dir, os.path.basename(upload_filename)))
 
     log_file = os.path.join(run_dir, "run.log")
 
@@ -35,11 +47,8 @@ def execute_tool_run(*, tool, user, upload_filename):
         text=True
     )
 
-    stdout, stderr = proc.communicate()
-
-    with open(log_file, "w") as f:
-        f.write("STDOUT:\n" + (stdout or ""))
-        f.write("\n\nSTDERR:\n" + (stderr or ""))
+    with LogSegmentWriter(run, "stdout") as out, LogSegmentWriter(run, "stderr") as err:
+        stream_process(proc, log_file, sinks=(out, err))
 
     run.status = "success" if proc.returncode == 0 else "failed"
     run.log_path = f"/uploads/runs/{run_id}/run.log"
@@ -47,8 +56,922 @@ def execute_tool_run(*, tool, user, upload_filename):
 
     return {
         "ok": True,
-        "stdout": stdout,
-        "stderr": stderr,
+        "stdout": run.stdout_excerpt(),
+        "stderr": run.stderr_excerpt(),
         "log_path": run.log_path,
         "run_id": str(run_id),
     }
+
+
+# =====================================================
+# PATH / SHELL HELPERS
+# =====================================================
+
+def wsl_path(p):
+    """
+    Windows → WSL path (C:\\foo → /mnt/c/foo)
+    """
+    return "/mnt/c" + p.replace("C:", "").replace("\\", "/")
+
+
+def windows_to_wsl(path):
+    path = path.replace("\\", "/")
+    if path[1:3] == ":/":
+        drive = path[0].lower()
+        return f"/mnt/{drive}{path[2:]}"
+    return path
+
+
+def stream_process(proc, log_path, timeout=None, sinks=None):
+    """
+    Copy a process' stdout/stderr line by line into `log_path` while it
+    runs (so /run/<id>/stream/ can tail it) and into `sinks`, a
+    (stdout, stderr) pair of writable objects. Returns the sinks;
+    by default two StringIO buffers.
+    """
+    out_sink, err_sink = sinks or (io.StringIO(), io.StringIO())
+    lock = threading.Lock()
+
+    with open(log_path, "a", encoding="utf-8", errors="replace") as log:
+
+        def pump(pipe, sink):
+            for line in pipe:
+                sink.write(line)
+                with lock:
+                    log.write(line)
+                    log.flush()
+            pipe.close()
+
+        pumps = [
+            threading.Thread(target=pump, args=(proc.stdout, out_sink), daemon=True),
+            threading.Thread(target=pump, args=(proc.stderr, err_sink), daemon=True),
+        ]
+        for t in pumps:
+            t.start()
+
+        timed_out = False
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            timed_out = True
+
+        for t in pumps:
+            t.join()
+
+        if timed_out:
+            err_sink.write("\n[ERROR] Command timed out")
+            log.write("\n[ERROR] Command timed out\n")
+
+    return out_sink, err_sink
+
+
+def run_bash(command, cwd=None, timeout=300, log_path=None):
+    """
+    Execute a shell command and return (stdout, stderr).
+    With `log_path`, output is also appended to that file as it arrives.
+    """
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        text=True
+    )
+
+    if log_path:
+        out, err = stream_process(proc, log_path, timeout=timeout)
+        return out.getvalue(), err.getvalue()
+
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate()
+        stderr += "\n[ERROR] Command timed out"
+
+    return stdout, stderr
+
+
+# =====================================================
+# BACKGROUND JOB QUEUE (DB BACKED)
+# =====================================================
+# Views only create a ToolRun in "queued" state and return its id.
+# `manage.py run_workers` processes claim queued rows one at a time
+# with a conditional UPDATE, so several workers never run the same job.
+
+def enqueue_run(*, tool, user, job_type, input_file="", input_blob=None, run_dir="", job_args=None):
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    return ToolRun.objects.create(
+        tool=tool,
+        user=user,
+        input_file=input_file,
+        input_blob=input_blob,
+        run_dir=run_dir,
+        status="queued",
+        job_type=job_type,
+        job_args=job_args or {},
+    )
+
+
+def claim_next_run(worker_id):
+    """
+    Atomically move the oldest queued run to "running".
+    Runs of licensed tools wait in their license queue until a seat is
+    free and it's their turn (licenses.claimable_runs).
+    Returns the claimed ToolRun or None when the queue is empty.
+    """
+    queued = ToolRun.objects.filter(status="queued").exclude(job_type="")
+
+    candidates = list(
+        queued
+        .exclude(tool__requires_license=True)
+        .order_by("created_at")
+        .values_list("created_at", "id")[:10]
+    )
+    candidates += queued.filter(id__in=licenses.claimable_runs()).values_list("created_at", "id")
+
+    for _, run_id in sorted(candidates):
+        claimed = ToolRun.objects.filter(id=run_id, status="queued").update(
+            status="running",
+            worker_id=worker_id,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return ToolRun.objects.select_related("tool").get(id=run_id)
+
+    return None
+
+
+def requeue_orphaned_runs(*, worker_id=None, host=None):
+    """
+    Put runs held by dead workers back in the queue, either for
+    one worker id ("<host>:<pid>") or for every worker on a host.
+    A run that was claimed EDA_WORKER_MAX_ATTEMPTS times fails instead:
+    a job that kills its worker (OOM, crashing tool) would otherwise be
+    retried forever.
+    """
+    qs = ToolRun.objects.filter(status="running").exclude(job_type="")
+
+    if worker_id:
+        qs = qs.filter(worker_id=worker_id)
+    else:
+        qs = qs.filter(worker_id__startswith=f"{host}:")
+
+    build_tokens.release_orphaned(qs)
+    licenses.release_for_runs(qs)
+
+    for run in qs.filter(attempts__gte=settings.EDA_WORKER_MAX_ATTEMPTS):
+        failed = ToolRun.objects.filter(id=run.id, status="running").update(
+            status="failed",
+            worker_id="",
+            completed_at=timezone.now(),
+        )
+        if not failed:
+            continue
+
+        append_run_output(run, "stderr", f"\n[worker] Gave up after {run.attempts} attempts: the worker died during each one\n")
+        run.save(update_fields=["run_dir", "stderr_bytes", "stderr_head", "stderr_tail"])
+        if run.parent_id:
+            rollup_batch(run.parent_id)
+
+    return qs.update(
+        status="queued",
+        worker_id="",
+        started_at=None,
+    )
+
+
+def resume_run(run):
+    """
+    Queue a failed run again in place. Simulations continue from their
+    last checkpoint (see run_verilator_sim_job); a failed batch re-runs
+    its failed children. Returns False if the run wasn't failed.
+    """
+    if run.job_type == "verilator_batch":
+        resumed = ToolRun.objects.filter(id=run.id, status="failed").update(
+            status="waiting",
+            completed_at=None,
+        )
+        if resumed:
+            ToolRun.objects.filter(parent_id=run.id, status="failed").update(
+                status="queued",
+                worker_id="",
+                started_at=None,
+                completed_at=None,
+                attempts=0,
+            )
+            rollup_batch(run.id)
+        return bool(resumed)
+
+    return bool(
+        ToolRun.objects.filter(id=run.id, status="failed").exclude(job_type="").update(
+            status="queued",
+            worker_id="",
+            started_at=None,
+            completed_at=None,
+            attempts=0,
+        )
+    )
+
+
+def execute_queued_run(run):
+    handler = JOB_HANDLERS[run.job_type]
+
+    try:
+        allocation = licenses.checkout(run.tool, user=run.user, run=run)
+    except licenses.NoLicensePool as e:
+        # No pool to wait for → fail now rather than queue forever
+        append_run_output(run, "stderr", f"\n[ERROR] {e}\n")
+        run.status = "failed"
+    except licenses.LicenseUnavailable:
+        # Another worker took the last seat → back into the license
+        # queue; the claim doesn't count as an attempt
+        ToolRun.objects.filter(id=run.id, status="running").update(
+            status="queued",
+            worker_id="",
+            started_at=None,
+            attempts=F("attempts") - 1,
+        )
+        run.status = "queued"
+        return run
+    else:
+        try:
+            # Licensed tools hold a seat only while the job executes
+            with licenses.held(allocation):
+                handler(run)
+        except Exception as e:
+            append_run_output(run, "stderr", f"\n[ERROR] {e}\n")
+            run.status = "failed"
+
+    if run.status == "running":
+        run.status = "success"
+
+    # Batch parents stay "waiting" until their children are done
+    if run.status != "waiting":
+        run.completed_at = timezone.now()
+    run.save()
+
+    if run.status == "waiting":
+        rollup_batch(run.id)
+    elif run.parent_id:
+        rollup_batch(run.parent_id)
+
+    if run.status in ("success", "failed"):
+        post_run(run)
+
+    return run
+
+
+def post_run(run):
+    """
+    Post-run stage, in the worker: .br / .gz siblings served by
+    serve_upload and the renditions of image artifacts.
+    """
+    try:
+        precompress.precompress_run(run)
+    except OSError as e:
+        append_run_output(run, "stderr", f"\n[precompress] {e}\n")
+
+    for artifact in run.artifacts.filter(artifact_type="image"):
+        renditions.build_all(artifact)
+
+
+def claim_next_post_run(worker_id):
+    """
+    Atomically take a run finished outside the workers (extraction
+    cache hit) whose post-run stage is still due.
+    """
+    for run_id in ToolRun.objects.filter(post_run_pending=True).order_by("completed_at").values_list("id", flat=True)[:10]:
+        claimed = ToolRun.objects.filter(id=run_id, post_run_pending=True).update(post_run_pending=False)
+        if claimed:
+            return ToolRun.objects.get(id=run_id)
+
+    return None
+
+
+def run_worker_loop(worker_id, poll_interval=None, max_jobs=None):
+    """
+    Work the run, export, waveform index and post-run queues round
+    robin: after
+    each job the next queue gets the first claim, so a backlog of runs
+    can't starve exports and the other way round. `max_jobs` counts
+    finished runs.
+    """
+    poll_interval = poll_interval or settings.EDA_WORKER_POLL_INTERVAL
+    queues = (
+        (claim_next_run, execute_queued_run),
+        (exports.claim_next_export, exports.run_export),
+        (waveform.claim_next_index, waveform.run_index_job),
+        (claim_next_post_run, post_run),
+    )
+    turn = 0
+    done = 0
+
+    while max_jobs is None or done < max_jobs:
+        for i in range(len(queues)):
+            slot = (turn + i) % len(queues)
+            claim, execute = queues[slot]
+            job = claim(worker_id)
+            if job is not None:
+                break
+        else:
+            time.sleep(poll_interval)
+            continue
+
+        turn = slot + 1
+        execute(job)
+
+        if execute is not execute_queued_run:
+            continue
+        if job.status == "queued":
+            # Lost a license race; let the seat holders finish
+            time.sleep(poll_interval)
+            continue
+        done += 1
+
+
+# =====================================================
+# JOB HANDLERS
+# =====================================================
+
+def apply_klayout_cache(gds_sha256, run_dir):
+    """
+    Link cached extraction outputs into run_dir. Returns the cache
+    entry on a hit (KLayout doesn't need to run at all).
+    """
+    entry = klayout_cache.lookup(gds_sha256, settings.EDA_KLAYOUT_RENDER_SIZE, run_dir)
+
+    if entry:
+        with open(os.path.join(run_dir, "klayout.log"), "a", encoding="utf-8") as f:
+            f.write(f"Extraction cache hit ({entry.key[:12]}), KLayout not started\n")
+
+    return entry
+
+
+def finish_klayout_run(run):
+    """
+    Register artifacts + attach them to the run's presentation
+    """
+    register_klayout_artifacts(run)
+    store_layout_metadata(run)
+
+    presentation = Presentation.objects.filter(run=run).first()
+    if presentation:
+        auto_attach_artifacts_to_slides(presentation, run)
+
+
+def store_layout_metadata(run):
+    """
+    Load metadata.json / cells.json into LayoutMetadata and the
+    per-layer LayerStatistic index.
+    """
+    base = Path(run.run_dir)
+    meta_path = base / "metadata.json"
+    if not meta_path.exists():
+        return None
+
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    cells = None
+    if (base / "cells.json").exists():
+        with open(base / "cells.json", encoding="utf-8") as f:
+            cells = json.load(f)
+
+    layer_stats = meta.get("layer_stats") or []
+    preview = base / "preview.png"
+
+    metadata, _ = LayoutMetadata.objects.update_or_create(
+        run=run,
+        defaults={
+            "cell_count": meta.get("cells"),
+            "dbu": meta.get("dbu"),
+            "bbox": meta.get("bbox"),
+            "layers": [f"{l['layer']}/{l['datatype']}" for l in layer_stats],
+            "top_cell": meta.get("top_cell") or "",
+            "cells": cells,
+            "png_preview": (
+                str(preview.relative_to(settings.MEDIA_ROOT)) if preview.exists() else ""
+            ),
+        },
+    )
+
+    LayerStatistic.objects.filter(run=run).delete()
+    LayerStatistic.objects.bulk_create([
+        LayerStatistic(
+            run=run,
+            layer=l["layer"],
+            datatype=l["datatype"],
+            name=l.get("name") or "",
+            shape_count=l.get("shapes") or 0,
+            area=l.get("area") or 0,
+            bbox=l.get("bbox"),
+        )
+        for l in layer_stats
+    ])
+
+    return metadata
+
+
+def run_klayout_job(run):
+    run_dir = run.run_dir
+    gds_path = run.job_args["gds_path"]
+
+    # Another run may have extracted the same GDS meanwhile
+    if apply_klayout_cache(run.input_blob_id, run_dir):
+        run.status = "success"
+        finish_klayout_run(run)
+        return
+
+    # -------------------------
+    # Output paths
+    # -------------------------
+    png_path = os.path.join(run_dir, "preview.png")
+    meta_path = os.path.join(run_dir, "metadata.json")
+    log_path = os.path.join(run_dir, "klayout.log")
+    render_size = settings.EDA_KLAYOUT_RENDER_SIZE
+
+    # -------------------------
+    # Run KLayout batch (persistent worker, WSL)
+    # -------------------------
+    if settings.EDA_KLAYOUT_PERSISTENT:
+        parallelism = klayout_render_parallelism(run, gds_path)
+
+        try:
+            # Parallel mode: metadata first, preview assembled from regions
+            result = klayout_pool.get_worker().extract(
+                wsl_path(gds_path),
+                wsl_path(png_path) if parallelism == 1 else None,
+                wsl_path(meta_path),
+                wsl_path(log_path),
+                render_size,
+            )
+            if result.get("ok") and parallelism > 1:
+                # Helpers take CPU tokens: all workers together never run
+                # more KLayouts than the build budget
+                with build_tokens.cpu_tokens(run, limit=parallelism) as tokens:
+                    render_preview_regions(gds_path, png_path, meta_path, log_path, render_size, tokens)
+        except klayout_pool.KLayoutWorkerError as e:
+            append_run_output(run, "stderr", f"[ERROR] {e}\n")
+            result = {"ok": False}
+
+        run.status = "success" if result.get("ok") else "failed"
+
+        if run.status == "success":
+            klayout_cache.store(run.input_blob_id, render_size, run_dir)
+
+        finish_klayout_run(run)
+        return
+
+    # -------------------------
+    # Run KLayout batch (one-shot, WSL)
+    # -------------------------
+    cmd = (
+        f"export KLAYOUT_GDS='{wsl_path(gds_path)}' && "
+        f"export KLAYOUT_PNG='{wsl_path(png_path)}' && "
+        f"export KLAYOUT_META='{wsl_path(meta_path)}' && "
+        f"export KLAYOUT_PNG_SIZE='{render_size}' && "
+        f"klayout -b -r scripts/klayout_extract.py "
+        f"> '{wsl_path(log_path)}' 2>&1"
+    )
+
+    proc = subprocess.run(
+        ["wsl", "bash", "-lc", cmd],
+        text=True
+    )
+
+    run.status = "success" if proc.returncode == 0 else "failed"
+
+    if run.status == "success":
+        klayout_cache.store(run.input_blob_id, render_size, run_dir)
+
+    finish_klayout_run(run)
+
+
+def klayout_render_parallelism(run, gds_path):
+    """
+    Region renderers for this run: per tool, else the global default.
+    Small layouts always render in one piece.
+    """
+    wanted = run.tool.render_parallelism or settings.EDA_KLAYOUT_RENDER_PARALLELISM
+
+    if wanted <= 1 or os.path.getsize(gds_path) < settings.EDA_KLAYOUT_PARALLEL_MIN_BYTES:
+        return 1
+
+    return min(wanted, os.cpu_count() or 1)
+
+
+def render_preview_regions(gds_path, png_path, meta_path, log_path, size, parallelism):
+    """
+    Split the square around the layout bbox into a grid, render each
+    cell of the grid in its own KLayout and paste them into preview.png.
+    """
+    from PIL import Image
+
+    started = time.monotonic()
+
+    with open(meta_path, encoding="utf-8") as f:
+        left, bottom, right, top = json.load(f)["bbox"]
+
+    # Same square extent as the tile pyramid
+    side = max(right - left, top - bottom) or 1.0
+    left -= (side - (right - left)) / 2
+    top += (side - (top - bottom)) / 2
+
+    cols = math.ceil(math.sqrt(parallelism))
+    rows = math.ceil(parallelism / cols)
+    xs = [size * i // cols for i in range(cols + 1)]
+    ys = [size * j // rows for j in range(rows + 1)]
+
+    region_dir = Path(png_path).parent / "regions"
+    region_dir.mkdir(exist_ok=True)
+
+    workers = klayout_pool.get_render_pool(parallelism)
+    gds = wsl_path(gds_path)
+
+    def render(i, col, row):
+        box = [
+            left + side * xs[col] / size,
+            top - side * ys[row + 1] / size,
+            left + side * xs[col + 1] / size,
+            top - side * ys[row] / size,
+        ]
+        path = region_dir / f"{row}_{col}.png"
+        result = workers[i % len(workers)].render(
+            gds, wsl_path(str(path)), box, xs[col + 1] - xs[col], ys[row + 1] - ys[row]
+        )
+        if not result.get("ok"):
+            raise klayout_pool.KLayoutWorkerError(result.get("error") or f"Region {row}_{col} failed")
+        return path, (xs[col], ys[row])
+
+    grid = [(col, row) for row in range(rows) for col in range(cols)]
+    try:
+        with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            pieces = list(pool.map(lambda a: render(a[0], *a[1]), enumerate(grid)))
+    finally:
+        # Every KLayout here has the whole layout loaded
+        klayout_pool.release_render_pool()
+
+    preview = Image.new("RGB", (size, size))
+    for path, offset in pieces:
+        with Image.open(path) as piece:
+            preview.paste(piece, offset)
+        path.unlink()
+    preview.save(png_path)
+    region_dir.rmdir()
+
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(
+            f"Preview rendered as {rows}x{cols} regions on {len(workers)} KLayout "
+            f"processes in {time.monotonic() - started:.1f}s\n"
+        )
+
+
+def run_verilator_job(run):
+    wsl_file = windows_to_wsl(run.job_args["upload_path"])
+
+    cmd = f"verilator --lint-only {wsl_file}"
+
+    proc = subprocess.Popen(
+        ["wsl", "bash", "-lc", cmd],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+    with LogSegmentWriter(run, "stdout") as out, LogSegmentWriter(run, "stderr") as err:
+        stream_process(
+            proc,
+            os.path.join(run.run_dir, "run.log"),
+            timeout=300,
+            sinks=(out, err),
+        )
+
+    run.status = "success" if not run.stderr_bytes else "failed"
+
+
+def _log_note(note, out, log_path):
+    out.write(note)
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(note)
+
+
+def verilator_sim_options(job_args):
+    """
+    (wave format, sim params, Verilator flags) for a simulation job.
+    """
+    wave_format = job_args.get("wave_format") or settings.EDA_VERILATOR_WAVE_FORMAT
+    params = job_args.get("sim") or {}
+    flags = verilator_build.savable_flags(
+        verilator_build.trace_flags(settings.EDA_VERILATOR_FLAGS, wave_format),
+        params,
+    )
+    return wave_format, params, flags
+
+
+def build_verilator_model(run, source, flags, out, err, log_path, dest_dir=None):
+    """
+    Bring the cached build of `source` up to date (verilator_build.py)
+    and, with `dest_dir`, link the binary there. Returns the binary
+    name, or None if the module or the build failed.
+    """
+    top = verilator_build.top_module_name(source)
+
+    if not verilator_build.fix_verilog_module_name(source, top):
+        err.write("[ERROR] No module declaration found\n")
+        return None
+
+    key = verilator_build.build_key(top, flags)
+
+    with verilator_build.build_lock(key) as folder:
+        entry, state, sha = verilator_build.checkout(source, top, flags)
+        run.build_cache = state
+        _log_note(f"Build cache: {state} ({key[:12]})\n", out, log_path)
+
+        if state != "hit":
+            # Shared CPU budget → this build's make -j
+            with build_tokens.cpu_tokens(run) as jobs:
+                _log_note(f"Build: make -j{jobs} (waited {run.build_wait_seconds:.1f}s for CPU)\n", out, log_path)
+
+                proc = subprocess.Popen(
+                    ["wsl", "bash", "-lc", verilator_build.build_command(
+                        wsl_path(str(folder)),
+                        verilator_build.source_name(source, top),
+                        top,
+                        flags,
+                        jobs,
+                    )],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+                stream_process(
+                    proc, log_path,
+                    timeout=settings.EDA_VERILATOR_BUILD_TIMEOUT,
+                    sinks=(out, err),
+                )
+
+            if proc.returncode != 0:
+                return None
+
+            verilator_build.record_build(entry, sha)
+
+        # Private copy, not a link: the next build of this key may
+        # rewrite the cached binary in place
+        binary = f"V{top}"
+        if dest_dir:
+            shutil.copyfile(folder / "obj_dir" / binary, os.path.join(dest_dir, binary))
+
+    return binary
+
+
+def run_verilator_sim_job(run):
+    """
+    Compile the uploaded RTL with sim_main.cpp through the build cache
+    (verilator_build.py), then simulate it in the run directory.
+    A run that left a checkpoint behind continues from it.
+    """
+    run_dir = run.run_dir
+    source = run.job_args["upload_path"]
+    wave_format, params, flags = verilator_sim_options(run.job_args)
+    log_path = os.path.join(run_dir, "run.log")
+
+    with LogSegmentWriter(run, "stdout") as out, LogSegmentWriter(run, "stderr") as err:
+        binary = build_verilator_model(run, source, flags, out, err, log_path, dest_dir=run_dir)
+        if binary is None:
+            run.status = "failed"
+            return
+
+        restore = None
+        resume_cycle = verilator_build.checkpoint_cycle(run_dir) if params.get("checkpoint_every") else None
+        if resume_cycle is not None:
+            restore = verilator_build.CHECKPOINT
+            _log_note(f"Resuming from checkpoint at cycle {resume_cycle}\n", out, log_path)
+
+        proc = subprocess.Popen(
+            ["wsl", "bash", "-lc", verilator_build.sim_command(
+                wsl_path(run_dir),
+                binary,
+                wave_format,
+                verilator_build.sim_plusargs(params, restore),
+            )],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        stream_process(proc, log_path, timeout=settings.EDA_VERILATOR_SIM_TIMEOUT, sinks=(out, err))
+
+        wave = waveform.find_waveform(run_dir)
+        if proc.returncode == 0 and wave:
+            # Index once here so the viewer never parses the waveform itself
+            try:
+                waveform.build_index(wave)
+            except (OSError, ValueError, waveform.WaveformIndexError) as e:
+                err.write(f"[WARN] Waveform index failed: {e}\n")
+
+    run.status = "success" if proc.returncode == 0 else "failed"
+
+
+def run_verilator_batch_job(run):
+    """
+    Regression batch: compile every distinct source once, then fan out
+    one verilator_sim child run per (source, seed). The children hit
+    the build cache; the parent waits and is completed by rollup_batch.
+    """
+    # Requeued after fanning out (worker died before saving) → just wait
+    if ToolRun.objects.filter(parent=run).exists():
+        run.status = "waiting"
+        return
+
+    wave_format, params, flags = verilator_sim_options(run.job_args)
+    seeds = run.job_args.get("seeds") or [None]
+    log_path = os.path.join(run.run_dir, "run.log")
+
+    children = []
+    with LogSegmentWriter(run, "stdout") as out, LogSegmentWriter(run, "stderr") as err:
+        for i, source in enumerate(run.job_args["sources"]):
+            name = os.path.basename(source)
+            _log_note(f"== {name}\n", out, log_path)
+            built = build_verilator_model(run, source, flags, out, err, log_path) is not None
+
+            for seed in seeds:
+                child_dir = os.path.join(run.run_dir, f"{i:04d}" + ("" if seed is None else f"_s{seed}"))
+                os.makedirs(child_dir, exist_ok=True)
+                child_source = os.path.join(child_dir, name)
+                link_file(source, child_source)
+
+                sim = dict(params, seed=seed) if seed is not None else dict(params)
+                child = ToolRun(
+                    tool=run.tool,
+                    user=run.user,
+                    parent=run,
+                    input_file=name,
+                    input_blob_id=run.job_args["blobs"][i],
+                    run_dir=child_dir,
+                    # Sources that didn't compile fail right away
+                    status="queued" if built else "failed",
+                    completed_at=None if built else timezone.now(),
+                    job_type="verilator_sim",
+                    job_args={"upload_path": child_source, "wave_format": wave_format, "sim": sim},
+                )
+                if not built:
+                    append_run_output(child, "stderr", f"[ERROR] Build failed, see batch run #{run.id}\n")
+                children.append(child)
+
+        _log_note(f"Queued {len(children)} simulations\n", out, log_path)
+
+    ToolRun.objects.bulk_create(children)
+    run.status = "waiting"
+
+
+def rollup_batch(parent_id):
+    """
+    Complete a waiting batch parent once none of its children is
+    queued or running. Safe to call from every child: the conditional
+    UPDATE lets only one caller finish it.
+    """
+    counts = batch_counts(parent_id)
+    if counts["queued"] or counts["running"]:
+        return False
+
+    return bool(
+        ToolRun.objects.filter(id=parent_id, status="waiting").update(
+            status="failed" if counts["failed"] else "success",
+            completed_at=timezone.now(),
+        )
+    )
+
+
+def batch_counts(parent_id):
+    counts = dict.fromkeys(("queued", "running", "success", "failed"), 0)
+    for row in ToolRun.objects.filter(parent_id=parent_id).values("status").annotate(n=Count("id")):
+        counts[row["status"]] = row["n"]
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+JOB_HANDLERS = {
+    "klayout": run_klayout_job,
+    "verilator": run_verilator_job,
+    "verilator_sim": run_verilator_sim_job,
+    "verilator_batch": run_verilator_batch_job,
+}
+
+
+# =====================================================
+# ARTIFACTS → PRESENTATION
+# =====================================================
+
+def register_klayout_artifacts(run):
+    base = Path(run.run_dir)  # ✅ already uploads/runs/<uuid>
+
+    artifacts = [
+        ("image", "Layout Preview", base / "preview.png"),
+        ("metadata", "Layout Metadata", base / "metadata.json"),
+        ("log", "KLayout Log", base / "klayout.log"),
+    ]
+
+    for kind, name, full_path in artifacts:
+        if full_path.exists():
+            # Sidecar line index → O(1) log_start/log_end snippets
+            if kind == "log":
+                build_line_index(full_path)
+
+            # get_or_create: a requeued / resumed run finishes again
+            RunArtifact.objects.get_or_create(
+                run=run,
+                #  RELATIVE TO MEDIA_ROOT
+                file_path=str(full_path.relative_to(settings.MEDIA_ROOT)),
+                defaults={
+                    "artifact_type": (
+                        "image" if kind == "image" else
+                        "log" if kind == "log" else
+                        "report"
+                    ),
+                    "name": name,
+                },
+            )
+
+
+def auto_attach_artifacts_to_slides(presentation, run):
+    def get_slide(title, order):
+        slide, _ = Slide.objects.get_or_create(
+            presentation=presentation,
+            title=title,
+            defaults={"order": order},
+        )
+        return slide
+
+    layout_slide = get_slide("Layout View", 1)
+    metadata_slide = get_slide("Metadata", 2)
+    logs_slide = get_slide("Logs", 3)
+
+    artifacts = RunArtifact.objects.filter(run=run)
+
+    # Finishing the run again must not attach the same artifact twice
+    attached = set(
+        SlideItem.objects
+        .filter(slide__presentation=presentation, artifact__run=run)
+        .values_list("artifact_id", flat=True)
+    )
+
+    for artifact in artifacts:
+        if artifact.id in attached:
+            continue
+
+        atype = artifact.artifact_type.lower()
+
+        # ---- IMAGE ----
+        if atype == "image":
+            SlideItem.objects.create(
+                slide=layout_slide,
+                item_type="image",
+                artifact=artifact,
+            )
+
+        # ---- METADATA / REPORT ----
+        elif atype == "report":
+            SlideItem.objects.create(
+                slide=metadata_slide,
+                item_type="attachment",  # IMPORTANT
+                artifact=artifact,
+            )
+
+        # ---- LOG ----
+        elif atype == "log":
+            SlideItem.objects.create(
+                slide=logs_slide,
+                item_type="log_snippet",
+                artifact=artifact,
+            )
+
+
+def slide_item_text(item, max_lines=None):
+    """
+    Text shown inline for attachment / log_snippet slide items.
+    Log snippets (and any capped read) only touch the requested
+    line window, using the artifact's line index; the window actually
+    shown is left on `item.line_window` (see read_line_window).
+    """
+    abs_path = Path(settings.MEDIA_ROOT) / item.artifact.file_path
+    if not abs_path.exists():
+        return None
+
+    config = item.config or {}
+
+    if item.item_type == "log_snippet" or max_lines:
+        item.line_window = read_line_window(
+            abs_path,
+            start=config.get("log_start") if item.item_type == "log_snippet" else None,
+            end=config.get("log_end") if item.item_type == "log_snippet" else None,
+            max_lines=max_lines,
+        )
+        return item.line_window.text
+
+    return abs_path.read_text(encoding="utf-8", errors="replace")
@@ -0,0 +1,170 @@
+// Deep-zoom viewer for KLayout preview tiles (/run/<id>/tiles/).
+//
+// The pyramid is a square "world" of tile_size px at level 0; level z
+// splits it into 2^z x 2^z tiles. Only tiles in view at the level that
+// matches the current scale are requested, so panning a large die never
+// downloads more than a screenful of 256px PNGs. Tiles not rendered yet
+// are retried with backoff until a tile worker has written them.
+(function () {
+  function TileViewer(el, descriptorUrl) {
+    this.el = el;
+    this.imgs = {};
+    this.s = 1;
+    this.x = 0;
+    this.y = 0;
+
+    // Resolves true once tiles are showing; on failure whatever was
+    // already inside `el` (e.g. a static preview.png) is left alone.
+    this.ready = fetch(descriptorUrl)
+      .then(r => r.json())
+      .then(d => {
+        if (!d.ok) throw new Error(d.error || "No tiles");
+        this.d = d;
+
+        el.innerHTML = "";
+        el.style.position = "relative";
+        el.style.overflow = "hidden";
+        el.style.cursor = "grab";
+
+        // Level 0 stays underneath as a backdrop while finer tiles load
+        this.base = this.tile(0, 0, 0);
+        this.reset();
+        this.bind();
+        return true;
+      })
+      .catch(err => {
+        console.warn("Tile preview unavailable:", err);
+        if (!el.children.length) el.textContent = "Preview unavailable";
+        return false;
+      });
+  }
+
+  TileViewer.prototype.url = function (z, x, y) {
+    return this.d.tile_url.replace("{z}", z).replace("{x}", x).replace("{y}", y);
+  };
+
+  TileViewer.prototype.tile = function (z, x, y) {
+    const img = document.createElement("img");
+    const url = this.url(z, x, y);
+    let attempt = 0;
+
+    // Missing tiles answer 202 while a tile worker renders them
+    img.onerror = () => {
+      if (attempt >= 8 || !img.isConnected) return;
+      const delay = 500 * Math.pow(1.5, attempt++);
+      setTimeout(() => { img.src = `${url}?retry=${attempt}`; }, delay);
+    };
+    img.src = url;
+    img.draggable = false;
+    img.style.position = "absolute";
+    img.style.imageRendering = "pixelated";
+    img.dataset.z = z;
+    img.dataset.x = x;
+    img.dataset.y = y;
+    this.el.appendChild(img);
+    return img;
+  };
+
+  TileViewer.prototype.place = function (img) {
+    const n = 1 << img.dataset.z;
+    const span = (this.d.tile_size / n) * this.s;
+
+    img.style.left = (this.x + img.dataset.x * span) + "px";
+    img.style.top = (this.y + img.dataset.y * span) + "px";
+    img.style.width = img.style.height = span + "px";
+  };
+
+  TileViewer.prototype.draw = function () {
+    const size = this.d.tile_size;
+    const z = Math.max(0, Math.min(this.d.max_zoom, Math.ceil(Math.log2(this.s))));
+    const n = 1 << z;
+    const span = (size / n) * this.s;
+
+    const W = this.el.clientWidth;
+    const H = this.el.clientHeight;
+    const clamp = v => Math.max(0, Math.min(n - 1, v));
+
+    const x0 = clamp(Math.floor(-this.x / span));
+    const x1 = clamp(Math.floor((W - this.x) / span));
+    const y0 = clamp(Math.floor(-this.y / span));
+    const y1 = clamp(Math.floor((H - this.y) / span));
+
+    const wanted = {};
+    for (let ty = y0; ty <= y1; ty++) {
+      for (let tx = x0; tx <= x1; tx++) {
+        wanted[`${z}/${tx}/${ty}`] = [tx, ty];
+      }
+    }
+
+    for (const key in this.imgs) {
+      if (!(key in wanted)) {
+        this.imgs[key].remove();
+        delete this.imgs[key];
+      }
+    }
+
+    for (const key in wanted) {
+      if (!this.imgs[key]) this.imgs[key] = this.tile(z, ...wanted[key]);
+      this.place(this.imgs[key]);
+    }
+
+    this.place(this.base);
+  };
+
+  TileViewer.prototype.zoomAt = function (factor, cx, cy) {
+    const max = (1 << this.d.max_zoom) * 2;
+    const s = Math.max(0.25, Math.min(max, this.s * factor));
+
+    this.x = cx - (cx - this.x) * (s / this.s);
+    this.y = cy - (cy - this.y) * (s / this.s);
+    this.s = s;
+    this.draw();
+  };
+
+  TileViewer.prototype.zoomIn = function () {
+    this.zoomAt(1.5, this.el.clientWidth / 2, this.el.clientHeight / 2);
+  };
+
+  TileViewer.prototype.zoomOut = function () {
+    this.zoomAt(1 / 1.5, this.el.clientWidth / 2, this.el.clientHeight / 2);
+  };
+
+  TileViewer.prototype.reset = function () {
+    const W = this.el.clientWidth;
+    const H = this.el.clientHeight;
+
+    this.s = Math.min(W, H) / this.d.tile_size;
+    this.x = (W - this.d.tile_size * this.s) / 2;
+    this.y = (H - this.d.tile_size * this.s) / 2;
+    this.draw();
+  };
+
+  TileViewer.prototype.bind = function () {
+    let drag = null;
+
+    this.el.addEventListener("mousedown", e => {
+      drag = { x: e.clientX - this.x, y: e.clientY - this.y };
+      this.el.style.cursor = "grabbing";
+    });
+
+    window.addEventListener("mousemove", e => {
+      if (!drag) return;
+      this.x = e.clientX - drag.x;
+      this.y = e.clientY - drag.y;
+      this.draw();
+    });
+
+    window.addEventListener("mouseup", () => {
+      drag = null;
+      this.el.style.cursor = "grab";
+    });
+
+    this.el.addEventListener("wheel", e => {
+      e.preventDefault();
+      const r = this.el.getBoundingClientRect();
+      this.zoomAt(e.deltaY < 0 ? 1.25 : 0.8, e.clientX - r.left, e.clientY - r.top);
+    }, { passive: false });
+  };
+
+  window.TileViewer = TileViewer;
+})();
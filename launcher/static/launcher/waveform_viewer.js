@@ -0,0 +1,152 @@
+// Waveform viewer over the indexed VCD API (/run/<id>/waveform/).
+//
+// Only the visible time window is fetched, at the canvas width in
+// pixels; busy signals arrive as one min/max bucket per pixel column,
+// so zooming out on a long simulation never transfers every change.
+(function () {
+  const ROW = 28;
+  const LABEL = 160;
+
+  // 202 means a worker is (re)building the index → ask again shortly
+  function fetchIndexed(url, attempt = 0) {
+    return fetch(url).then(r => {
+      if (r.status !== 202 || attempt >= 120) return r.json();
+      const wait = 1000 * (Number(r.headers.get("Retry-After")) || 1);
+      return new Promise(done => setTimeout(done, wait)).then(() => fetchIndexed(url, attempt + 1));
+    });
+  }
+
+  function WaveformViewer(canvas, baseUrl, maxSignals) {
+    this.canvas = canvas;
+    this.baseUrl = baseUrl;
+    this.maxSignals = maxSignals || 16;
+
+    this.ready = fetchIndexed(baseUrl + "signals/")
+      .then(d => {
+        if (!d.ok) throw new Error(d.error || "No waveform");
+        this.signals = d.signals.slice(0, this.maxSignals);
+        this.end = d.end_time;
+        this.timescale = d.timescale;
+        this.bind();
+        return this.reset();
+      });
+  }
+
+  WaveformViewer.prototype.load = function () {
+    const plot = Math.max(1, this.canvas.width - LABEL);
+    const q = new URLSearchParams({
+      signals: this.signals.map(s => s.id).join(","),
+      start: Math.floor(this.t0),
+      end: Math.ceil(this.t1),
+      width: plot,
+    });
+
+    return fetchIndexed(this.baseUrl + "?" + q)
+      .then(d => {
+        if (d.ok) this.draw(d);
+        return d.ok;
+      });
+  };
+
+  WaveformViewer.prototype.x = function (t) {
+    const plot = this.canvas.width - LABEL;
+    return LABEL + ((t - this.t0) / Math.max(1, this.t1 - this.t0)) * plot;
+  };
+
+  WaveformViewer.prototype.draw = function (d) {
+    const c = this.canvas;
+    const g = c.getContext("2d");
+
+    c.height = this.signals.length * ROW + 20;
+    g.clearRect(0, 0, c.width, c.height);
+    g.font = "11px monospace";
+
+    this.signals.forEach((s, row) => {
+      const w = d.signals[s.id];
+      const top = row * ROW + 4;
+      const bottom = top + ROW - 10;
+
+      g.fillStyle = "#374151";
+      g.fillText(s.name.split(".").slice(-2).join("."), 4, top + 12);
+      if (!w) return;
+
+      g.strokeStyle = "#4f46e5";
+      g.fillStyle = "#c7d2fe";
+      g.beginPath();
+
+      if (w.buckets) {
+        // Too many changes for the width → one busy bar per column
+        w.buckets.forEach(([t, lo, hi]) => {
+          const x = this.x(t);
+          if (s.width === 1 && lo === hi) {
+            const y = lo === "1" ? top : bottom;
+            g.moveTo(x, y);
+            g.lineTo(x + 1, y);
+          } else {
+            g.fillRect(x, top, 1, bottom - top);
+          }
+        });
+      } else {
+        let value = w.initial;
+        let from = this.t0;
+        const seg = (until) => {
+          const x0 = this.x(from);
+          const x1 = this.x(until);
+          if (s.width === 1) {
+            const y = value === "1" ? top : bottom;
+            g.moveTo(x0, value === null ? (top + bottom) / 2 : y);
+            g.lineTo(x1, y);
+          } else if (value !== null) {
+            g.rect(x0, top, x1 - x0, bottom - top);
+            if (x1 - x0 > 30) {
+              g.fillStyle = "#374151";
+              g.fillText(parseInt(value, 2).toString(16), x0 + 3, top + 12);
+              g.fillStyle = "#c7d2fe";
+            }
+          }
+        };
+
+        w.changes.forEach(([t, v]) => {
+          seg(t);
+          value = v;
+          from = t;
+        });
+        seg(this.t1);
+      }
+
+      g.stroke();
+    });
+
+    g.fillStyle = "#6b7280";
+    g.fillText(`${Math.floor(this.t0)} – ${Math.ceil(this.t1)} (${this.timescale})`, LABEL, c.height - 4);
+  };
+
+  WaveformViewer.prototype.zoomAt = function (factor, t) {
+    const span = Math.max(1, (this.t1 - this.t0) * factor);
+    const f = (t - this.t0) / Math.max(1, this.t1 - this.t0);
+
+    this.t0 = Math.max(0, t - span * f);
+    this.t1 = Math.min(this.end, this.t0 + span);
+    return this.load();
+  };
+
+  WaveformViewer.prototype.reset = function () {
+    this.t0 = 0;
+    this.t1 = Math.max(1, this.end);
+    return this.load();
+  };
+
+  WaveformViewer.prototype.bind = function () {
+    this.canvas.addEventListener("wheel", e => {
+      e.preventDefault();
+      const r = this.canvas.getBoundingClientRect();
+      const px = (e.clientX - r.left) * (this.canvas.width / r.width) - LABEL;
+      const t = this.t0 + (px / (this.canvas.width - LABEL)) * (this.t1 - this.t0);
+      this.zoomAt(e.deltaY < 0 ? 0.7 : 1.4, t);
+    }, { passive: false });
+
+    this.canvas.addEventListener("dblclick", () => this.reset());
+  };
+
+  window.WaveformViewer = WaveformViewer;
+})();
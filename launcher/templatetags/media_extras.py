@@ -2,8 +2,19 @@ from django import template
 from django.conf import settings
 from pathlib import Path
 
+from launcher import renditions
+
 register = template.Library()
 
 @register.filter
 def absolute_media(path):
     return Path(settings.MEDIA_ROOT, path)
+
+
+@register.filter
+def rendition_url(artifact, name):
+    """
+    {{ artifact|rendition_url:"slide" }} → URL of a downscaled copy,
+    or of the original until a worker has built it
+    """
+    return settings.MEDIA_URL + renditions.existing_rendition(artifact, name).replace("\\", "/")
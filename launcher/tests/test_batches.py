@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from launcher.models import ToolRun
+from launcher.services import batch_counts, claim_next_run, enqueue_run, execute_queued_run, resume_run, rollup_batch
+
+from .utils import MediaRootMixin, make_tool
+
+
+def fake_build(run, source, flags, out, err, log_path):
+    # "broken.v" doesn't compile
+    return None if source.endswith("broken.v") else "obj_dir/Vtop"
+
+
+@mock.patch("launcher.services.build_verilator_model", fake_build)
+class RegressionBatchTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tool = make_tool("verilator")
+        run_dir = self.media_root / "runs" / "batch"
+        run_dir.mkdir(parents=True)
+
+        sources = []
+        for name in ("alu.v", "broken.v"):
+            path = run_dir / name
+            path.write_text("module top; endmodule\n")
+            sources.append(str(path))
+
+        self.parent = enqueue_run(
+            tool=self.tool,
+            user=None,
+            job_type="verilator_batch",
+            run_dir=str(run_dir),
+            job_args={"sources": sources, "blobs": [None, None], "seeds": [1, 2, 3]},
+        )
+
+    def fan_out(self):
+        execute_queued_run(claim_next_run("host:1"))
+        self.parent.refresh_from_db()
+
+    def finish(self, child, status):
+        ToolRun.objects.filter(pk=child.pk).update(status=status)
+        return rollup_batch(self.parent.pk)
+
+    def test_one_child_per_source_and_seed(self):
+        self.fan_out()
+
+        self.assertEqual(self.parent.status, "waiting")
+        children = self.parent.children.order_by("run_dir")
+        self.assertEqual(
+            [(c.input_file, c.job_args["sim"]["seed"], c.status) for c in children],
+            [("alu.v", s, "queued") for s in (1, 2, 3)] + [("broken.v", s, "failed") for s in (1, 2, 3)],
+        )
+        self.assertTrue(all(c.job_type == "verilator_sim" for c in children))
+        self.assertEqual(batch_counts(self.parent.pk)["total"], 6)
+
+    def test_requeued_parent_does_not_fan_out_twice(self):
+        self.fan_out()
+        ToolRun.objects.filter(pk=self.parent.pk).update(status="queued")
+
+        self.fan_out()
+
+        self.assertEqual(self.parent.status, "waiting")
+        self.assertEqual(self.parent.children.count(), 6)
+
+    def test_parent_completes_when_the_last_child_finishes(self):
+        self.fan_out()
+        queued = list(self.parent.children.filter(status="queued"))
+
+        self.assertFalse(self.finish(queued[0], "success"))
+        self.assertFalse(self.finish(queued[1], "success"))
+        self.assertTrue(self.finish(queued[2], "success"))
+        self.assertFalse(rollup_batch(self.parent.pk))
+
+        self.parent.refresh_from_db()
+        # broken.v failed → the batch failed
+        self.assertEqual(self.parent.status, "failed")
+        self.assertIsNotNone(self.parent.completed_at)
+
+    def test_resume_requeues_only_failed_children(self):
+        self.fan_out()
+        for child in self.parent.children.filter(status="queued"):
+            self.finish(child, "success")
+        self.parent.refresh_from_db()
+
+        self.assertTrue(resume_run(self.parent))
+
+        self.parent.refresh_from_db()
+        self.assertEqual(self.parent.status, "waiting")
+        counts = batch_counts(self.parent.pk)
+        self.assertEqual((counts["queued"], counts["success"], counts["failed"]), (3, 3, 0))
@@ -0,0 +1,95 @@
+import hashlib
+import io
+import stat
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from launcher.blobstore import blob_path, link_blob, store_upload
+from launcher.models import ToolRun, UploadBlob
+
+from .utils import MediaRootMixin, make_tool
+
+
+class BlobStoreTests(MediaRootMixin, TestCase):
+    data = b"GDSII" * 1000
+
+    def upload(self, name="design.gds", data=data):
+        return store_upload(SimpleUploadedFile(name, data))
+
+    def test_upload_is_stored_by_content_hash(self):
+        blob = self.upload()
+
+        sha256 = hashlib.sha256(self.data).hexdigest()
+        self.assertEqual(blob.sha256, sha256)
+        self.assertEqual(blob.size, len(self.data))
+        self.assertEqual(blob.absolute_path(), blob_path(sha256))
+        self.assertEqual(blob.absolute_path().read_bytes(), self.data)
+        self.assertEqual(stat.S_IMODE(blob.absolute_path().stat().st_mode), 0o444)
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload("a.gds")
+        UploadBlob.objects.filter(pk=first.pk).update(last_used_at=timezone.now() - timedelta(days=3))
+
+        second = self.upload("b.gds")
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(UploadBlob.objects.count(), 1)
+        self.assertEqual(second.original_name, "a.gds")
+        self.assertEqual(list((self.media_root / "blobs" / "tmp").iterdir()), [])
+        # A dedupe hit counts as use
+        self.assertGreater(UploadBlob.objects.get().last_used_at, timezone.now() - timedelta(minutes=1))
+
+    def test_link_blob_materialises_the_file(self):
+        blob = self.upload()
+        dest = self.media_root / "runs" / "r1" / "design.gds"
+        dest.parent.mkdir(parents=True)
+
+        link_blob(blob, dest)
+
+        self.assertEqual(dest.read_bytes(), self.data)
+
+
+class GcBlobsTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tool = make_tool("klayout")
+        self.old = timezone.now() - timedelta(days=3)
+
+    def blob(self, data, run_dir=None):
+        blob = store_upload(SimpleUploadedFile("design.gds", data))
+        UploadBlob.objects.filter(pk=blob.pk).update(last_used_at=self.old)
+        if run_dir is not None:
+            ToolRun.objects.create(tool=self.tool, input_blob=blob, run_dir=str(run_dir))
+        return blob
+
+    def gc(self, *args):
+        call_command("gc_blobs", *args, stdout=io.StringIO())
+
+    def test_collects_only_unreferenced_blobs_past_the_grace_window(self):
+        live_dir = self.media_root / "runs" / "live"
+        live_dir.mkdir(parents=True)
+
+        live = self.blob(b"live", run_dir=live_dir)
+        gone = self.blob(b"gone", run_dir=self.media_root / "runs" / "deleted")
+        orphan = self.blob(b"orphan")
+        recent = store_upload(SimpleUploadedFile("recent.gds", b"recent"))
+
+        self.gc()
+
+        kept = set(UploadBlob.objects.values_list("pk", flat=True))
+        self.assertEqual(kept, {live.pk, recent.pk})
+        self.assertFalse(gone.absolute_path().exists())
+        self.assertFalse(orphan.absolute_path().exists())
+        self.assertTrue(live.absolute_path().exists())
+
+    def test_dry_run_deletes_nothing(self):
+        orphan = self.blob(b"orphan")
+
+        self.gc("--dry-run")
+
+        self.assertTrue(UploadBlob.objects.filter(pk=orphan.pk).exists())
+        self.assertTrue(orphan.absolute_path().exists())
@@ -0,0 +1,74 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from launcher import build_tokens
+from launcher.models import BuildTokenPool, ToolRun
+
+from .utils import make_tool
+
+
+@override_settings(EDA_BUILD_CPU_TOKENS=8)
+class BuildTokenTests(TestCase):
+    def setUp(self):
+        self.tool = make_tool("verilator")
+
+    def make_run(self, **fields):
+        return ToolRun.objects.create(tool=self.tool, status="running", **fields)
+
+    def in_use(self):
+        return BuildTokenPool.objects.get(name=build_tokens.POOL).in_use
+
+    def test_lone_build_gets_the_whole_budget(self):
+        run = self.make_run()
+
+        with build_tokens.cpu_tokens(run) as tokens:
+            self.assertEqual(tokens, 8)
+            self.assertEqual(self.in_use(), 8)
+            run.refresh_from_db()
+            self.assertIsNotNone(run.build_wait_seconds)
+
+        self.assertEqual(self.in_use(), 0)
+        self.assertEqual(ToolRun.objects.get(pk=run.pk).build_tokens, 0)
+
+    def test_limit_caps_the_grant(self):
+        with build_tokens.cpu_tokens(self.make_run(), limit=3) as tokens:
+            self.assertEqual(tokens, 3)
+            self.assertEqual(self.in_use(), 3)
+
+    def test_share_is_split_between_holders_and_waiters(self):
+        build_tokens._pool()
+        BuildTokenPool.objects.update(in_use=2)
+        self.make_run(build_tokens=2)
+        self.make_run(build_waiting_since=timezone.now())
+        me = self.make_run()
+
+        # Someone else waited first: FIFO
+        self.assertEqual(build_tokens.fair_share(me), 0)
+
+        ToolRun.objects.exclude(pk=me.pk).filter(build_waiting_since__isnull=False).update(build_waiting_since=None)
+        ToolRun.objects.filter(pk=me.pk).update(build_waiting_since=timezone.now())
+
+        # One holder + me waiting → half of the budget
+        self.assertEqual(build_tokens.fair_share(me), 4)
+
+    def test_share_is_capped_by_free_tokens(self):
+        build_tokens._pool()
+        BuildTokenPool.objects.update(in_use=7)
+        self.make_run(build_tokens=7)
+        me = self.make_run()
+
+        self.assertEqual(build_tokens.fair_share(me), 1)
+
+    def test_release_orphaned_returns_tokens_of_dead_runs(self):
+        build_tokens._pool()
+        BuildTokenPool.objects.update(in_use=5)
+        dead = self.make_run(build_tokens=3, worker_id="host:1")
+        waiting = self.make_run(build_waiting_since=timezone.now(), worker_id="host:1")
+        alive = self.make_run(build_tokens=2, worker_id="host:2")
+
+        build_tokens.release_orphaned(ToolRun.objects.filter(worker_id="host:1"))
+
+        self.assertEqual(self.in_use(), 2)
+        self.assertEqual(ToolRun.objects.get(pk=dead.pk).build_tokens, 0)
+        self.assertIsNone(ToolRun.objects.get(pk=waiting.pk).build_waiting_since)
+        self.assertEqual(ToolRun.objects.get(pk=alive.pk).build_tokens, 2)
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from launcher import exports
+from launcher.models import Presentation, PresentationExport, RunArtifact, Slide, SlideItem, ToolRun
+
+from .utils import MediaRootMixin, make_tool
+
+
+def fake_render(presentation, path):
+    path.write_bytes(f"deck {presentation.title}".encode())
+
+
+@mock.patch.dict(exports.RENDERERS, {"pdf": fake_render, "pptx": fake_render})
+class PresentationExportTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        run = ToolRun.objects.create(tool=make_tool("klayout"), status="success")
+        self.image = self.media_root / "runs" / "1" / "preview.png"
+        self.image.parent.mkdir(parents=True)
+        self.image.write_bytes(b"png")
+        artifact = RunArtifact.objects.create(
+            run=run, artifact_type="image", name="preview", file_path="runs/1/preview.png",
+        )
+        self.deck = Presentation.objects.create(title="Tapeout", run=run)
+        slide = Slide.objects.create(presentation=self.deck, title="Layout")
+        SlideItem.objects.create(slide=slide, artifact=artifact, item_type="image")
+
+    def render(self, export):
+        claimed = exports.claim_next_export("host:1")
+        self.assertEqual(claimed.id, export.id)
+        return exports.run_export(claimed)
+
+    def test_revision_follows_the_inputs(self):
+        first = exports.revision(self.deck)
+        self.assertEqual(exports.revision(self.deck), first)
+
+        self.image.write_bytes(b"new png")
+        touched = exports.revision(self.deck)
+        self.assertNotEqual(touched, first)
+
+        self.deck.title = "Tapeout v2"
+        self.assertNotEqual(exports.revision(self.deck), touched)
+
+    def test_unchanged_deck_reuses_its_export(self):
+        export = exports.request_export(self.deck, "pdf")
+        self.render(export)
+
+        again = exports.request_export(self.deck, "pdf")
+
+        self.assertEqual(again.id, export.id)
+        self.assertEqual(again.status, "ready")
+        self.assertIsNone(exports.claim_next_export("host:1"))
+
+    def test_failed_export_is_queued_again(self):
+        export = exports.request_export(self.deck, "pdf")
+        with mock.patch.dict(exports.RENDERERS, {"pdf": mock.Mock(side_effect=RuntimeError("boom"))}):
+            self.assertEqual(self.render(export).status, "failed")
+
+        self.assertEqual(exports.request_export(self.deck, "pdf").status, "queued")
+
+    def test_new_revision_supersedes_the_old_file(self):
+        old = self.render(exports.request_export(self.deck, "pdf"))
+        old_path = exports.export_path(old)
+
+        self.deck.title = "Tapeout v2"
+        self.deck.save()
+        new = self.render(exports.request_export(self.deck, "pdf"))
+
+        old.refresh_from_db()
+        self.assertEqual((old.status, old.superseded_by_id), ("superseded", new.id))
+        self.assertFalse(old_path.exists())
+        self.assertEqual(exports.export_path(new).read_bytes(), b"deck Tapeout v2")
+
+    def test_get_never_creates_an_export(self):
+        response = self.client.get(f"/presentation/{self.deck.id}/pdf/")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["export_url"], f"/presentation/{self.deck.id}/export/pdf/")
+        self.assertFalse(PresentationExport.objects.exists())
+        self.assertEqual(self.client.post(f"/presentation/{self.deck.id}/pdf/").status_code, 405)
+
+    def test_post_starts_the_export_and_get_reports_then_serves_it(self):
+        response = self.client.post(f"/presentation/{self.deck.id}/export/pdf/")
+        self.assertEqual(response.status_code, 202)
+        export = PresentationExport.objects.get()
+
+        response = self.client.get(f"/presentation/{self.deck.id}/pdf/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["export_id"], export.id)
+
+        self.render(export)
+        response = self.client.get(f"/presentation/{self.deck.id}/pdf/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"deck Tapeout")
+        response.close()
+        self.assertEqual(PresentationExport.objects.count(), 1)
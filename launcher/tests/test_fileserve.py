@@ -0,0 +1,230 @@
+import os
+
+from django.http import FileResponse, HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from launcher import fileserve
+
+from .utils import MediaRootMixin
+
+
+def custom_backend(path, content_type):
+    # Dotted-path backend: offload .bin files, serve the rest locally
+    if path.endswith(".bin"):
+        response = HttpResponse(content_type=content_type)
+        response["X-Custom"] = path
+        return response
+    return None
+
+
+@override_settings(EDA_FILE_DELIVERY="sendfile", EDA_UPLOAD_MAX_RANGES=4)
+class ServeFileTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.path = self.media_root / "runs" / "report.bin"
+        self.path.parent.mkdir(parents=True)
+        self.data = bytes(range(256)) * 4
+        self.path.write_bytes(self.data)
+
+    def serve(self, **headers):
+        return fileserve.serve_file(self.factory.get("/uploads/runs/report.bin", headers=headers), str(self.path))
+
+    def body(self, response):
+        content = b"".join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_full_file_with_validators(self):
+        response = self.serve()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_if_none_match_answers_304(self):
+        etag = self.serve()["ETag"]
+
+        response = self.serve(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_rewritten_file_gets_a_new_etag(self):
+        etag = self.serve()["ETag"]
+        self.path.write_bytes(b"changed")
+
+        self.assertEqual(self.serve(if_none_match=etag).status_code, 200)
+
+    def test_single_range(self):
+        response = self.serve(range="bytes=10-19")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self.body(response), self.data[10:20])
+
+    def test_suffix_range(self):
+        response = self.serve(range="bytes=-5")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[-5:])
+
+    def test_multiple_ranges_are_multipart(self):
+        response = self.serve(range="bytes=0-1,100-101")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+        body = self.body(response)
+        self.assertEqual(len(body), int(response["Content-Length"]))
+        self.assertIn(b"Content-Range: bytes 0-1/1024\r\n\r\n" + self.data[0:2], body)
+        self.assertIn(b"Content-Range: bytes 100-101/1024\r\n\r\n" + self.data[100:102], body)
+
+    def test_overlapping_ranges_are_merged(self):
+        self.assertEqual(fileserve.parse_range("bytes=0-9,5-14,20-", 30), [(0, 14), (20, 29)])
+
+    def test_unsatisfiable_range_answers_416(self):
+        response = self.serve(range="bytes=5000-6000")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_too_many_ranges_serve_the_whole_file(self):
+        response = self.serve(range="bytes=0-0,2-2,4-4,6-6,8-8")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+    def test_if_range_with_current_etag_serves_the_range(self):
+        etag = self.serve()["ETag"]
+
+        response = self.serve(range="bytes=0-3", if_range=etag)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[:4])
+
+    def test_if_range_with_stale_etag_serves_the_whole_file(self):
+        response = self.serve(range="bytes=0-3", if_range='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+
+
+class DeliveryBackendTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.path = self.media_root / "runs" / "1 out" / "report.bin"
+        self.path.parent.mkdir(parents=True)
+        self.path.write_bytes(b"x" * 100)
+
+    def serve(self, **headers):
+        return fileserve.serve_file(self.factory.get("/uploads/runs/report.bin", headers=headers), str(self.path))
+
+    @override_settings(EDA_FILE_DELIVERY="x-accel", EDA_X_ACCEL_PREFIX="/protected-uploads/")
+    def test_x_accel_hands_the_body_to_nginx(self):
+        response = self.serve(range="bytes=0-9")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-uploads/runs/1%20out/report.bin")
+        self.assertEqual(response.content, b"")
+        self.assertIn("ETag", response)
+        self.assertNotIn("Content-Range", response)
+
+    @override_settings(EDA_FILE_DELIVERY="x-sendfile")
+    def test_x_sendfile_names_the_absolute_path(self):
+        response = self.serve()
+
+        self.assertEqual(response["X-Sendfile"], str(self.path))
+        self.assertEqual(response.content, b"")
+
+    @override_settings(EDA_FILE_DELIVERY="x-accel")
+    def test_conditional_requests_are_answered_before_offloading(self):
+        etag = self.serve()["ETag"]
+
+        response = self.serve(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    @override_settings(EDA_FILE_DELIVERY="x-accel")
+    def test_offloads_the_precompressed_sibling(self):
+        self.path = self.path.with_suffix(".log")
+        self.path.write_bytes(b"x" * 100)
+        gz = self.path.with_name(self.path.name + ".gz")
+        gz.write_bytes(b"gz")
+        # Fresh siblings carry the source's mtime (precompress.fresh_sibling)
+        st = self.path.stat()
+        os.utime(gz, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        response = self.serve(accept_encoding="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-uploads/runs/1%20out/report.log.gz")
+
+    @override_settings(EDA_FILE_DELIVERY="sendfile")
+    def test_sendfile_streams_a_real_file(self):
+        response = self.serve(range="bytes=10-19")
+
+        self.assertIsInstance(response, FileResponse)
+        # wsgi.file_wrapper needs a file descriptor for os.sendfile
+        self.assertIsInstance(response.file_to_stream.fileno(), int)
+        self.assertEqual(b"".join(response.streaming_content), b"x" * 10)
+        response.close()
+
+    @override_settings(EDA_FILE_DELIVERY="launcher.tests.test_fileserve.custom_backend")
+    def test_dotted_path_backend(self):
+        self.assertEqual(self.serve()["X-Custom"], str(self.path))
+
+        other = self.path.with_suffix(".txt")
+        other.write_bytes(b"local")
+        response = fileserve.serve_file(self.factory.get("/"), str(other))
+        self.assertEqual(b"".join(response.streaming_content), b"local")
+        response.close()
+
+
+class ServeUploadTests(MediaRootMixin, TestCase):
+    """
+    serve_upload reads BASE_DIR/uploads; it points at the temporary
+    MEDIA_ROOT here.
+    """
+
+    def setUp(self):
+        super().setUp()
+        base = override_settings(BASE_DIR=self.media_root)
+        base.enable()
+        self.addCleanup(base.disable)
+
+    def cache_control(self, rel):
+        path = self.media_root / "uploads" / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+
+        response = self.client.get(f"/uploads/{rel}")
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        return response["Cache-Control"]
+
+    def test_content_addressed_paths_are_immutable(self):
+        sha = "ab" * 32
+        for rel in (
+            f"blobs/ab/ab/{sha}",
+            f"cache/klayout/{sha}/preview.png",
+            f"cache/tiles/{sha}/3/1_2.png",
+            f"cache/renditions/{sha}/{'c' * 32}/thumb.jpg",
+        ):
+            with self.subTest(rel=rel):
+                self.assertIn("immutable", self.cache_control(rel))
+
+    def test_rewritable_paths_are_revalidated(self):
+        sha = "ab" * 32
+        for rel in (
+            "blobs/tmp/0123456789abcdef",
+            f"cache/verilator/{sha}/obj_dir/Vtop",
+            "runs/1/run.log",
+        ):
+            with self.subTest(rel=rel):
+                self.assertEqual(self.cache_control(rel), "private, no-cache")
@@ -0,0 +1,95 @@
+import os
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from launcher import klayout_cache
+from launcher.models import ExtractionCacheEntry, LayoutTileSet
+
+from .utils import MediaRootMixin
+
+
+GDS_A = "a" * 64
+GDS_B = "b" * 64
+
+
+class KLayoutCacheTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.script = self.media_root / "klayout_extract.py"
+        self.script.write_text("# v1\n")
+        script = override_settings(EDA_KLAYOUT_EXTRACT_SCRIPT=self.script)
+        script.enable()
+        self.addCleanup(script.disable)
+
+    def run_dir(self, name, payload=b"x" * 100):
+        folder = self.media_root / "runs" / name
+        folder.mkdir(parents=True)
+        for file_name in klayout_cache.CACHED_FILES:
+            (folder / file_name).write_bytes(payload)
+        return folder
+
+    def empty_dir(self, name):
+        folder = self.media_root / "runs" / name
+        folder.mkdir(parents=True)
+        return folder
+
+    def test_hit_links_outputs_into_the_run(self):
+        entry = klayout_cache.store(GDS_A, 1024, self.run_dir("first"))
+        self.assertEqual(entry.size_bytes, 300)
+
+        dest = self.empty_dir("second")
+        hit = klayout_cache.lookup(GDS_A, 1024, dest)
+
+        self.assertEqual(hit.pk, entry.pk)
+        for name in klayout_cache.CACHED_FILES:
+            self.assertEqual((dest / name).read_bytes(), b"x" * 100)
+        self.assertEqual(ExtractionCacheEntry.objects.get().hit_count, 1)
+
+    def test_miss_on_other_gds_size_or_script(self):
+        klayout_cache.store(GDS_A, 1024, self.run_dir("first"))
+
+        self.assertIsNone(klayout_cache.lookup(GDS_B, 1024, self.empty_dir("b")))
+        self.assertIsNone(klayout_cache.lookup(GDS_A, 2048, self.empty_dir("size")))
+
+        mtime = self.script.stat().st_mtime
+        self.script.write_text("# v2, edited\n")
+        os.utime(self.script, (mtime + 1, mtime + 1))
+        self.assertIsNone(klayout_cache.lookup(GDS_A, 1024, self.empty_dir("script")))
+
+    def test_entry_with_missing_files_is_dropped(self):
+        klayout_cache.store(GDS_A, 1024, self.run_dir("first"))
+        folder = klayout_cache.cache_dir(klayout_cache.cache_key(GDS_A, 1024))
+        (folder / "cells.json").unlink()
+
+        self.assertIsNone(klayout_cache.lookup(GDS_A, 1024, self.empty_dir("second")))
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+
+    def test_incomplete_run_is_not_stored(self):
+        folder = self.run_dir("first")
+        (folder / "metadata.json").unlink()
+
+        self.assertIsNone(klayout_cache.store(GDS_A, 1024, folder))
+
+    def test_eviction_drops_least_recently_hit_first(self):
+        with override_settings(EDA_KLAYOUT_CACHE_BYTES=10 ** 6):
+            klayout_cache.store(GDS_A, 1024, self.run_dir("a"))
+            klayout_cache.store(GDS_B, 1024, self.run_dir("b"))
+            klayout_cache.store_tile(GDS_A, 100)
+
+        # Oldest: B's extraction, then the tiles, then A's extraction
+        now = timezone.now()
+        ExtractionCacheEntry.objects.filter(gds_sha256=GDS_B).update(last_hit_at=now - timedelta(hours=3))
+        LayoutTileSet.objects.update(last_hit_at=now - timedelta(hours=2))
+        ExtractionCacheEntry.objects.filter(gds_sha256=GDS_A).update(last_hit_at=now - timedelta(hours=1))
+
+        self.assertEqual(klayout_cache.evict(budget=400), 1)
+        self.assertEqual(list(ExtractionCacheEntry.objects.values_list("gds_sha256", flat=True)), [GDS_A])
+        self.assertFalse(klayout_cache.cache_dir(klayout_cache.cache_key(GDS_B, 1024)).exists())
+
+        self.assertEqual(klayout_cache.evict(budget=300), 1)
+        self.assertFalse(LayoutTileSet.objects.exists())
+        self.assertEqual(klayout_cache.cache_bytes(), 300)
+
+        self.assertEqual(klayout_cache.evict(budget=300), 0)
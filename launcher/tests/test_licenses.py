@@ -0,0 +1,227 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from launcher import licenses
+from launcher.logstore import iter_run_output
+from launcher.models import License, LicenseAllocation, ToolRun
+from launcher.services import claim_next_run, enqueue_run, execute_queued_run
+
+from .utils import MediaRootMixin, make_tool
+
+
+class LicenseCheckoutTests(TestCase):
+    def setUp(self):
+        self.tool = make_tool("licensed", requires_license=True)
+        self.pool = License.objects.create(tool=self.tool, pool_size=2)
+
+    def test_unlicensed_tool_needs_no_seat(self):
+        self.assertIsNone(licenses.checkout(make_tool("free")))
+
+    def test_checkout_until_pool_is_full(self):
+        licenses.checkout(self.tool)
+        self.pool.refresh_from_db()
+        self.assertEqual((self.pool.active_count, self.pool.status), (1, "available"))
+
+        licenses.checkout(self.tool)
+        self.pool.refresh_from_db()
+        self.assertEqual((self.pool.active_count, self.pool.status), (2, "in_use"))
+
+        with self.assertRaises(licenses.LicenseUnavailable):
+            licenses.checkout(self.tool)
+
+    def test_least_loaded_pool_first(self):
+        other = License.objects.create(tool=self.tool, pool_size=4)
+
+        allocation = licenses.checkout(self.tool)
+
+        self.assertEqual(allocation.license_id, other.id)
+
+    def test_expired_pool_is_skipped(self):
+        self.pool.expiry_date = timezone.now() - timedelta(days=1)
+        self.pool.save()
+
+        with self.assertRaises(licenses.LicenseUnavailable):
+            licenses.checkout(self.tool)
+
+    def test_release_returns_the_seat_once(self):
+        allocation = licenses.checkout(self.tool)
+        licenses.checkout(self.tool)
+
+        self.assertTrue(licenses.release(allocation))
+        self.assertFalse(licenses.release(allocation))
+
+        self.pool.refresh_from_db()
+        self.assertEqual((self.pool.active_count, self.pool.status), (1, "available"))
+        allocation.refresh_from_db()
+        self.assertEqual(allocation.status, "released")
+        self.assertIsNotNone(allocation.released_at)
+
+    def test_release_keeps_an_expired_pool_expired(self):
+        allocation = licenses.checkout(self.tool)
+        License.objects.filter(pk=self.pool.pk).update(status="expired")
+
+        licenses.release(allocation)
+
+        self.pool.refresh_from_db()
+        self.assertEqual((self.pool.active_count, self.pool.status), (0, "expired"))
+
+    def test_held_releases_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with licenses.held(licenses.checkout(self.tool)):
+                self.pool.refresh_from_db()
+                self.assertEqual(self.pool.active_count, 1)
+                raise RuntimeError("job failed")
+
+        self.pool.refresh_from_db()
+        self.assertEqual(self.pool.active_count, 0)
+
+    def test_reap_expired_reclaims_dead_leases_only(self):
+        dead = licenses.checkout(self.tool)
+        alive = licenses.checkout(self.tool)
+        LicenseAllocation.objects.filter(id=dead.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(licenses.reap_expired(), 1)
+        self.assertEqual(licenses.reap_expired(), 0)
+
+        self.pool.refresh_from_db()
+        self.assertEqual(self.pool.active_count, 1)
+        self.assertEqual(LicenseAllocation.objects.get(id=dead.id).status, "released")
+        self.assertEqual(LicenseAllocation.objects.get(id=alive.id).status, "active")
+
+        # The holder's own release after the reap must not free a second seat
+        self.assertFalse(licenses.release(dead))
+        self.pool.refresh_from_db()
+        self.assertEqual(self.pool.active_count, 1)
+
+
+class LicenseQueueTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tool = make_tool("licensed", requires_license=True)
+        self.pool = License.objects.create(tool=self.tool, pool_size=1)
+        self.heavy = get_user_model().objects.create(username="heavy")
+        self.light = get_user_model().objects.create(username="light")
+
+    def enqueue(self, user=None, waited=0):
+        run = enqueue_run(tool=self.tool, user=user, job_type="klayout")
+        ToolRun.objects.filter(id=run.id).update(created_at=timezone.now() - timedelta(seconds=waited))
+        return run
+
+    def used(self, user, seconds):
+        allocation = LicenseAllocation.objects.create(
+            license=self.pool, user=user, status="released", released_at=timezone.now(),
+        )
+        # started_at is auto_now_add
+        LicenseAllocation.objects.filter(id=allocation.id).update(started_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_licensed_run_waits_for_a_seat(self):
+        License.objects.filter(id=self.pool.id).update(active_count=1, status="in_use")
+        run = self.enqueue()
+
+        self.assertIsNone(claim_next_run("host:1"))
+
+        License.objects.filter(id=self.pool.id).update(active_count=0, status="available")
+        self.assertEqual(claim_next_run("host:1").id, run.id)
+
+    def test_run_without_a_pool_fails_instead_of_waiting(self):
+        self.pool.delete()
+        run = self.enqueue()
+
+        claimed = claim_next_run("host:1")
+        self.assertEqual(claimed.id, run.id)
+        execute_queued_run(claimed)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, "failed")
+        self.assertIn("No licensed license pool", "".join(iter_run_output(run, "stderr")))
+
+    def test_least_usage_goes_first(self):
+        self.used(self.heavy, 3600)
+        self.used(self.light, 60)
+        heavy = self.enqueue(self.heavy, waited=10)
+        light = self.enqueue(self.light)
+
+        self.assertEqual([r.id for r in licenses.queue(self.tool)], [light.id, heavy.id])
+        self.assertAlmostEqual(licenses.usage([self.tool.id])[self.tool.id][self.heavy.id], 3600, delta=1)
+
+    def test_waiting_offsets_usage(self):
+        self.used(self.heavy, 600)
+        heavy = self.enqueue(self.heavy, waited=1200)
+        light = self.enqueue(self.light)
+
+        self.assertEqual([r.id for r in licenses.queue(self.tool)], [heavy.id, light.id])
+
+    def test_usage_outside_the_window_is_ignored(self):
+        with self.settings(EDA_LICENSE_FAIR_SHARE_WINDOW=1800):
+            self.used(self.heavy, 3600)
+
+            used = licenses.usage([self.tool.id])[self.tool.id][self.heavy.id]
+
+        self.assertAlmostEqual(used, 1800, delta=1)
+
+    def test_claimable_runs_fill_free_seats_in_queue_order(self):
+        License.objects.create(tool=self.tool, pool_size=1)
+        other = make_tool("other", requires_license=True)
+        License.objects.create(tool=other, pool_size=1)
+        self.used(self.heavy, 3600)
+        runs = [self.enqueue(self.heavy), self.enqueue(self.light), self.enqueue(self.light)]
+        enqueue_run(tool=other, user=None, job_type="klayout")
+
+        with self.assertNumQueries(5):
+            ids = licenses.claimable_runs()
+
+        self.assertEqual(sorted(ids)[:2], sorted([runs[1].id, runs[2].id]))
+        self.assertEqual(len(ids), 3)
+
+    def test_queue_status_estimates_the_wait(self):
+        started = timezone.now()
+        ToolRun.objects.create(
+            tool=self.tool, status="success", started_at=started - timedelta(seconds=100), completed_at=started,
+        )
+        licenses.checkout(self.tool)
+        LicenseAllocation.objects.update(started_at=timezone.now() - timedelta(seconds=40))
+        first = self.enqueue(waited=20)
+        second = self.enqueue()
+
+        status = licenses.queue_status(first)
+        self.assertEqual((status["position"], status["ahead"], status["pool_size"]), (1, 0, 1))
+        self.assertAlmostEqual(status["eta_seconds"], 60, delta=1)
+
+        status = licenses.queue_status(second)
+        self.assertEqual(status["position"], 2)
+        self.assertAlmostEqual(status["eta_seconds"], 160, delta=1)
+
+
+class LicenseDashboardTests(TestCase):
+    def setUp(self):
+        self.tool = make_tool("licensed", requires_license=True)
+        self.pools = [License.objects.create(tool=self.tool, pool_size=2) for _ in range(2)]
+        for _ in range(3):
+            enqueue_run(tool=self.tool, user=None, job_type="klayout")
+
+    def test_pools_with_holders_query_count_is_fixed(self):
+        users = [get_user_model().objects.create(username=f"u{i}") for i in range(3)]
+        for user in users:
+            licenses.checkout(self.tool, user=user)
+        other = make_tool("other", requires_license=True)
+        License.objects.create(tool=other, pool_size=1)
+
+        with self.assertNumQueries(2):
+            pools = list(licenses.pools_with_holders())
+            holders = [a.user.username for pool in pools for a in pool.active_allocations]
+
+        self.assertEqual(sorted(holders), ["u0", "u1", "u2"])
+        self.assertEqual(sum(pool.held for pool in pools), 3)
+
+    def test_queued_is_counted_once_per_tool(self):
+        other = make_tool("other", requires_license=True)
+
+        self.assertEqual(licenses.queued_counts([self.tool.id, other.id]), {self.tool.id: 3, other.id: 0})
+
+        data = self.client.get(reverse("license-dashboard")).json()
+        self.assertNotIn("queued", data["pools"][0])
+        self.assertEqual([(u["tool_id"], u["queued"]) for u in data["utilization"]], [(self.tool.id, 3)])
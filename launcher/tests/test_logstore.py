@@ -0,0 +1,106 @@
+import os
+
+from django.test import TestCase, override_settings
+
+from launcher import logstore
+from launcher.models import ToolRun
+
+from .utils import MediaRootMixin, make_tool
+
+
+@override_settings(EDA_LOG_SEGMENT_BYTES=100, EDA_LOG_EXCERPT_CHARS=20)
+class LogSegmentTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.run = ToolRun.objects.create(tool=make_tool("verilator"))
+
+    def write(self, *chunks, stream="stdout"):
+        with logstore.LogSegmentWriter(self.run, stream) as w:
+            for chunk in chunks:
+                w.write(chunk)
+        self.run.save()
+
+    def test_output_round_trips_through_segments(self):
+        lines = [f"line {i:03d}\n" for i in range(50)]
+        self.write(*lines)
+
+        self.assertGreater(len(logstore.segment_paths(self.run, "stdout")), 1)
+        self.assertEqual("".join(logstore.iter_run_output(self.run, "stdout")), "".join(lines))
+        self.assertEqual(logstore.segment_paths(self.run, "stderr"), [])
+
+    def test_row_keeps_only_size_and_excerpt(self):
+        text = "".join(f"line {i:03d}\n" for i in range(50))
+        self.write(text)
+
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.stdout_bytes, len(text))
+        self.assertEqual(self.run.stdout_head, text[:20])
+        self.assertEqual(self.run.stdout_tail, text[-20:])
+        self.assertIn(f"[{len(text) - 40} bytes omitted]", logstore.output_excerpt(self.run, "stdout"))
+
+    def test_appends_continue_after_existing_segments(self):
+        self.write("first\n")
+        logstore.append_run_output(self.run, "stdout", "second\n")
+
+        self.assertEqual("".join(logstore.iter_run_output(self.run, "stdout")), "first\nsecond\n")
+        self.assertEqual(self.run.stdout_bytes, len("first\nsecond\n"))
+
+    def test_short_output_excerpt_is_complete(self):
+        self.write("ok\n", stream="stderr")
+
+        self.assertEqual(logstore.output_excerpt(self.run, "stderr"), "ok\n")
+
+    def test_unknown_stream(self):
+        with self.assertRaises(ValueError):
+            logstore.LogSegmentWriter(self.run, "stdin")
+
+
+@override_settings(EDA_LOG_SNIPPET_LINES=50)
+class LineWindowTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = self.media_root / "klayout.log"
+        self.log.write_text("".join(f"line {i}\n" for i in range(1, 1001)))
+        logstore.build_line_index(self.log, stride=64)
+
+    def lines(self, first, last):
+        return "".join(f"line {i}\n" for i in range(first, last + 1))
+
+    def test_index_header(self):
+        with open(logstore.line_index_path(self.log), "rb") as f:
+            stride, total = logstore._INDEX_HEADER.unpack(f.read(logstore._INDEX_HEADER.size))
+
+        self.assertEqual((stride, total), (64, 1000))
+
+    def test_window_across_checkpoints(self):
+        for start, end in ((1, 1), (60, 70), (64, 65), (129, 129), (990, 1000)):
+            window = logstore.read_line_window(self.log, start, end)
+            self.assertEqual(window.text, self.lines(start, end))
+            self.assertEqual((window.start, window.end, window.clamped), (start, end, False))
+
+    def test_window_is_clamped_to_max_lines(self):
+        window = logstore.read_line_window(self.log, 10, 500)
+
+        self.assertEqual(window.text, self.lines(10, 59))
+        self.assertEqual((window.end, window.clamped), (59, True))
+
+    def test_window_past_the_end(self):
+        window = logstore.read_line_window(self.log, 995, 1010)
+        self.assertEqual((window.text, window.end), (self.lines(995, 1000), 1000))
+
+        window = logstore.read_line_window(self.log, 2000, 2010)
+        self.assertEqual((window.text, window.start, window.end), ("", 2000, 1999))
+
+    def test_last_line_without_newline(self):
+        self.log.write_text("a\nb\nc")
+        logstore.build_line_index(self.log, stride=2)
+
+        self.assertEqual(logstore.read_line_window(self.log, 3, 3).text, "c")
+
+    def test_stale_index_is_rebuilt(self):
+        index = logstore.line_index_path(self.log)
+        old = index.stat().st_mtime
+        self.log.write_text("new\n")
+        os.utime(index, (old - 10, old - 10))
+
+        self.assertEqual(logstore.read_line_window(self.log, 1, 5).text, "new\n")
@@ -0,0 +1,81 @@
+import gzip
+import os
+
+import brotli
+from django.test import TestCase, override_settings
+
+from launcher import precompress, waveform
+from launcher.models import RunArtifact, ToolRun
+
+from .test_waveform import VCD
+from .utils import MediaRootMixin, make_tool
+
+
+@override_settings(EDA_PRECOMPRESS_MIN_BYTES=64)
+class PrecompressTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.run_dir = self.media_root / "runs" / "1"
+        self.run_dir.mkdir(parents=True)
+        self.log = self.run_dir / "run.log"
+        self.text = "cycle 42: all assertions passed\n" * 200
+        self.log.write_text(self.text)
+
+    def test_writes_both_siblings_with_the_source_mtime(self):
+        self.assertEqual(precompress.compress_file(self.log), 2)
+
+        st = self.log.stat()
+        br, gz = self.run_dir / "run.log.br", self.run_dir / "run.log.gz"
+        self.assertEqual(brotli.decompress(br.read_bytes()).decode(), self.text)
+        self.assertEqual(gzip.decompress(gz.read_bytes()).decode(), self.text)
+        self.assertEqual(precompress.fresh_sibling(self.log, st, ".gz"), gz)
+
+        self.assertEqual(precompress.compress_file(self.log), 0)
+
+    def test_rewritten_source_makes_siblings_stale(self):
+        precompress.compress_file(self.log)
+        self.log.write_text("rewritten\n" * 200)
+        os.utime(self.log, ns=(0, self.log.stat().st_mtime_ns + 10 ** 9))
+
+        self.assertIsNone(precompress.fresh_sibling(self.log, self.log.stat(), ".br"))
+        self.assertEqual(precompress.compress_file(self.log), 2)
+
+    def test_skips_small_binary_and_incompressible_files(self):
+        small = self.run_dir / "small.log"
+        small.write_text("short")
+        image = self.run_dir / "preview.png"
+        image.write_bytes(b"\0" * 4096)
+        noise = self.run_dir / "noise.txt"
+        noise.write_bytes(os.urandom(4096))
+
+        for path in (small, image, noise):
+            with self.subTest(path=path.name):
+                self.assertEqual(precompress.compress_file(path), 0)
+                self.assertFalse((self.run_dir / f"{path.name}.gz").exists())
+
+    def test_precompress_run_covers_artifacts_and_run_outputs(self):
+        run = ToolRun.objects.create(tool=make_tool("verilator"), status="success", run_dir=str(self.run_dir))
+        (self.run_dir / "metadata.json").write_text('{"cells": []}' * 100)
+        (self.run_dir / "image.svg").write_text("<svg/>" * 100)
+        RunArtifact.objects.create(run=run, artifact_type="metadata", name="m", file_path="runs/1/metadata.json")
+        RunArtifact.objects.create(run=run, artifact_type="image", name="i", file_path="runs/1/image.svg")
+
+        self.assertEqual(precompress.precompress_run(run), 4)
+        self.assertTrue((self.run_dir / "metadata.json.br").exists())
+        self.assertFalse((self.run_dir / "image.svg.br").exists())
+
+    def test_compressed_wave_vcd_is_still_found_as_vcd(self):
+        run = ToolRun.objects.create(tool=make_tool("verilator"), status="success", run_dir=str(self.run_dir))
+        (self.run_dir / "wave.vcd").write_text(VCD * 20, encoding="ascii")
+
+        precompress.precompress_run(run)
+        self.assertTrue((self.run_dir / "wave.vcd.gz").exists())
+
+        wave = waveform.find_waveform(self.run_dir)
+        self.assertEqual(wave, self.run_dir / "wave.vcd")
+        self.assertEqual(waveform.wave_format(wave), "vcd")
+
+    def test_simulator_vcd_gz_is_found(self):
+        (self.run_dir / "wave.vcd.gz").write_bytes(gzip.compress(VCD.encode()))
+
+        self.assertEqual(waveform.find_waveform(self.run_dir), self.run_dir / "wave.vcd.gz")
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+
+from launcher.models import ToolRun
+from launcher.services import claim_next_run, enqueue_run, requeue_orphaned_runs, resume_run
+
+from .utils import MediaRootMixin, make_tool
+
+
+class ClaimNextRunTests(TestCase):
+    def setUp(self):
+        self.tool = make_tool("klayout")
+
+    def enqueue(self):
+        return enqueue_run(tool=self.tool, user=None, job_type="klayout")
+
+    def test_claims_oldest_first(self):
+        first = self.enqueue()
+        second = self.enqueue()
+        ToolRun.objects.filter(id=second.id).update(created_at=first.created_at + timedelta(seconds=1))
+
+        claimed = claim_next_run("host:1")
+
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, "running")
+        self.assertEqual(claimed.worker_id, "host:1")
+        self.assertIsNotNone(claimed.started_at)
+
+    def test_run_is_claimed_once(self):
+        run = self.enqueue()
+
+        self.assertEqual(claim_next_run("host:1").id, run.id)
+        self.assertIsNone(claim_next_run("host:2"))
+
+    def test_ignores_runs_without_job_type(self):
+        ToolRun.objects.create(tool=self.tool, status="queued")
+
+        self.assertIsNone(claim_next_run("host:1"))
+
+    def test_requeue_orphaned_runs_of_one_worker(self):
+        run = self.enqueue()
+        claim_next_run("host:1")
+
+        self.assertEqual(requeue_orphaned_runs(worker_id="host:2"), 0)
+        self.assertEqual(requeue_orphaned_runs(worker_id="host:1"), 1)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, "queued")
+        self.assertEqual(run.worker_id, "")
+        self.assertEqual(claim_next_run("host:3").id, run.id)
+
+
+@override_settings(EDA_WORKER_MAX_ATTEMPTS=2)
+class RetryLimitTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.run = enqueue_run(tool=make_tool("klayout"), user=None, job_type="klayout")
+
+    def test_claim_counts_attempts(self):
+        claim_next_run("host:1")
+        requeue_orphaned_runs(worker_id="host:1")
+        claimed = claim_next_run("host:2")
+
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_run_fails_once_its_worker_died_too_often(self):
+        claim_next_run("host:1")
+        self.assertEqual(requeue_orphaned_runs(worker_id="host:1"), 1)
+        claim_next_run("host:2")
+        self.assertEqual(requeue_orphaned_runs(worker_id="host:2"), 0)
+
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, "failed")
+        self.assertIsNotNone(self.run.completed_at)
+        self.assertIn("Gave up after 2 attempts", self.run.stderr_head)
+        self.assertIsNone(claim_next_run("host:3"))
+
+    def test_resume_starts_counting_again(self):
+        claim_next_run("host:1")
+        requeue_orphaned_runs(worker_id="host:1")
+        claim_next_run("host:2")
+        requeue_orphaned_runs(worker_id="host:2")
+
+        self.run.refresh_from_db()
+        self.assertTrue(resume_run(self.run))
+        self.assertEqual(claim_next_run("host:3").attempts, 1)
@@ -0,0 +1,91 @@
+import os
+
+from django.test import TestCase
+from PIL import Image
+
+from launcher import renditions
+from launcher.models import RunArtifact, ToolRun
+from launcher.services import claim_next_post_run, post_run
+
+from .utils import MediaRootMixin, make_tool
+
+
+class RenditionTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.run = ToolRun.objects.create(tool=make_tool("klayout"), status="success")
+        self.source = self.media_root / "runs" / "1" / "preview.png"
+        self.source.parent.mkdir(parents=True)
+        self.artifact = RunArtifact.objects.create(
+            run=self.run, artifact_type="image", name="preview", file_path="runs/1/preview.png",
+        )
+
+    def save(self, img):
+        img.save(self.source)
+
+    def flat(self, size=(1600, 1200)):
+        # Layout-like art: a few solid colours
+        img = Image.new("RGB", size, (255, 255, 255))
+        img.paste((200, 40, 40), (100, 100, 900, 700))
+        return img
+
+    def noisy(self, size=(640, 640)):
+        return Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).resize((160, 160)).resize(size)
+
+    def test_existing_rendition_never_builds(self):
+        self.save(self.flat())
+
+        self.assertEqual(renditions.existing_rendition(self.artifact, "thumb"), "runs/1/preview.png")
+        self.assertFalse((self.media_root / "cache").exists())
+
+    def test_build_all_downscales_and_is_then_found(self):
+        self.save(self.flat())
+
+        built = renditions.build_all(self.artifact)
+
+        for name, (width, height, _) in renditions.RENDITIONS.items():
+            with self.subTest(name=name):
+                self.assertTrue(built[name].startswith("cache/renditions/"))
+                self.assertEqual(renditions.existing_rendition(self.artifact, name), built[name])
+                with Image.open(self.media_root / built[name]) as img:
+                    self.assertLessEqual(img.width, width)
+                    self.assertLessEqual(img.height, height)
+
+    def test_smallest_format_wins(self):
+        self.save(self.flat())
+        self.assertTrue(renditions.rendition(self.artifact, "thumb").endswith(".png"))
+
+        self.save(self.noisy())
+        self.assertTrue(renditions.rendition(self.artifact, "thumb").endswith(".jpg"))
+
+    def test_changed_source_gets_new_files_and_prunes_old_ones(self):
+        self.save(self.flat())
+        old = renditions.rendition(self.artifact, "slide")
+
+        self.save(self.flat((1600, 800)))
+        st = self.source.stat()
+        os.utime(self.source, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(renditions.existing_rendition(self.artifact, "slide"), "runs/1/preview.png")
+
+        new = renditions.rendition(self.artifact, "slide")
+
+        self.assertNotEqual(new, old)
+        self.assertTrue((self.media_root / new).exists())
+        self.assertFalse((self.media_root / old).parent.exists())
+
+    def test_unreadable_source_falls_back_to_the_original(self):
+        self.assertEqual(renditions.rendition(self.artifact, "thumb"), "runs/1/preview.png")
+
+        self.source.write_bytes(b"not an image")
+        self.assertEqual(renditions.rendition(self.artifact, "thumb"), "runs/1/preview.png")
+
+    def test_post_run_builds_renditions_once(self):
+        self.save(self.flat())
+        ToolRun.objects.filter(id=self.run.id).update(post_run_pending=True)
+
+        run = claim_next_post_run("host:1")
+        self.assertEqual(run.id, self.run.id)
+        self.assertIsNone(claim_next_post_run("host:2"))
+
+        post_run(run)
+        self.assertNotEqual(renditions.existing_rendition(self.artifact, "thumb"), "runs/1/preview.png")
@@ -0,0 +1,113 @@
+from django.test import TestCase
+
+from launcher import verilator_build
+from launcher.models import VerilatorBuildEntry
+from launcher.verilator_build import normalize_source
+
+from .utils import MediaRootMixin
+
+
+SOURCE = """module top_counter(input clk, output reg [3:0] q);
+  // count up
+  always @(posedge clk) q <= q + 1;
+endmodule
+"""
+
+
+class NormalizeSourceTests(TestCase):
+    def test_comments_and_indentation_are_ignored(self):
+        self.assertEqual(normalize_source("\ta  =  b; // note\n"), normalize_source("a = b;\n"))
+        self.assertEqual(normalize_source("a = /* x */ b;\n"), normalize_source("a = b;\n"))
+        self.assertEqual(
+            normalize_source(SOURCE.replace("// count up", "// count up by one")),
+            normalize_source(SOURCE),
+        )
+
+    def test_comment_lines_are_kept_as_line_breaks(self):
+        # Line numbers in Verilator messages must not shift
+        self.assertEqual(normalize_source("/* a\n b */\nx;\n"), "\n\nx;\n")
+
+    def test_line_breaks_are_kept(self):
+        self.assertNotEqual(normalize_source("a;\nb;\n"), normalize_source("a; b;\n"))
+
+    def test_string_literals_are_kept(self):
+        self.assertNotEqual(
+            normalize_source('$display("a  b");\n'),
+            normalize_source('$display("a b");\n'),
+        )
+        self.assertIn('"http://x // y"', normalize_source('$display("http://x // y");\n'))
+
+    def test_directive_comments_are_kept(self):
+        for directive in ("// verilator lint_off WIDTH", "/* synopsys translate_off */", "// pragma protect"):
+            self.assertIn(directive, normalize_source(f"wire a; {directive}\n"))
+            self.assertNotEqual(normalize_source(f"wire a; {directive}\n"), normalize_source("wire a;\n"))
+
+
+class BuildCacheTests(MediaRootMixin, TestCase):
+    top = "top_counter"
+    flags = "--trace"
+
+    def setUp(self):
+        super().setUp()
+        self.source = self.media_root / "counter.v"
+        self.source.write_text(SOURCE)
+
+    def build(self):
+        """
+        checkout + a stand-in for Verilator/make: write the binary
+        and record the build.
+        """
+        with verilator_build.build_lock(verilator_build.build_key(self.top, self.flags)) as folder:
+            entry, state, sha = verilator_build.checkout(self.source, self.top, self.flags)
+            if state != "hit":
+                binary = folder / "obj_dir" / f"V{self.top}"
+                binary.parent.mkdir(exist_ok=True)
+                binary.write_bytes(b"\x7fELF")
+                verilator_build.record_build(entry, sha)
+        return state, folder
+
+    def test_miss_then_hit(self):
+        state, folder = self.build()
+        self.assertEqual(state, "miss")
+        self.assertTrue((folder / "top_counter.v").exists())
+        self.assertIn("Vtop_counter", (folder / "sim_main.cpp").read_text())
+
+        self.assertEqual(self.build()[0], "hit")
+        entry = VerilatorBuildEntry.objects.get()
+        self.assertEqual((entry.build_count, entry.hit_count), (1, 1))
+
+    def test_comment_edit_is_still_a_hit(self):
+        self.build()
+        self.source.write_text(SOURCE.replace("// count up", "// count up by one"))
+
+        self.assertEqual(self.build()[0], "hit")
+
+    def test_source_change_rebuilds_incrementally_in_place(self):
+        _, folder = self.build()
+        self.source.write_text(SOURCE.replace("q + 1", "q + 2"))
+
+        state, again = self.build()
+
+        self.assertEqual(state, "incremental")
+        self.assertEqual(again, folder)
+        self.assertIn("q + 2", (folder / "top_counter.v").read_text())
+        self.assertEqual(VerilatorBuildEntry.objects.get().build_count, 2)
+
+    def test_other_flags_get_their_own_directory(self):
+        _, folder = self.build()
+        self.flags = "--trace-fst"
+
+        state, other = self.build()
+
+        self.assertEqual(state, "miss")
+        self.assertNotEqual(other, folder)
+
+    def test_evict_skips_locked_directories(self):
+        self.build()
+        entry = VerilatorBuildEntry.objects.get()
+
+        with verilator_build.build_lock(entry.key):
+            self.assertEqual(verilator_build.evict(budget=0), 0)
+
+        self.assertEqual(verilator_build.evict(budget=0), 1)
+        self.assertFalse(verilator_build.build_dir(entry.key).exists())
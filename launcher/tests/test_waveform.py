@@ -0,0 +1,122 @@
+from django.test import TestCase
+
+from launcher import waveform
+from launcher.models import ToolRun, WaveformIndexJob
+
+from .utils import MediaRootMixin, make_tool
+
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var real 64 ! level $end
+$var wire 4 " count [3:0] $end
+$upscope $end
+$enddefinitions $end
+#0
+r9.5 !
+b10 "
+#10
+r10.25 !
+b1001 "
+#20
+r-3 !
+b11 "
+#30
+r100 !
+bx1 "
+#40
+r2 !
+b100 "
+"""
+
+
+class WaveformQueryTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.wave = self.media_root / "wave.vcd"
+        self.wave.write_text(VCD, encoding="ascii")
+        waveform.build_index(self.wave)
+
+    def test_meta(self):
+        meta = waveform.load_meta(self.wave)
+
+        self.assertEqual(meta["timescale"], "1ns")
+        self.assertEqual(meta["end_time"], 40)
+        self.assertEqual([s["name"] for s in meta["signals"]], ["top.level", "top.count"])
+
+    def test_window_and_signal_subset(self):
+        result = waveform.query(self.wave, [1], start=15, end=35)
+
+        self.assertEqual(list(result["signals"]), [1])
+        count = result["signals"][1]
+        self.assertEqual(int(count["initial"], 2), 0b1001)
+        self.assertEqual([t for t, _ in count["changes"]], [20, 30])
+
+    def test_missing_index_is_pending(self):
+        other = self.media_root / "other.vcd"
+        other.write_text(VCD, encoding="ascii")
+
+        with self.assertRaises(waveform.WaveformIndexPending):
+            waveform.query(other, [0])
+
+
+class WaveformMinMaxTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.wave = self.media_root / "wave.vcd"
+        self.wave.write_text(VCD, encoding="ascii")
+        waveform.build_index(self.wave)
+
+    def bucket(self, signal_id):
+        # The #0 values are the initial state; the four later changes
+        # exceed 2 * width, so they come back as one [time, min, max] bucket
+        result = waveform.query(self.wave, [signal_id], width=1)
+        [bucket] = result["signals"][signal_id]["buckets"]
+        return bucket
+
+    def test_reals_compare_as_numbers(self):
+        time, lo, hi = self.bucket(0)
+
+        self.assertEqual(time, 10)
+        self.assertEqual(float(lo), -3)
+        self.assertEqual(float(hi), 100)
+
+    def test_vectors_compare_as_numbers_and_skip_unknowns(self):
+        time, lo, hi = self.bucket(1)
+
+        self.assertEqual(int(lo, 2), 0b11)
+        self.assertEqual(int(hi, 2), 0b1001)
+
+    def test_extremes(self):
+        self.assertEqual(waveform._extremes([b" 9.5", b"10.25", b"  -3"], real=True), (b"  -3", b"10.25"))
+        self.assertEqual(waveform._extremes([b"0x1", b"0011", b"1000"], real=False), (b"0011", b"1000"))
+        self.assertEqual(waveform._extremes([b"0x1", b"z"], real=False), (b"0x1", b"0x1"))
+
+
+class WaveformIndexJobTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        run_dir = self.media_root / "runs" / "sim"
+        run_dir.mkdir(parents=True)
+        self.wave = run_dir / "wave.vcd"
+        self.wave.write_text(VCD, encoding="ascii")
+        self.run = ToolRun.objects.create(tool=make_tool("verilator"), run_dir=str(run_dir), status="success")
+
+    def test_job_builds_the_index_and_goes_away(self):
+        waveform.request_index(self.run)
+
+        job = waveform.claim_next_index("host:1")
+        self.assertIsNone(waveform.claim_next_index("host:2"))
+        waveform.run_index_job(job)
+
+        self.assertFalse(WaveformIndexJob.objects.exists())
+        self.assertIsNotNone(waveform.read_meta(self.wave))
+
+    def test_failure_is_reported_once_then_retried(self):
+        self.wave.unlink()
+        waveform.request_index(self.run)
+        waveform.run_index_job(waveform.claim_next_index("host:1"))
+
+        self.assertEqual(WaveformIndexJob.objects.get().status, "failed")
+        self.assertEqual(waveform.request_index(self.run).status, "failed")
+        self.assertEqual(WaveformIndexJob.objects.get().status, "queued")
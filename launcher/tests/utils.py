@@ -0,0 +1,26 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+
+from launcher.models import Category, Tool
+
+
+def make_tool(slug, requires_license=False):
+    category, _ = Category.objects.get_or_create(name="Tests", slug="tests")
+    return Tool.objects.create(name=slug, slug=slug, category=category, requires_license=requires_license)
+
+
+class MediaRootMixin:
+    """
+    Runs each test against an empty temporary MEDIA_ROOT.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
@@ -37,6 +37,7 @@ urlpatterns = [
 
     # Verilator
     path("tool/<slug:slug>/run/", views.run_tool, name="launcher-run-tool"),
+    path("tool/<slug:slug>/batch/", views.run_batch, name="launcher-run-batch"),
 
     # KLayout Web Upload
     path("klayout-run/", views.klayout_run, name="klayout-run"),
@@ -45,8 +46,9 @@ urlpatterns = [
     path("launch-desktop/<slug:slug>/", views.launch_desktop, name="launcher-launch-desktop"),
     path("launch-web/<slug:slug>/", views.launch_web, name="launcher-launch-web"),
 
-    # Uploaded files
+    # Uploaded files (MEDIA_URL links too: path / Range / delivery backend checks)
     path("uploads/<path:path>/", views.serve_upload, name="launcher-uploads"),
+    path("uploads/<path:path>", views.serve_upload, name="launcher-media"),
 
     #path("open-cli/<str:workdir>/", views.open_cli, name="open-cli"),
     path("klayout-run/", views.klayout_run, name="klayout-run"),
@@ -67,6 +69,24 @@ urlpatterns = [
 
     path("logs/run/<int:run_id>/download/",views.download_run_logs,name="download-run-logs"),
 
+    path("run/<int:run_id>/status/",views.run_status,name="run-status"),
+
+    path("run/<int:run_id>/stream/",views.run_log_stream,name="run-log-stream"),
+
+    path("run/<int:run_id>/resume/",views.resume_run_view,name="run-resume"),
+
+    path("run/<int:run_id>/tiles/",views.layout_tiles,name="layout-tiles"),
+
+    path("run/<int:run_id>/tiles/<int:z>/<int:x>/<int:y>.png",views.layout_tile,name="layout-tile"),
+
+    path("api/layers/",views.layer_statistics,name="layer-statistics"),
+
+    path("api/licenses/",views.license_dashboard,name="license-dashboard"),
+
+    path("run/<int:run_id>/waveform/signals/",views.waveform_signals,name="waveform-signals"),
+
+    path("run/<int:run_id>/waveform/",views.waveform_window,name="waveform-window"),
+
     path("presentations/", views.presentation_list, name="presentation-list"),
 
     path("presentation/<int:pk>/", views.presentation_detail, name="presentation-detail"),
@@ -83,6 +103,12 @@ urlpatterns = [
 
     path("presentation/<int:pk>/pptx/",views.presentation_pptx,name="presentation-pptx"),
 
+    path("presentation/<int:pk>/export/<str:fmt>/",views.presentation_export,name="presentation-export"),
+
+    path("presentation/export/<int:export_id>/status/",views.presentation_export_status,name="presentation-export-status"),
+
+    path("presentation/export/<int:export_id>/download/",views.presentation_export_download,name="presentation-export-download"),
+
     path("run/<int:run_id>/create-presentation/",views.create_presentation,name="create-presentation"),
 
     path('login/',auth_views.LoginView.as_view(template_name='launcher/login.html'),name='login'),
@@ -1,23 +1,119 @@
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <memory>
+#include <string>
+
 #include "VMODULE_NAME.h"
 #include "verilated.h"
+
+#if VM_TRACE_FST
+#include "verilated_fst_c.h"
+typedef VerilatedFstC TraceFile;
+#define WAVE_FILE "wave.fst"
+#else
 #include "verilated_vcd_c.h"
+typedef VerilatedVcdC TraceFile;
+#define WAVE_FILE "wave.vcd"
+#endif
+
+#if EDA_SAVABLE
+#include "verilated_save.h"
+#endif
+
+// Run-time parameters (plusargs, so one build serves every run length):
+//
+//   +cycles=N              clock cycles to simulate (default 20)
+//   +trace_start=N         first cycle written to the waveform
+//   +trace_stop=N          cycle at which tracing stops (0 = never)
+//   +checkpoint_every=N    save checkpoint.vlt every N cycles (needs --savable)
+//   +restore=FILE          continue from a checkpoint
+//   +seed=N                for the design's own $value$plusargs (regressions)
+//
+// One cycle is 10 time units; the clock input found by patch_sim_main
+// (if any) toggles every 5.
+
+static unsigned long long plusarg(VerilatedContext* ctx, const char* name, unsigned long long def) {
+    std::string prefix = std::string("+") + name + "=";
+    const char* match = ctx->commandArgsPlusMatch(prefix.c_str() + 1);
+
+    if (!match || !*match) return def;
+    return std::strtoull(match + prefix.size(), nullptr, 10);
+}
+
+#if EDA_SAVABLE
+static void save_checkpoint(VerilatedContext* ctx, VMODULE_NAME* top, unsigned long long cycle) {
+    {
+        uint64_t time = ctx->time();
+        VerilatedSave os;
+        os.open("checkpoint.vlt.tmp");
+        os << time << *top;
+    }
+    std::rename("checkpoint.vlt.tmp", "checkpoint.vlt");
+
+    // Written last: the Python side reads it to report the resume point
+    if (FILE* f = std::fopen("checkpoint.cycle", "w")) {
+        std::fprintf(f, "%llu\n", cycle);
+        std::fclose(f);
+    }
+    std::printf("[checkpoint] cycle %llu\n", cycle);
+    std::fflush(stdout);
+}
+#endif
 
 int main(int argc, char** argv) {
-    Verilated::commandArgs(argc, argv);
+    const std::unique_ptr<VerilatedContext> ctx{new VerilatedContext};
+    ctx->commandArgs(argc, argv);
+    ctx->traceEverOn(true);
+
+    const std::unique_ptr<VMODULE_NAME> top{new VMODULE_NAME{ctx.get()}};
 
-    VMODULE_NAME* top = new VMODULE_NAME;
+    const unsigned long long cycles = plusarg(ctx.get(), "cycles", 20);
+    const unsigned long long trace_start = plusarg(ctx.get(), "trace_start", 0);
+    const unsigned long long trace_stop = plusarg(ctx.get(), "trace_stop", 0);
+#if EDA_SAVABLE
+    const unsigned long long checkpoint_every = plusarg(ctx.get(), "checkpoint_every", 0);
+#endif
 
-    VerilatedVcdC* tfp = new VerilatedVcdC;
-    Verilated::traceEverOn(true);
+    const char* restore = ctx->commandArgsPlusMatch("restore=");
+    if (restore && *restore) {
+#if EDA_SAVABLE
+        uint64_t time = 0;
+        VerilatedRestore os;
+        os.open(restore + std::string("+restore=").size());
+        os >> time >> *top;
+        ctx->time(time);
+        std::printf("[checkpoint] restored at cycle %llu\n",
+                    (unsigned long long)(ctx->time() / 10));
+#else
+        std::fprintf(stderr, "+restore needs a model built with --savable\n");
+        return 2;
+#endif
+    }
+
+    TraceFile* tfp = new TraceFile;
     top->trace(tfp, 99);
-    tfp->open("wave.vcd");
+    tfp->open(WAVE_FILE);
+
+    for (unsigned long long cycle = ctx->time() / 10; cycle < cycles && !ctx->gotFinish(); cycle++) {
+        const bool traced = cycle >= trace_start && (trace_stop == 0 || cycle < trace_stop);
+
+        for (int half = 0; half < 2; half++) {
+            CLOCK_TOGGLE
+            top->eval();
+            if (traced) tfp->dump(ctx->time());
+            ctx->timeInc(5);
+        }
 
-    for (int i = 0; i < 20; i++) {
-        top->eval();
-        tfp->dump(i * 10);
+#if EDA_SAVABLE
+        if (checkpoint_every && (cycle + 1) % checkpoint_every == 0 && cycle + 1 < cycles) {
+            save_checkpoint(ctx.get(), top.get(), cycle + 1);
+        }
+#endif
     }
 
     tfp->close();
-    delete top;
+    delete tfp;
+    top->final();
     return 0;
 }
@@ -0,0 +1,422 @@
+"""
+Incremental Verilator build cache.
+
+Every (top module, Verilator flags, sim_main.cpp version) gets one
+build directory under MEDIA_ROOT/cache/verilator/<key>/ whose obj_dir
+is reused across runs:
+
+- hit:          the normalised source matches the last build → the
+                existing binary is reused, Verilator isn't started.
+- incremental:  the source changed → Verilator regenerates into the
+                same obj_dir and make compiles through ccache
+                (OBJCACHE), so unchanged C++ never reaches the compiler.
+- miss:         first build for the key.
+
+Least recently used build directories are evicted once the cache grows
+past EDA_VERILATOR_CACHE_BYTES.
+
+The waveform format is part of the flags (--trace vs --trace-fst), so
+VCD and FST builds of the same design are cached side by side.
+"""
+import hashlib
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import VerilatorBuildEntry
+
+
+SIM_MAIN = Path(__file__).resolve().parent / "verilator_assets" / "sim_main.cpp"
+
+_COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+
+# Comments that are tool directives, not commentary
+_DIRECTIVE = r"(?=\s*(?i:verilator|synopsys|pragma)\b)"
+
+# Leftmost first: a string literal, a directive comment, or a gap of
+# whitespace and ordinary comments (so "//" in a string stays put)
+_SOURCE_TOKENS = re.compile(
+    r'(?P<keep>"(?:\\.|[^"\\\n])*"'
+    rf"|//{_DIRECTIVE}[^\n]*|/\*{_DIRECTIVE}.*?\*/)"
+    rf"|(?:[ \t\f\r\n]+|//(?!{_DIRECTIVE})[^\n]*|/\*(?!{_DIRECTIVE}).*?\*/)+",
+    re.S,
+)
+
+# =====================================================
+# SOURCE PREPARATION
+# =====================================================
+
+def top_module_name(filename):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return "top_" + re.sub(r"\W", "_", stem)
+
+
+def fix_verilog_module_name(file_path, new_name):
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+
+    module_pattern = re.compile(r"(\bmodule\s+)([A-Za-z_][A-Za-z0-9_]*)")
+    match = module_pattern.search(text)
+
+    if not match:
+        return False
+
+    text = module_pattern.sub(r"\1" + new_name, text, 1)
+
+    if "verilator lint_off DECLFILENAME" not in text:
+        text = (
+            "/* verilator lint_off DECLFILENAME */\n"
+            + text +
+            "\n/* verilator lint_on DECLFILENAME */\n"
+        )
+
+    if not text.endswith("\n"):
+        text += "\n"
+
+    # Run files may be read-only hardlinks into the blob store
+    if os.path.exists(file_path):
+        os.unlink(file_path)
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    return True
+
+
+_CLOCK = re.compile(r"\binput\b(?:\s+(?:wire|logic|reg))?\s+(clk|clock|clk_i|i_clk|CLK)\b")
+
+
+def clock_port(source_path):
+    """
+    Name of the top module's clock input, if it has an obvious one.
+    """
+    with open(source_path, "r", encoding="utf-8", errors="ignore") as f:
+        match = _CLOCK.search(_COMMENTS.sub(" ", f.read()))
+    return match.group(1) if match else None
+
+
+def patch_sim_main(path, module_name, clock=None):
+    with open(path, "r") as f:
+        txt = f.read()
+
+    txt = txt.replace("VMODULE_NAME", f"V{module_name}")
+    txt = txt.replace("CLOCK_TOGGLE", f"top->{clock} = !top->{clock};" if clock else "")
+
+    with open(path, "w") as f:
+        f.write(txt)
+
+
+def _normalize_token(match):
+    if match.group("keep"):
+        return match.group()
+    # Keep the line count so `__LINE__ and $display line numbers match
+    return "\n" * match.group().count("\n") or " "
+
+
+def normalize_source(text):
+    """
+    Comments and indentation don't change the generated model. String
+    literals, directive comments (// verilator ..., /* synopsys ... */,
+    // pragma ...) and line breaks are kept as they are.
+    """
+    return _SOURCE_TOKENS.sub(_normalize_token, text).strip(" ")
+
+
+def source_hash(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        text = normalize_source(f.read())
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _sim_main_version(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def sim_main_version():
+    return _sim_main_version(str(SIM_MAIN), os.stat(SIM_MAIN).st_mtime)
+
+
+# =====================================================
+# BUILD DIRECTORIES
+# =====================================================
+
+def build_key(top_module, flags):
+    raw = f"{top_module}:{flags}:{sim_main_version()}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def build_dir(key):
+    return Path(settings.MEDIA_ROOT) / "cache" / "verilator" / key
+
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock(f, blocking=True):
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.5)
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(f, blocking=True):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _acquire(folder, blocking=True):
+    """
+    Open and lock <folder>/.lock. Returns the open file, or None when
+    it is held elsewhere and `blocking` is False.
+    """
+    lock = folder / ".lock"
+
+    while True:
+        folder.mkdir(parents=True, exist_ok=True)
+        f = open(lock, "a+b")
+        if not _lock(f, blocking):
+            f.close()
+            return None
+
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(lock).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+
+        # evict() removed the folder while we waited → lock the new file
+        _unlock(f)
+        f.close()
+
+
+def _release(f):
+    _unlock(f)
+    f.close()
+
+
+@contextmanager
+def build_lock(key):
+    """
+    Exclusive lock on one build directory: an OS file lock (flock, or
+    msvcrt.locking on Windows) on its .lock file. The OS drops it when
+    the holder exits or crashes, so a lock is never stale and a long
+    build is never broken into; the file itself stays in place.
+    """
+    folder = build_dir(key)
+    f = _acquire(folder)
+    try:
+        yield folder
+    finally:
+        _release(f)
+
+
+def checkout(source_path, top_module, flags):
+    """
+    Bring the build directory for `top_module` up to date with
+    `source_path` (already renamed by fix_verilog_module_name).
+    Call under build_lock(). Returns (entry, state, source_sha256).
+    """
+    key = build_key(top_module, flags)
+    folder = build_dir(key)
+    sha = source_hash(source_path)
+
+    entry = VerilatorBuildEntry.objects.filter(key=key).first()
+    binary = folder / "obj_dir" / f"V{top_module}"
+
+    if entry and entry.source_sha256 == sha and binary.exists():
+        VerilatorBuildEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F("hit_count") + 1,
+            last_used_at=timezone.now(),
+        )
+        return entry, "hit", sha
+
+    state = "incremental" if entry and (folder / "obj_dir").exists() else "miss"
+
+    # Verilator regenerates from this copy; obj_dir stays in place
+    shutil.copyfile(source_path, folder / source_name(source_path, top_module))
+
+    sim_main = folder / "sim_main.cpp"
+    shutil.copyfile(SIM_MAIN, sim_main)
+    patch_sim_main(sim_main, top_module, clock_port(source_path))
+
+    if entry is None:
+        entry = VerilatorBuildEntry.objects.create(
+            key=key,
+            top_module=top_module,
+            flags=flags,
+            sim_main_version=sim_main_version(),
+            last_used_at=timezone.now(),
+        )
+
+    return entry, state, sha
+
+
+def source_name(source_path, top_module):
+    # Keep .sv vs .v, Verilator picks the language from it
+    return top_module + (os.path.splitext(str(source_path))[1] or ".v")
+
+
+def build_command(folder_wsl, source, top_module, flags, jobs=1):
+    """
+    Shell command (run inside WSL) that (re)builds V<top> in obj_dir
+    with `jobs` parallel compiler processes.
+    """
+    return (
+        f"cd '{folder_wsl}' && "
+        f"verilator {flags} --cc {source} "
+        f"--top-module {top_module} --exe sim_main.cpp -Mdir obj_dir && "
+        f"make -j{jobs} -C obj_dir -f V{top_module}.mk V{top_module} "
+        f"OBJCACHE=\"$(command -v ccache || true)\""
+    )
+
+
+# =====================================================
+# WAVEFORM OUTPUT
+# =====================================================
+
+# vcd:     plain wave.vcd
+# vcd.gz:  wave.vcd is a FIFO drained by gzip → only wave.vcd.gz hits disk
+# fst:     VerilatedFstC → wave.fst (compressed, needs fst2vcd to index)
+WAVE_FORMATS = ("vcd", "vcd.gz", "fst")
+
+_TRACE = re.compile(r"--trace(?![-\w])")
+
+
+def trace_flags(flags, wave_format):
+    if wave_format == "fst":
+        return _TRACE.sub("--trace-fst", flags)
+    return flags
+
+
+# =====================================================
+# SIMULATION PARAMETERS / CHECKPOINTS
+# =====================================================
+
+# Passed to sim_main.cpp as +name=value plusargs at run time
+SIM_PARAMS = ("cycles", "trace_start", "trace_stop", "checkpoint_every", "seed")
+
+CHECKPOINT = "checkpoint.vlt"
+
+
+def savable_flags(flags, params):
+    """
+    Checkpointing needs a --savable model (a separate cached build).
+    """
+    if params.get("checkpoint_every"):
+        return f"{flags} --savable -CFLAGS -DEDA_SAVABLE=1"
+    return flags
+
+
+def sim_plusargs(params, restore=None):
+    args = [f"+{name}={int(params[name])}" for name in SIM_PARAMS if params.get(name) is not None]
+    if params.get("seed") is not None:
+        # Verilator's own randomisation ($urandom, --x-initial unique)
+        args.append(f"+verilator+seed+{int(params['seed'])}")
+    if restore:
+        args.append(f"+restore={restore}")
+    return " ".join(args)
+
+
+def checkpoint_cycle(run_dir):
+    """
+    Cycle of the last complete checkpoint in `run_dir`, or None.
+    """
+    try:
+        with open(os.path.join(run_dir, "checkpoint.cycle")) as f:
+            cycle = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    return cycle if os.path.exists(os.path.join(run_dir, CHECKPOINT)) else None
+
+
+def sim_command(run_dir_wsl, binary, wave_format, plusargs=""):
+    """
+    Shell command (run inside WSL) that runs the simulation binary.
+    """
+    run = f"cd '{run_dir_wsl}' && chmod +x {binary} && "
+    sim = f"./{binary} {plusargs}".strip()
+
+    if wave_format != "vcd.gz":
+        return run + sim
+
+    # Opening the FIFO read-write after the run releases gzip even if
+    # the simulation died before opening wave.vcd itself.
+    return run + (
+        "rm -f wave.vcd && mkfifo wave.vcd && "
+        "{ gzip -1 < wave.vcd > wave.vcd.gz & gz=$!; }; "
+        f"{sim}; rc=$?; "
+        "exec 3<>wave.vcd; exec 3>&-; wait $gz; "
+        "rm -f wave.vcd; exit $rc"
+    )
+
+
+def record_build(entry, source_sha256):
+    folder = build_dir(entry.key)
+    size = sum(p.stat().st_size for p in folder.rglob("*") if p.is_file())
+
+    VerilatorBuildEntry.objects.filter(pk=entry.pk).update(
+        source_sha256=source_sha256,
+        size_bytes=size,
+        build_count=F("build_count") + 1,
+        last_used_at=timezone.now(),
+    )
+    evict(keep=entry.key)
+
+
+def evict(budget=None, keep=None):
+    """
+    Drop least recently used build directories until the cache fits.
+    """
+    budget = settings.EDA_VERILATOR_CACHE_BYTES if budget is None else budget
+
+    total = VerilatorBuildEntry.objects.aggregate(t=Sum("size_bytes"))["t"] or 0
+    if total <= budget:
+        return 0
+
+    evicted = 0
+    for entry in VerilatorBuildEntry.objects.exclude(key=keep).order_by("last_used_at").iterator():
+        if total <= budget:
+            break
+
+        folder = build_dir(entry.key)
+        f = _acquire(folder, blocking=False)
+        if f is None:
+            continue  # being built / checked out right now
+
+        try:
+            shutil.rmtree(folder, ignore_errors=True)
+        finally:
+            _release(f)
+
+        total -= entry.size_bytes
+        entry.delete()
+        evicted += 1
+
+    return evicted
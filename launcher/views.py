@@ -1,15 +1,23 @@
+import asyncio
 import os
 import re
+import json
 import uuid
-import shutil
 import subprocess
+import threading
 
 from django.conf import settings
+from django.db import connection
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse, FileResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from .services import execute_tool_run
-from .models import ToolRun, Tool
+from django.views.decorators.http import require_safe
+from .services import enqueue_run, resume_run, batch_counts, slide_item_text
+from .blobstore import store_upload, link_blob
+from . import exports, fileserve, klayout_cache, licenses, waveform
+from .layout_tiles import request_tile
+from .verilator_build import SIM_PARAMS, WAVE_FORMATS, checkpoint_cycle
+from .models import ToolRun, Tool, LayerStatistic, PresentationExport
 from django.utils import timezone
 
 from rest_framework.decorators import api_view
@@ -19,7 +27,7 @@ from launcher.models import ToolRun
 from django.shortcuts import redirect
 
 from .models import Category, Tool, ToolRun, Presentation
-from .serializers import ToolSerializer
+from .serializers import LicenseSerializer, ToolSerializer
 from django.utils import timezone
 from .models import Presentation, Slide
 from django.shortcuts import render, get_object_or_404
@@ -117,6 +125,19 @@ def tool_page(request, slug):
 # FILE SERVER (UPLOADS)
 # =====================================================
 
+# Content-addressed paths, never rewritten in place (see fileserve.py):
+# blobs by sha256, extraction entries and tiles under their hash key,
+# renditions under their source state. Everything else is revalidated
+# (ETag → 304): run directories are rewritten by a requeued or resumed
+# run, cache/verilator/<key>/ is rebuilt in place and blobs/tmp/ holds
+# uploads in progress.
+IMMUTABLE_UPLOAD_PATH = re.compile(
+    r"blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}"
+    r"|cache/(?:klayout|tiles)/[0-9a-f]{64}/.+"
+    r"|cache/renditions/[0-9a-f]{64}/[0-9a-f]{32}/[^/]+"
+)
+
+
 def serve_upload(request, path):
     base = os.path.join(settings.BASE_DIR, "uploads")
     full = os.path.abspath(os.path.join(base, path))
@@ -124,52 +145,11 @@ def serve_upload(request, path):
     if not full.startswith(os.path.abspath(base)):
         return HttpResponse("Forbidden", status=403)
 
-    if not os.path.exists(full):
+    if not os.path.isfile(full):
         return HttpResponse("Not Found", status=404)
 
-    return FileResponse(open(full, "rb"))
-
-
-# =====================================================
-# VERILATOR HELPERS
-# =====================================================
-
-def fix_verilog_module_name(file_path, new_name):
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        text = f.read()
-
-    module_pattern = re.compile(r"(\bmodule\s+)([A-Za-z_][A-Za-z0-9_]*)")
-    match = module_pattern.search(text)
-
-    if not match:
-        return False
-
-    text = module_pattern.sub(r"\1" + new_name, text, 1)
-
-    if "verilator lint_off DECLFILENAME" not in text:
-        text = (
-            "/* verilator lint_off DECLFILENAME */\n"
-            + text +
-            "\n/* verilator lint_on DECLFILENAME */\n"
-        )
-
-    if not text.endswith("\n"):
-        text += "\n"
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(text)
-
-    return True
-
-
-def patch_sim_main(path, module_name):
-    with open(path, "r") as f:
-        txt = f.read()
-
-    txt = txt.replace("VMODULE_NAME", f"V{module_name}")
-
-    with open(path, "w") as f:
-        f.write(txt)
+    rel = os.path.relpath(full, base).replace(os.sep, "/")
+    return fileserve.serve_file(request, full, immutable=IMMUTABLE_UPLOAD_PATH.fullmatch(rel) is not None)
 
 
 # =====================================================
@@ -416,23 +396,52 @@ def launch_desktop(request, slug):
         cmd = exe
 
     try:
-        subprocess.Popen(
+        allocation = licenses.checkout(
+            tool, user=request.user if request.user.is_authenticated else None
+        )
+    except licenses.LicenseUnavailable as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=409)
+
+    try:
+        proc = subprocess.Popen(
             ["wsl", "bash", "-lc", cmd],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             start_new_session=True
         )
-
-        return JsonResponse({
-            "ok": True,
-            "message": f"{tool.name} launched successfully"
-        })
-
     except Exception as e:
+        licenses.release(allocation)
         return JsonResponse(
             {"ok": False, "error": str(e)},
             status=500
         )
+
+    if allocation is not None:
+        # The seat is returned when the desktop session exits
+        threading.Thread(
+            target=_release_on_exit, args=(proc, allocation), daemon=True
+        ).start()
+
+    return JsonResponse({
+        "ok": True,
+        "message": f"{tool.name} launched successfully",
+        "license_allocation": allocation.id if allocation else None,
+    })
+
+
+def _release_on_exit(proc, allocation):
+    # Heartbeat while the desktop session runs; if this web process
+    # dies the lease lapses and licenses.reap_expired() reclaims it
+    try:
+        while True:
+            try:
+                proc.wait(timeout=settings.EDA_LICENSE_HEARTBEAT_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                licenses.renew(allocation)
+        licenses.release(allocation)
+    finally:
+        connection.close()
     
 """
 from django.utils import timezone
@@ -586,14 +595,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render, get_object_or_404
 
 from .models import ToolRun, Tool, RunArtifact
+from .services import apply_klayout_cache, finish_klayout_run
 
 
-# ---------------------------
-# Helper: Windows → WSL path
-# ---------------------------
-def wsl_path(p):
-    return "/mnt/c" + p.replace("C:", "").replace("\\", "/")
-
 @csrf_exempt
 def klayout_run(request):
     if request.method != "POST":
@@ -610,44 +614,39 @@ def klayout_run(request):
     run_dir = os.path.join(settings.MEDIA_ROOT, "runs", run_dir_name)
     os.makedirs(run_dir, exist_ok=True)
 
+    # Deduplicated upload → linked (not copied) into the run dir
+    blob = store_upload(upload)
     gds_path = os.path.join(run_dir, "generated_design.gds")
-    with open(gds_path, "wb") as f:
-        for chunk in upload.chunks():
-            f.write(chunk)
-
-    # -------------------------
-    # Create ToolRun
-    # -------------------------
-    run = ToolRun.objects.create(
-        tool=Tool.objects.get(slug="klayout"),
-        user=request.user if request.user.is_authenticated else None,
-        input_file=upload.name,
-        run_dir=run_dir,
-        status="running",
-    )
-
-    # -------------------------
-    # Output paths
-    # -------------------------
-    png_path = os.path.join(run_dir, "preview.png")
-    meta_path = os.path.join(run_dir, "metadata.json")
-    log_path = os.path.join(run_dir, "klayout.log")
+    link_blob(blob, gds_path)
 
     # -------------------------
-    # Run KLayout batch (WSL)
+    # Create ToolRun: finished at once on an extraction
+    # cache hit, otherwise queued for the worker pool
     # -------------------------
-    cmd = (
-        f"export KLAYOUT_GDS='{wsl_path(gds_path)}' && "
-        f"export KLAYOUT_PNG='{wsl_path(png_path)}' && "
-        f"export KLAYOUT_META='{wsl_path(meta_path)}' && "
-        f"klayout -b -r scripts/klayout_extract.py "
-        f"> '{wsl_path(log_path)}' 2>&1"
-    )
+    cached = apply_klayout_cache(blob.sha256, run_dir)
 
-    subprocess.run(
-        ["wsl", "bash", "-lc", cmd],
-        text=True
-    )
+    if cached:
+        run = ToolRun.objects.create(
+            tool=Tool.objects.get(slug="klayout"),
+            user=request.user if request.user.is_authenticated else None,
+            input_file=upload.name,
+            input_blob=blob,
+            run_dir=run_dir,
+            status="success",
+            job_type="klayout",
+            job_args={"gds_path": gds_path},
+            completed_at=timezone.now(),
+        )
+    else:
+        run = enqueue_run(
+            tool=Tool.objects.get(slug="klayout"),
+            user=request.user if request.user.is_authenticated else None,
+            job_type="klayout",
+            input_file=upload.name,
+            input_blob=blob,
+            run_dir=run_dir,
+            job_args={"gds_path": gds_path},
+        )
 
     # -------------------------
     # ✅ OPEN ORIGINAL DESKTOP KLayout (NEW)
@@ -659,52 +658,28 @@ def klayout_run(request):
         print("KLayout desktop launch failed:", e)
 
     # -------------------------
-    # Register artifacts
-    # -------------------------
-    register_klayout_artifacts(run)
-
-    # -------------------------
-    # Create presentation + slides
+    # Create presentation now; the worker attaches
+    # artifacts to its slides once the batch finishes
     # -------------------------
     presentation = auto_create_presentation(run)
 
-    # -------------------------
-    # Attach artifacts
-    # -------------------------
-    auto_attach_artifacts_to_slides(presentation, run)
+    if cached:
+        finish_klayout_run(run)
+        # Precompress and renditions are worker work (services.post_run)
+        ToolRun.objects.filter(id=run.id).update(post_run_pending=True)
 
     return JsonResponse({
         "ok": True,
-        "message": "KLayout batch run completed",
+        "message": "KLayout results loaded from cache" if cached else "KLayout batch run queued",
         "run_id": str(run.id),
+        "status": run.status,
+        "status_url": f"/run/{run.id}/status/",
+        "stream_url": f"/run/{run.id}/stream/",
         "presentation_id": presentation.id,
         "redirect": f"/presentation/{presentation.id}/"
     })
 
 
-def register_klayout_artifacts(run):
-    base = Path(run.run_dir)  # ✅ already uploads/runs/<uuid>
-
-    artifacts = [
-        ("image", "Layout Preview", base / "preview.png"),
-        ("metadata", "Layout Metadata", base / "metadata.json"),
-        ("log", "KLayout Log", base / "klayout.log"),
-    ]
-
-    for kind, name, full_path in artifacts:
-        if full_path.exists():
-            RunArtifact.objects.create(
-                run=run,
-                artifact_type=(
-                    "image" if kind == "image" else
-                    "log" if kind == "log" else
-                    "report"
-                ),
-                name=name,
-                #  RELATIVE TO MEDIA_ROOT
-                file_path=str(full_path.relative_to(settings.MEDIA_ROOT))
-            )
-
 from django.shortcuts import redirect, get_object_or_404
 from .models import ToolRun, Presentation, Slide, SlideItem, RunArtifact
 
@@ -831,54 +806,6 @@ def auto_create_presentation(run, user=None):
 
 
 
-from launcher.models import Slide, SlideItem, RunArtifact
-
-def auto_attach_artifacts_to_slides(presentation, run):
-    from launcher.models import Slide, SlideItem, RunArtifact
-
-    def get_slide(title, order):
-        slide, _ = Slide.objects.get_or_create(
-            presentation=presentation,
-            title=title,
-            defaults={"order": order},
-        )
-        return slide
-
-    layout_slide = get_slide("Layout View", 1)
-    metadata_slide = get_slide("Metadata", 2)
-    logs_slide = get_slide("Logs", 3)
-
-    artifacts = RunArtifact.objects.filter(run=run)
-
-    for artifact in artifacts:
-        atype = artifact.artifact_type.lower()
-
-        # ---- IMAGE ----
-        if atype == "image":
-            SlideItem.objects.create(
-                slide=layout_slide,
-                item_type="image",
-                artifact=artifact,
-            )
-
-        # ---- METADATA / REPORT ----
-        elif atype == "report":
-            SlideItem.objects.create(
-                slide=metadata_slide,
-                item_type="attachment",  # IMPORTANT
-                artifact=artifact,
-            )
-
-        # ---- LOG ----
-        elif atype == "log":
-            SlideItem.objects.create(
-                slide=logs_slide,
-                item_type="log_snippet",
-                artifact=artifact,
-            )
-
-
-
 from django.shortcuts import render, get_object_or_404
 from .models import ToolRun
 
@@ -980,11 +907,7 @@ def presentation_detail(request, pk):
         for item in selected_slide.items.select_related("artifact").all():
             item.inline_content = None
             if item.item_type in ("attachment", "log_snippet") and item.artifact:
-                abs_path = Path(settings.MEDIA_ROOT) / item.artifact.file_path
-                if abs_path.exists():
-                    item.inline_content = abs_path.read_text(
-                        encoding="utf-8", errors="replace"
-                    )
+                item.inline_content = slide_item_text(item)
             items.append(item)
 
     return render(
@@ -1042,7 +965,6 @@ from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.utils import timezone
 from pathlib import Path
-from weasyprint import HTML
 
 from django.conf import settings
 from .models import Presentation
@@ -1051,52 +973,112 @@ from .models import Presentation
 
 from pathlib import Path
 
-def presentation_pdf(request, pk):
-    presentation = get_object_or_404(Presentation, pk=pk)
-    slides = presentation.slides.prefetch_related("items__artifact").all()
+def _export_status(export):
+    data = {
+        "ok": export.status != "failed",
+        "export_id": export.id,
+        "presentation_id": export.presentation_id,
+        "format": export.format,
+        "revision": export.revision,
+        "status": export.status,
+        "ready": export.status == "ready",
+        "status_url": f"/presentation/export/{export.id}/status/",
+        "download_url": f"/presentation/export/{export.id}/download/",
+    }
+    if export.status == "ready":
+        data["size"] = export.size
+    if export.status == "failed":
+        data["error"] = export.error
+    if export.status == "superseded" and export.superseded_by_id:
+        data["superseded_by"] = export.superseded_by_id
+        data["status_url"] = f"/presentation/export/{export.superseded_by_id}/status/"
+        data["download_url"] = f"/presentation/export/{export.superseded_by_id}/download/"
+    return data
+
+
+def _serve_export(request, export, immutable=False):
+    response = fileserve.serve_file(request, str(exports.export_path(export)), immutable=immutable)
+    if response.status_code in (200, 206):
+        disposition = "inline" if export.format == "pdf" else "attachment"
+        response["Content-Disposition"] = (
+            f'{disposition}; filename="presentation-{export.presentation_id}.{export.format}"'
+        )
+    return response
 
-    for slide in slides:
-        for item in slide.items.all():
-            item.inline_content = ""
 
-            if item.artifact:
-                # ✅ Normalize Windows paths to URL paths
-                item.artifact.url_path = item.artifact.file_path.replace("\\", "/")
+def _presentation_export(request, pk, fmt):
+    presentation = get_object_or_404(
+        Presentation.objects.select_related("run__tool", "template", "theme"),
+        pk=pk,
+    )
+    export = exports.current_export(presentation, fmt)
 
-            if item.item_type in ("attachment", "log_snippet") and item.artifact:
-                abs_path = Path(settings.MEDIA_ROOT) / item.artifact.file_path
-                if abs_path.exists():
-                    item.inline_content = abs_path.read_text(
-                        encoding="utf-8", errors="replace"
-                    )
+    # Same URL for every revision → revalidate (ETag), don't pin
+    if export is not None and export.status == "ready" and exports.export_path(export).exists():
+        return _serve_export(request, export)
+    if export is not None and export.status in ("queued", "running"):
+        return JsonResponse(_export_status(export), status=202)
+
+    # Never rendered (or failed / file gone): starting one is a POST
+    data = _export_status(export) if export is not None else {"ok": False}
+    data["error"] = data.get("error") or "This revision hasn't been exported yet"
+    data["export_url"] = f"/presentation/{presentation.id}/export/{fmt}/"
+    return JsonResponse(data, status=404)
 
-    html = render_to_string(
-        "launcher/presentation/detail_pdf.html",
-        {
-            "presentation": presentation,
-            "slides": slides,
-            "request": request,
-            "now": timezone.now(),
-        }
-    )
 
-    pdf = HTML(
-        string=html,
-        base_url=settings.MEDIA_ROOT
-    ).write_pdf()
+@require_safe
+def presentation_pdf(request, pk):
     """
-    return HttpResponse(
-        pdf,
-        content_type="application/pdf",
-        #response["Content-Disposition"] = f'inline; filename="presentation-{pk}.pdf"'
-        headers={
-            "Content-Disposition": f'inline; filename="presentation-{pk}.pdf"'
-        },
-    )
+    PDF of the presentation's current revision, rendered by a worker
+    (exports.py). Only reports: 202 + status_url while a job is
+    running, 404 + export_url (POST presentation_export) when there is
+    nothing to serve.
     """
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = f'inline; filename="presentation-{pk}.pdf"'
-    return response
+    return _presentation_export(request, pk, "pdf")
+
+
+@require_safe
+def presentation_pptx(request, pk):
+    """
+    PPTX of the presentation's current revision, see presentation_pdf.
+    """
+    return _presentation_export(request, pk, "pptx")
+
+
+@api_view(["POST"])
+def presentation_export(request, pk, fmt):
+    """
+    Start (or reuse) the export of the current revision.
+    """
+    presentation = get_object_or_404(
+        Presentation.objects.select_related("run__tool", "template", "theme"),
+        pk=pk,
+    )
+    try:
+        export = exports.request_export(presentation, fmt)
+    except ValueError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+
+    return Response(_export_status(export), status=200 if export.status == "ready" else 202)
+
+
+def presentation_export_status(request, export_id):
+    export = get_object_or_404(PresentationExport, id=export_id)
+    return JsonResponse(_export_status(export))
+
+
+def presentation_export_download(request, export_id):
+    export = get_object_or_404(PresentationExport, id=export_id)
+
+    # The deck changed since this id was handed out → its newer export
+    if export.status == "superseded" and export.superseded_by_id:
+        return redirect("presentation-export-download", export_id=export.superseded_by_id)
+
+    if export.status != "ready" or not exports.export_path(export).exists():
+        return JsonResponse(_export_status(export), status=409)
+
+    # One export id = one revision → never changes
+    return _serve_export(request, export, immutable=True)
 
 # launcher/views.py
 """
@@ -1193,114 +1175,6 @@ def presentation_pptx(request, pk):
     return response
 
 """
-from pptx import Presentation as PPTPresentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE
-from pptx.dml.color import RGBColor
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
-from pathlib import Path
-from django.conf import settings
-
-
-def presentation_pptx(request, pk):
-    presentation = get_object_or_404(Presentation, pk=pk)
-    slides = presentation.slides.prefetch_related("items__artifact")
-
-    # Create Presentation (default theme)
-    prs = PPTPresentation()
-
-    # Standard 16:9
-    prs.slide_width = Inches(13.33)
-    prs.slide_height = Inches(7.5)
-
-    # --------------------------------------------------
-    # TITLE SLIDE
-    # --------------------------------------------------
-    title_layout = prs.slide_layouts[0]
-    title_slide = prs.slides.add_slide(title_layout)
-
-    title_slide.shapes.title.text = presentation.title
-
-    subtitle = title_slide.placeholders[1]
-    subtitle.text = f"Run {presentation.run.id} • {presentation.run.tool.name}"
-
-    # --------------------------------------------------
-    # CONTENT SLIDES
-    # --------------------------------------------------
-    for slide in slides:
-
-        # Use built-in Title + Content layout
-        layout = prs.slide_layouts[1]
-        ppt_slide = prs.slides.add_slide(layout)
-
-        # Set title properly (no manual textbox)
-        ppt_slide.shapes.title.text = slide.title
-
-        content_placeholder = ppt_slide.placeholders[1]
-        tf = content_placeholder.text_frame
-        tf.clear()
-
-        image_added = False
-
-        for item in slide.items.all():
-
-            # ------------------------------------------
-            # IMAGE HANDLING
-            # ------------------------------------------
-            if item.item_type == "image" and item.artifact:
-                img_path = Path(settings.MEDIA_ROOT) / item.artifact.file_path
-
-                if img_path.exists():
-
-                    # Remove content placeholder cleanly
-                    sp = content_placeholder.element
-                    sp.getparent().remove(sp)
-
-                    # Add centered image
-                    ppt_slide.shapes.add_picture(
-                        str(img_path),
-                        Inches(1.5),
-                        Inches(1.3),
-                        width=Inches(10)
-                    )
-
-                    image_added = True
-
-            # ------------------------------------------
-            # TEXT HANDLING (Logs / Metadata)
-            # ------------------------------------------
-            elif item.item_type in ("attachment", "log_snippet") and item.artifact:
-                path = Path(settings.MEDIA_ROOT) / item.artifact.file_path
-
-                if path.exists():
-
-                    lines = path.read_text(errors="replace").splitlines()
-
-                    # Limit lines to avoid overflow
-                    for line in lines[:40]:
-                        p = tf.add_paragraph()
-                        p.text = line
-                        p.font.size = Pt(12)
-                        p.level = 0
-
-        # If no content was added, keep slide clean
-        if not image_added and not tf.text.strip():
-            tf.text = "No content available"
-
-    # --------------------------------------------------
-    # RETURN FILE
-    # --------------------------------------------------
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-    )
-    response["Content-Disposition"] = (
-        f'attachment; filename="presentation-{pk}.pptx"'
-    )
-
-    prs.save(response)
-    return response
 
 
 
@@ -1349,73 +1223,113 @@ def logs_by_scope(request, scope):
         "runs": qs[:50]
     })
 
-import subprocess
-
-def run_bash(command, cwd=None, timeout=300):
+def _sim_options(request):
     """
-    Execute a shell command and return (stdout, stderr)
+    Waveform format and +cycles / trace window / checkpoint / seed
+    plusargs of a simulation request. Raises ValueError.
     """
-    proc = subprocess.Popen(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        cwd=cwd,
-        text=True
-    )
+    wave_format = request.data.get("wave_format") or settings.EDA_VERILATOR_WAVE_FORMAT
+    if wave_format not in WAVE_FORMATS:
+        raise ValueError(f"Unknown wave format: {wave_format}")
+
+    sim = {}
+    for name in SIM_PARAMS:
+        value = request.data.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            sim[name] = int(value)
+            if sim[name] < 0:
+                raise ValueError(name)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name}")
+
+    return wave_format, sim
+
+
+def _batch_seeds(request):
+    """
+    seeds=1,2,3 (or a JSON list), or seed_count=N for seeds 1..N.
+    """
+    seeds = request.data.get("seeds")
+    if isinstance(seeds, str):
+        seeds = [s for s in re.split(r"[\s,]+", seeds.strip(" []")) if s]
 
     try:
-        stdout, stderr = proc.communicate(timeout=timeout)
-    except subprocess.TimeoutExpired:
-        proc.kill()
-        stdout, stderr = proc.communicate()
-        stderr += "\n[ERROR] Command timed out"
-
-    return stdout, stderr
+        if seeds:
+            return [int(s) for s in seeds]
+        if request.data.get("seed_count"):
+            return list(range(1, int(request.data["seed_count"]) + 1))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid seeds")
+    return []
 
-def windows_to_wsl(path):
-    path = path.replace("\\", "/")
-    if path[1:3] == ":/":
-        drive = path[0].lower()
-        return f"/mnt/{drive}{path[2:]}"
-    return path
 
+@api_view(["POST"])
+def run_batch(request, slug):
+    """
+    Regression batch: N sources (files=...) and/or N seeds, run as a
+    verilator_batch parent with one child run per (source, seed).
+    Poll the parent's status_url for the pass / fail roll-up.
+    """
+    tool = get_object_or_404(Tool, slug=slug)
+    uploads = request.FILES.getlist("files") or request.FILES.getlist("file")
 
-
-from django.utils import timezone
-
-def execute_verilator_run(*, tool, user, upload_path):
-    from django.utils import timezone
-    import os
-
-    run = ToolRun.objects.create(
-        tool=tool,
-        user=user,
-        input_file=os.path.basename(upload_path),
-        status="running"
-    )
+    if not uploads:
+        return Response({"ok": False, "error": "No files uploaded"}, status=400)
 
     try:
-        wsl_file = windows_to_wsl(upload_path)
-
-        cmd = f"verilator --lint-only {wsl_file}"
-
-        stdout, stderr = run_bash(
-            f"wsl bash -lc '{cmd}'"
+        wave_format, sim = _sim_options(request)
+        seeds = _batch_seeds(request)
+    except ValueError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+
+    total = len(uploads) * max(1, len(seeds))
+    if total > settings.EDA_BATCH_MAX_RUNS:
+        return Response(
+            {"ok": False, "error": f"Batch of {total} runs exceeds {settings.EDA_BATCH_MAX_RUNS}"},
+            status=400,
         )
 
-        run.stdout = stdout
-        run.stderr = stderr
-        run.status = "success" if not stderr else "failed"
+    run_dir = os.path.join(settings.MEDIA_ROOT, "runs", uuid.uuid4().hex)
+    sources, blobs = [], []
 
-    except Exception as e:
-        run.stderr = str(e)
-        run.status = "failed"
+    # One folder per source keeps file (= top module) names unchanged,
+    # so the build cache is shared with single runs of the same design
+    for i, upload in enumerate(uploads):
+        blob = store_upload(upload)
+        folder = os.path.join(run_dir, "src", str(i))
+        os.makedirs(folder, exist_ok=True)
+
+        path = os.path.join(folder, os.path.basename(upload.name))
+        link_blob(blob, path)
+        sources.append(path)
+        blobs.append(blob)
 
-    run.completed_at = timezone.now()
-    run.save()
+    run = enqueue_run(
+        tool=tool,
+        user=request.user if request.user.is_authenticated else None,
+        job_type="verilator_batch",
+        input_file=f"{len(uploads)} sources x {max(1, len(seeds))} seeds",
+        input_blob=blobs[0] if len(blobs) == 1 else None,
+        run_dir=run_dir,
+        job_args={
+            "sources": sources,
+            "blobs": [blob.pk for blob in blobs],
+            "seeds": seeds,
+            "wave_format": wave_format,
+            "sim": sim,
+        },
+    )
 
-    return run
+    return Response({
+        "ok": True,
+        "run_id": run.id,
+        "status": run.status,
+        "runs": total,
+        "status_url": f"/run/{run.id}/status/",
+        "stream_url": f"/run/{run.id}/stream/",
+    }, status=202)
 
 
 @api_view(["POST"])
@@ -1426,42 +1340,451 @@ def run_tool(request, slug):
     if not upload:
         return Response({"ok": False, "error": "No file uploaded"}, status=400)
 
-    uploads_dir = os.path.join(settings.BASE_DIR, "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
+    run_dir = os.path.join(settings.MEDIA_ROOT, "runs", uuid.uuid4().hex)
+    os.makedirs(run_dir, exist_ok=True)
 
-    filename = f"{uuid.uuid4().hex}_{upload.name}"
-    full_path = os.path.join(uploads_dir, filename)
+    # Deduplicated upload → linked (not copied) into the run dir
+    blob = store_upload(upload)
+    full_path = os.path.join(run_dir, os.path.basename(upload.name))
+    link_blob(blob, full_path)
 
-    with open(full_path, "wb") as f:
-        for chunk in upload.chunks():
-            f.write(chunk)
+    # Full build + simulation by default, mode=lint for lint only
+    job_type = "verilator" if request.data.get("mode") == "lint" else "verilator_sim"
 
-    run = execute_verilator_run(
+    try:
+        wave_format, sim = _sim_options(request)
+    except ValueError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+
+    run = enqueue_run(
         tool=tool,
         user=request.user if request.user.is_authenticated else None,
-        upload_path=full_path
+        job_type=job_type,
+        input_file=upload.name,
+        input_blob=blob,
+        run_dir=run_dir,
+        job_args={"upload_path": full_path, "wave_format": wave_format, "sim": sim},
     )
 
     return Response({
-        "ok": run.status == "success",
+        "ok": True,
+        "run_id": run.id,
+        "status": run.status,
+        "status_url": f"/run/{run.id}/status/",
+        "stream_url": f"/run/{run.id}/stream/",
+    }, status=202)
+
+
+@api_view(["POST"])
+def resume_run_view(request, run_id):
+    """
+    Re-queue a failed run; simulations continue from their last checkpoint.
+    """
+    run = get_object_or_404(ToolRun, id=run_id)
+
+    if not resume_run(run):
+        return Response({"ok": False, "error": "Only failed runs can be resumed"}, status=409)
+
+    return Response({
+        "ok": True,
+        "run_id": run.id,
+        "status": "queued",
+        "status_url": f"/run/{run.id}/status/",
+        "stream_url": f"/run/{run.id}/stream/",
+    }, status=202)
+
+
+def run_status(request, run_id):
+    """
+    Poll endpoint for queued / running ToolRuns.
+    Output is only included once the run has finished.
+    """
+    run = get_object_or_404(ToolRun, id=run_id)
+    done = run.status in ("success", "failed")
+
+    data = {
+        "ok": run.status != "failed",
+        "run_id": run.id,
+        "status": run.status,
+        "done": done,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "completed_at": run.completed_at,
+    }
+
+    if run.status == "queued" and run.tool.requires_license:
+        data["license_queue"] = licenses.queue_status(run)
+
+    if run.build_cache:
+        data["build_cache"] = run.build_cache
+
+    if run.build_waiting_since:
+        data["build_waiting"] = True
+        data["build_wait_seconds"] = (timezone.now() - run.build_waiting_since).total_seconds()
+    elif run.build_wait_seconds is not None:
+        data["build_wait_seconds"] = run.build_wait_seconds
+
+    if run.job_type == "verilator_batch":
+        data["batch"] = batch_counts(run.id)
+        data["children"] = [
+            {
+                "run_id": child.id,
+                "input_file": child.input_file,
+                "seed": (child.job_args.get("sim") or {}).get("seed"),
+                "status": child.status,
+                "status_url": f"/run/{child.id}/status/",
+                "logs_url": f"/logs/run/{child.id}/",
+            }
+            for child in run.children.only("id", "input_file", "job_args", "status").order_by("id")
+        ]
+
+    if run.parent_id:
+        data["parent_id"] = run.parent_id
+
+    if run.job_type == "verilator_sim" and run.run_dir:
+        cycle = checkpoint_cycle(run.run_dir)
+        if cycle is not None:
+            data["checkpoint_cycle"] = cycle
+            data["resumable"] = run.status == "failed"
+
+    if done:
+        data["stdout"] = run.stdout_excerpt()
+        data["stderr"] = run.stderr_excerpt()
+
+        wave = waveform.find_waveform(run.run_dir) if run.run_dir else None
+        if wave:
+            data["vcd"] = settings.MEDIA_URL + wave.relative_to(settings.MEDIA_ROOT).as_posix()
+            data["wave_format"] = waveform.wave_format(wave)
+            data["waveform_url"] = f"/run/{run.id}/waveform/"
+
+    return JsonResponse(data)
+
+
+# =====================================================
+# LAYOUT PREVIEW TILES
+# =====================================================
+
+def layout_tiles(request, run_id):
+    """
+    Deep-zoom descriptor for a KLayout run's GDS. Tiles are queued for
+    the tile workers on first request (see request_tile), so no web
+    process ever starts KLayout.
+    """
+    run = get_object_or_404(ToolRun, id=run_id)
+
+    if run.input_blob_id is None:
+        return JsonResponse({"ok": False, "error": "Run has no GDS input"}, status=404)
+
+    bbox = None
+    meta_path = os.path.join(run.run_dir, "metadata.json") if run.run_dir else None
+    if meta_path and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            bbox = json.load(f).get("bbox")
+
+    return JsonResponse({
+        "ok": True,
         "run_id": run.id,
-        "stdout": run.stdout,
-        "stderr": run.stderr,
-        "status": run.status
+        "tile_size": settings.EDA_KLAYOUT_TILE_SIZE,
+        "max_zoom": settings.EDA_KLAYOUT_TILE_MAX_ZOOM,
+        "bbox": bbox,
+        "tile_url": f"/run/{run.id}/tiles/{{z}}/{{x}}/{{y}}.png",
+    })
+
+
+LAYER_STAT_ORDERING = {
+    "shapes": "shape_count",
+    "-shapes": "-shape_count",
+    "area": "area",
+    "-area": "-area",
+    "layer": "layer",
+    "-layer": "-layer",
+    "run": "run_id",
+    "-run": "-run_id",
+}
+
+
+def layer_statistics(request):
+    """
+    Per-layer statistics across runs, filterable / sortable from the
+    LayerStatistic index:
+    ?run=&layer=&datatype=&name=&min_shapes=&min_area=&order=-area&limit=
+    """
+    qs = LayerStatistic.objects.select_related("run__input_blob")
+    params = request.GET
+
+    try:
+        for param, lookup in (
+            ("run", "run_id"),
+            ("layer", "layer"),
+            ("datatype", "datatype"),
+            ("min_shapes", "shape_count__gte"),
+        ):
+            if params.get(param):
+                qs = qs.filter(**{lookup: int(params[param])})
+
+        if params.get("min_area"):
+            qs = qs.filter(area__gte=float(params["min_area"]))
+
+        limit = min(int(params.get("limit", 100)), 1000)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Invalid filter"}, status=400)
+
+    if params.get("name"):
+        qs = qs.filter(name__icontains=params["name"])
+
+    order = LAYER_STAT_ORDERING.get(params.get("order", "-area"), "-area")
+    total = qs.count()
+
+    rows = [
+        {
+            "run_id": s.run_id,
+            "design": s.run.input_blob.original_name if s.run.input_blob else None,
+            "layer": s.layer,
+            "datatype": s.datatype,
+            "name": s.name,
+            "shapes": s.shape_count,
+            "area": s.area,
+            "bbox": s.bbox,
+        }
+        for s in qs.order_by(order, "id")[:limit]
+    ]
+
+    return JsonResponse({"ok": True, "count": total, "results": rows})
+
+
+def license_dashboard(request):
+    """
+    License utilization: every pool with its holders, plus per tool the
+    number of queued runs and a seat-usage timeseries over ?hours=24 in
+    ?bucket=900 second buckets.
+    """
+    try:
+        hours = float(request.GET.get("hours", 24))
+        bucket = int(request.GET.get("bucket", 900))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Invalid hours / bucket"}, status=400)
+
+    if bucket < 60 or not 0 < hours * 3600 / bucket <= settings.EDA_LICENSE_UTILIZATION_MAX_BUCKETS:
+        return JsonResponse({"ok": False, "error": "Invalid hours / bucket"}, status=400)
+
+    pools = list(licenses.pools_with_holders())
+    tool_ids = sorted({pool.tool_id for pool in pools})
+    series = licenses.utilization(tool_ids, hours=hours, bucket=bucket)
+    queued = licenses.queued_counts(tool_ids)
+
+    return JsonResponse({
+        "ok": True,
+        "pools": LicenseSerializer(pools, many=True).data,
+        "utilization": [
+            {"tool_id": tool_id, "queued": queued[tool_id], **series[tool_id]}
+            for tool_id in tool_ids
+        ],
+    })
+
+
+def layout_tile(request, run_id, z, x, y):
+    run = get_object_or_404(ToolRun.objects.select_related("input_blob"), id=run_id)
+
+    if run.input_blob is None or not klayout_cache.valid_tile(z, x, y):
+        raise Http404("No such tile")
+
+    path, job = request_tile(run.input_blob, z, x, y)
+
+    if path is not None:
+        # Revalidated, not immutable: the tile set is keyed by the
+        # extraction script version too, so the same URL can change
+        return fileserve.serve_file(request, path)
+
+    if job.status == "failed":
+        return JsonResponse({"ok": False, "error": job.error or "Tile render failed"}, status=503)
+
+    # Rendered by a tile worker; tile_viewer.js retries shortly
+    response = JsonResponse({"ok": False, "status": job.status}, status=202)
+    response["Retry-After"] = "1"
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+# =====================================================
+# WAVEFORMS (indexed VCD)
+# =====================================================
+
+def _run_waveform(run_id):
+    run = get_object_or_404(ToolRun, id=run_id)
+    wave = waveform.find_waveform(run.run_dir) if run.run_dir else None
+    if wave is None:
+        raise Http404("Run has no waveform")
+    return run, wave
+
+
+def _waveform_pending(run):
+    """
+    202 while a worker (re)builds the index, 503 if that failed.
+    """
+    job = waveform.request_index(run)
+    if job.status == "failed":
+        return JsonResponse({"ok": False, "error": job.error or "Waveform index failed"}, status=503)
+
+    response = JsonResponse({"ok": False, "status": job.status}, status=202)
+    response["Retry-After"] = "1"
+    return response
+
+
+def waveform_signals(request, run_id):
+    """
+    Signal list of a run's waveform (ids are used by waveform_window).
+    """
+    run, wave = _run_waveform(run_id)
+
+    try:
+        meta = waveform.load_meta(wave)
+    except waveform.WaveformIndexPending:
+        return _waveform_pending(run)
+
+    return JsonResponse({
+        "ok": True,
+        "timescale": meta["timescale"],
+        "end_time": meta["end_time"],
+        "signals": [
+            {"id": s["id"], "name": s["name"], "width": s["width"], "kind": s["kind"]}
+            for s in meta["signals"]
+        ],
     })
+
+
+def waveform_window(request, run_id):
+    """
+    Value changes for ?signals=1,2,3&start=&end=&width=<pixels>.
+    Busy signals come back as per-pixel min/max buckets.
+    """
+    run, wave = _run_waveform(run_id)
+
+    try:
+        ids = [int(i) for i in request.GET.get("signals", "").split(",") if i.strip()]
+        start = request.GET.get("start") or None
+        end = request.GET.get("end") or None
+        width = int(request.GET.get("width", 1000))
+        data = waveform.query(wave, ids[:settings.EDA_WAVEFORM_MAX_SIGNALS], start, end, width)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Invalid window"}, status=400)
+    except waveform.WaveformIndexPending:
+        return _waveform_pending(run)
+
+    return JsonResponse({"ok": True, **data})
+
+
+async def run_log_stream(request, run_id):
+    """
+    Server-Sent Events feed of a run's live log.
+    Async so that, under ASGI, viewers don't hold a worker thread each.
+    Event ids are byte offsets, so EventSource reconnects resume via
+    Last-Event-ID instead of replaying the whole log.
+    """
+    try:
+        run = await ToolRun.objects.aget(id=run_id)
+    except ToolRun.DoesNotExist:
+        raise Http404("Run not found")
+
+    try:
+        offset = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        offset = 0
+
+    response = StreamingHttpResponse(
+        _tail_run_log(run, offset),
+        content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _read_log_chunk(path, offset, size):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+async def _tail_run_log(run, offset):
+    interval = settings.EDA_LOG_STREAM_INTERVAL
+    batch_size = settings.EDA_LOG_STREAM_BATCH_BYTES
+
+    path = None
+    pending = b""
+    finished = False
+    last_sent = time.monotonic()
+
+    # File access runs in a thread: a slow disk must not stall the
+    # event loop every other stream shares
+    while True:
+        if path is None:
+            path = await asyncio.to_thread(run.live_log_path)
+
+        chunk = b""
+        if path is not None:
+            chunk = await asyncio.to_thread(_read_log_chunk, path, offset, batch_size)
+
+        if chunk:
+            offset += len(chunk)
+            head, sep, pending = (pending + chunk).rpartition(b"\n")
+
+            # Only complete lines are pushed; a partial tail waits
+            if sep:
+                lines = head.decode("utf-8", errors="replace").split("\n")
+                data = "".join(f"data: {line}\n" for line in lines)
+                yield f"id: {offset - len(pending)}\n{data}\n"
+                last_sent = time.monotonic()
+            continue
+
+        if finished:
+            if pending:
+                text = pending.decode("utf-8", errors="replace")
+                yield f"id: {offset}\ndata: {text}\n\n"
+            status = await ToolRun.objects.filter(id=run.id).values_list(
+                "status", flat=True
+            ).afirst()
+            yield f"event: done\ndata: {status}\n\n"
+            return
+
+        status = await ToolRun.objects.filter(id=run.id).values_list(
+            "status", flat=True
+        ).afirst()
+
+        # One more read after completion picks up the final lines
+        if status in ("success", "failed", None):
+            finished = True
+            continue
+
+        if time.monotonic() - last_sent > 15:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+
+        await asyncio.sleep(interval)
+
+
+from .logstore import iter_run_output
+
+
 def view_run_logs(request, run_id):
     run = get_object_or_404(ToolRun, id=run_id)
 
+    # ?stream=stdout|stderr → full output, decompressed on the fly
+    stream = request.GET.get("stream")
+    if stream in ("stdout", "stderr"):
+        return StreamingHttpResponse(
+            iter_run_output(run, stream),
+            content_type="text/plain; charset=utf-8"
+        )
+
     return render(
         request,
         "launcher/run_detail.html",   
         {"run": run}
     )
 
-def download_run_logs(request, run_id):
-    run = get_object_or_404(ToolRun, id=run_id)
 
-    content = f"""
+def _run_log_download(run):
+    yield f"""
 ========================================
 EDA TOOL RUN LOG
 ========================================
@@ -1474,15 +1797,30 @@ Completed : {run.completed_at or "Running"}
 ----------------------------------------
 STDOUT
 ----------------------------------------
-{run.stdout or "No STDOUT"}
+"""
+    if not run.stdout_bytes:
+        yield "No STDOUT"
+    yield from iter_run_output(run, "stdout")
+
+    yield """
 
 ----------------------------------------
 STDERR
 ----------------------------------------
-{run.stderr or "No STDERR"}
 """
+    if not run.stderr_bytes:
+        yield "No STDERR"
+    yield from iter_run_output(run, "stderr")
+    yield "\n"
+
+
+def download_run_logs(request, run_id):
+    run = get_object_or_404(ToolRun, id=run_id)
 
-    response = HttpResponse(content, content_type="text/plain")
+    response = StreamingHttpResponse(
+        _run_log_download(run),
+        content_type="text/plain; charset=utf-8"
+    )
     response["Content-Disposition"] = (
         f'attachment; filename="{run.tool.slug}_run_{run.id}.log"'
     )
@@ -0,0 +1,583 @@
+"""
+Indexed access to simulation waveforms.
+
+Runs write wave.vcd, wave.vcd.gz or wave.fst (see
+verilator_build.WAVE_FORMATS); all three are read as a VCD text
+stream (gzip is decompressed, FST is converted by fst2vcd) and parsed
+once into <wave>.idx/ next to the file:
+
+    meta.json   timescale, end time and the signal list
+    <n>.t       change times of signal n (uint64 array)
+    <n>.v       values, fixed width per signal (ASCII 0/1/x/z, reals as text)
+    <n>.s       min / max of every BLOCK consecutive values
+
+Queries memory-map only the signals asked for, bisect to the time
+window and, when there are more changes than pixels, return one
+min/max pair per pixel column instead of the raw changes. Min / max
+compare reals as floats and vectors as unsigned integers (see
+_extremes).
+
+The index is built by workers only: right after a simulation, or as a
+WaveformIndexJob when the viewer finds it missing or outdated (older
+runs, INDEX_VERSION bumps), in which case the request gets
+WaveformIndexPending instead of waiting. Each build writes a private
+temp dir that is renamed into place, so concurrent builds never share
+files and readers never see a half-written index.
+"""
+import gzip
+import json
+import mmap
+import os
+import shutil
+import subprocess
+import uuid
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import WaveformIndexJob
+from .precompress import fresh_sibling
+
+
+INDEX_VERSION = 3
+BLOCK = 1024
+REAL_WIDTH = 24
+
+
+class WaveformIndexError(RuntimeError):
+    pass
+
+
+class WaveformIndexPending(Exception):
+    """
+    The index is missing or outdated and has been queued for a worker.
+    """
+
+
+# Preferred first when a run directory has more than one
+WAVE_FILES = ("wave.fst", "wave.vcd.gz", "wave.vcd")
+
+
+def find_waveform(run_dir):
+    for name in WAVE_FILES:
+        path = Path(run_dir) / name
+        if path.exists() and not _is_precompressed(path):
+            return path
+    return None
+
+
+def _is_precompressed(path):
+    # wave.vcd.gz written by precompress.py next to wave.vcd is only an
+    # encoding of it for serve_upload, not a vcd.gz run output
+    if path.name != "wave.vcd.gz":
+        return False
+    base = path.with_name("wave.vcd")
+    try:
+        return fresh_sibling(base, os.stat(base), ".gz") is not None
+    except OSError:
+        return False
+
+
+def wave_format(path):
+    name = Path(path).name
+    if name.endswith(".fst"):
+        return "fst"
+    if name.endswith(".gz"):
+        return "vcd.gz"
+    return "vcd"
+
+
+def index_dir(wave_path):
+    return Path(f"{wave_path}.idx")
+
+
+@contextmanager
+def open_vcd_text(path):
+    """
+    VCD text of any supported waveform file, streamed.
+    """
+    fmt = wave_format(path)
+
+    if fmt == "vcd.gz":
+        with gzip.open(path, "rt", encoding="ascii", errors="replace") as f:
+            yield f
+        return
+
+    if fmt == "vcd":
+        with open(path, "r", encoding="ascii", errors="replace") as f:
+            yield f
+        return
+
+    from .services import wsl_path
+
+    proc = subprocess.Popen(
+        ["wsl", "bash", "-lc", f"exec {settings.EDA_FST2VCD} '{wsl_path(str(path))}'"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="ascii",
+        errors="replace",
+    )
+    try:
+        yield proc.stdout
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise WaveformIndexError(f"{settings.EDA_FST2VCD} failed with exit code {proc.returncode}")
+
+
+# =====================================================
+# INDEX BUILD
+# =====================================================
+
+class _Signal:
+    def __init__(self, n, width, real=False):
+        self.n = n
+        self.width = REAL_WIDTH if real else width
+        self.real = real
+        self.times = array("Q")
+        self.values = bytearray()
+
+    def add(self, time, value):
+        if self.real:
+            value = value[:REAL_WIDTH].rjust(REAL_WIDTH)
+        elif len(value) < self.width:
+            # VCD left-extends with 0, or with x / z when that leads
+            pad = value[0] if value[0] in "xzXZ" else "0"
+            value = value.rjust(self.width, pad)
+        else:
+            value = value[-self.width:]
+
+        self.times.append(time)
+        self.values += value.lower().encode("ascii", "replace")
+
+    def flush(self, folder):
+        with open(folder / f"{self.n}.t", "ab") as f:
+            self.times.tofile(f)
+        with open(folder / f"{self.n}.v", "ab") as f:
+            f.write(self.values)
+
+        self.times = array("Q")
+        self.values = bytearray()
+
+    def pending(self):
+        return len(self.values) + 8 * len(self.times)
+
+
+def _tokens(f):
+    for line in f:
+        yield from line.split()
+
+
+def build_index(wave_path):
+    """
+    Stream the waveform once and write <wave>.idx/. Returns the index dir.
+    """
+    wave_path = Path(wave_path)
+    final = index_dir(wave_path)
+    tmp = final.with_name(f"{final.name}.{uuid.uuid4().hex}.tmp")
+    tmp.mkdir()
+
+    try:
+        _build_into(wave_path, tmp)
+        _publish(tmp, final)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return final
+
+
+def _publish(tmp, final):
+    """
+    Rename a finished index into place, moving an older one aside.
+    """
+    try:
+        os.rename(tmp, final)
+        return
+    except OSError:
+        if not final.exists():
+            raise
+
+    old = final.with_name(f"{final.name}.{uuid.uuid4().hex}.old")
+    try:
+        os.rename(final, old)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # Another build got there in between; its index is just as good
+        if not final.exists():
+            raise
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _build_into(wave_path, tmp):
+    flush_bytes = settings.EDA_WAVEFORM_FLUSH_BYTES
+
+    signals = []   # name entries for meta.json
+    by_code = {}   # VCD id code → _Signal (aliases share one)
+    scope = []
+    timescale = ""
+    time = 0
+    buffered = 0
+
+    with open_vcd_text(wave_path) as f:
+        tokens = _tokens(f)
+
+        for tok in tokens:
+            # -------------------------
+            # Header / keyword sections
+            # -------------------------
+            if tok[0] == "$":
+                if tok == "$scope":
+                    next(tokens)  # scope type
+                    scope.append(next(tokens))
+                elif tok == "$upscope":
+                    scope.pop()
+                elif tok == "$var":
+                    kind, width, code, name = next(tokens), int(next(tokens)), next(tokens), next(tokens)
+                    if code not in by_code:
+                        by_code[code] = _Signal(len(by_code), width, real=kind in ("real", "realtime"))
+                    signals.append({
+                        "id": len(signals),
+                        "name": ".".join(scope + [name]),
+                        "width": width,
+                        "kind": kind,
+                        "data": by_code[code].n,
+                    })
+                elif tok == "$timescale":
+                    parts = []
+                    for t in tokens:
+                        if t == "$end":
+                            break
+                        parts.append(t)
+                    timescale = "".join(parts)
+                    continue
+                elif tok in ("$dumpvars", "$dumpall", "$dumpon", "$dumpoff", "$end"):
+                    continue
+
+                # Skip to the end of anything else ($var tail, $comment, ...)
+                for t in tokens:
+                    if t == "$end":
+                        break
+                continue
+
+            # -------------------------
+            # Value changes
+            # -------------------------
+            c = tok[0]
+            if c == "#":
+                time = int(tok[1:])
+                continue
+
+            if c in "bBrR":
+                value, code = tok[1:], next(tokens)
+            else:
+                value, code = c, tok[1:]
+
+            sig = by_code.get(code)
+            if sig is None:
+                continue
+
+            before = sig.pending()
+            sig.add(time, value)
+            buffered += sig.pending() - before
+
+            if buffered >= flush_bytes:
+                for s in by_code.values():
+                    s.flush(tmp)
+                buffered = 0
+
+    for s in by_code.values():
+        s.flush(tmp)
+        _write_summary(tmp, s.n, s.width, s.real)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "timescale": timescale,
+        "end_time": time,
+        "format": wave_format(wave_path),
+        "source_size": wave_path.stat().st_size,
+        "signals": signals,
+        "widths": {s.n: s.width for s in by_code.values()},
+        "reals": [s.n for s in by_code.values() if s.real],
+    }
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _numeric(value, real):
+    # float for reals, int for vectors; None for x / z bits (and NaN)
+    try:
+        number = float(value) if real else int(value, 2)
+    except ValueError:
+        return None
+    return None if number != number else number
+
+
+def _extremes(values, real):
+    """
+    (min, max) among fixed-width raw values, compared as numbers (the
+    ASCII text of right-justified reals doesn't sort). Values with x /
+    z bits have no order: they are only returned, as both min and max,
+    when nothing else is there.
+    """
+    lo = hi = unknown = None
+    lo_n = hi_n = None
+
+    for value in values:
+        number = _numeric(value, real)
+        if number is None:
+            if unknown is None:
+                unknown = value
+            continue
+        if lo_n is None or number < lo_n:
+            lo, lo_n = value, number
+        if hi_n is None or number > hi_n:
+            hi, hi_n = value, number
+
+    if lo is None:
+        return unknown, unknown
+    return lo, hi
+
+
+def _write_summary(folder, n, width, real=False):
+    step = BLOCK * width
+
+    with open(folder / f"{n}.v", "rb") as f, open(folder / f"{n}.s", "wb") as out:
+        while True:
+            chunk = f.read(step)
+            if len(chunk) < width:
+                break
+            lo, hi = _extremes((chunk[i:i + width] for i in range(0, len(chunk) - width + 1, width)), real)
+            out.write(lo + hi)
+
+
+# =====================================================
+# QUERIES
+# =====================================================
+
+def read_meta(wave_path):
+    """
+    Index metadata, or None when the index is missing, older than the
+    waveform or from another INDEX_VERSION.
+    """
+    meta_path = index_dir(wave_path) / "meta.json"
+
+    try:
+        if meta_path.stat().st_mtime < Path(wave_path).stat().st_mtime:
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return meta if meta.get("version") == INDEX_VERSION else None
+
+
+def load_meta(wave_path):
+    """
+    Index metadata; WaveformIndexPending when it must be (re)built
+    first (see request_index).
+    """
+    meta = read_meta(wave_path)
+    if meta is None:
+        raise WaveformIndexPending(f"Waveform index of {Path(wave_path).name} is not built yet")
+    return meta
+
+
+class _Track:
+    """
+    Memory-mapped change list of one signal.
+    """
+
+    def __init__(self, folder, n, width, real=False):
+        self.width = width
+        self.real = real
+        self.files = []
+        self.times = self._map(folder / f"{n}.t", "Q")
+        self.values = self._map(folder / f"{n}.v")
+        self.summary = self._map(folder / f"{n}.s")
+
+    def _map(self, path, fmt=None):
+        f = open(path, "rb")
+        self.files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"").cast(fmt) if fmt else b""
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.files.append(m)
+        return memoryview(m).cast(fmt) if fmt else m
+
+    def close(self):
+        if isinstance(self.times, memoryview):
+            self.times.release()
+        for f in reversed(self.files):
+            f.close()
+
+    def value(self, i):
+        w = self.width
+        return self.values[i * w:(i + 1) * w].decode("ascii").strip()
+
+    def minmax(self, a, b):
+        """
+        Smallest / largest value among changes a..b-1, using the block
+        summaries for whole blocks.
+        """
+        w = self.width
+        candidates = []
+
+        i = a
+        while i < b:
+            if i % BLOCK == 0 and i + BLOCK <= b:
+                k = i // BLOCK * 2 * w
+                candidates += (self.summary[k:k + w], self.summary[k + w:k + 2 * w])
+                i += BLOCK
+            else:
+                candidates.append(self.values[i * w:(i + 1) * w])
+                i += 1
+
+        lo, hi = _extremes(candidates, self.real)
+        return lo.decode("ascii").strip(), hi.decode("ascii").strip()
+
+
+def query(wave_path, signal_ids, start=None, end=None, width=1000):
+    """
+    Value changes of `signal_ids` between start and end (VCD time
+    units). With more changes than `width` pixel columns, a signal is
+    returned as [time, min, max] buckets instead of [time, value].
+    """
+    meta = load_meta(wave_path)
+    folder = index_dir(wave_path)
+
+    start = 0 if start is None else max(0, int(start))
+    end = meta["end_time"] if end is None else int(end)
+    width = max(1, min(int(width), settings.EDA_WAVEFORM_MAX_WIDTH))
+    span = max(end - start, 1)
+
+    by_id = {s["id"]: s for s in meta["signals"]}
+    result = {}
+
+    for sid in signal_ids:
+        sig = by_id.get(sid)
+        if sig is None:
+            continue
+
+        track = _Track(
+            folder,
+            sig["data"],
+            int(meta["widths"][str(sig["data"])]),
+            real=sig["data"] in meta["reals"],
+        )
+        try:
+            times = track.times
+            first = bisect_right(times, start)
+            last = bisect_right(times, end)
+
+            entry = {
+                "name": sig["name"],
+                "width": sig["width"],
+                # Value in force at `start`
+                "initial": track.value(first - 1) if first else None,
+            }
+
+            if last - first <= 2 * width:
+                entry["changes"] = [[times[i], track.value(i)] for i in range(first, last)]
+            else:
+                buckets = []
+                a = first
+                for col in range(width):
+                    t1 = start + span * (col + 1) // width
+                    b = bisect_right(times, t1, a, last)
+                    if b > a:
+                        buckets.append([times[a], *track.minmax(a, b)])
+                    a = b
+                entry["buckets"] = buckets
+
+            result[sid] = entry
+        finally:
+            track.close()
+
+    return {
+        "start": start,
+        "end": end,
+        "timescale": meta["timescale"],
+        "signals": result,
+    }
+
+
+# =====================================================
+# INDEX JOBS
+# =====================================================
+
+def request_index(run):
+    """
+    Queue a (re)build of the run's waveform index. Returns the job.
+    """
+    job, created = WaveformIndexJob.objects.get_or_create(run=run)
+
+    if not created and job.status == "failed":
+        # Report the failure once, then let the next request retry
+        WaveformIndexJob.objects.filter(id=job.id, status="failed").update(
+            status="queued",
+            worker_id="",
+            error="",
+            started_at=None,
+        )
+
+    return job
+
+
+def claim_next_index(worker_id):
+    """
+    Atomically move the oldest queued index job to "running".
+    """
+    for job_id in WaveformIndexJob.objects.filter(status="queued").order_by("created_at").values_list("id", flat=True)[:10]:
+        claimed = WaveformIndexJob.objects.filter(id=job_id, status="queued").update(
+            status="running",
+            worker_id=worker_id,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return WaveformIndexJob.objects.select_related("run").get(id=job_id)
+
+    return None
+
+
+def requeue_orphaned_index_jobs(*, worker_id=None, host=None):
+    qs = WaveformIndexJob.objects.filter(status="running")
+
+    if worker_id:
+        qs = qs.filter(worker_id=worker_id)
+    else:
+        qs = qs.filter(worker_id__startswith=f"{host}:")
+
+    return qs.update(status="queued", worker_id="", started_at=None)
+
+
+def run_index_job(job):
+    """
+    Build the index of one claimed job (unless another build already
+    brought it up to date).
+    """
+    wave = find_waveform(job.run.run_dir) if job.run.run_dir else None
+
+    try:
+        if wave is None:
+            raise WaveformIndexError("Run has no waveform")
+        if read_meta(wave) is None:
+            build_index(wave)
+    except (OSError, ValueError, WaveformIndexError) as e:
+        job.status = "failed"
+        job.error = str(e)
+        job.save(update_fields=["status", "error"])
+        return job
+
+    job.delete()
+    return job
@@ -3,16 +3,8 @@ import json
 import pya
 import traceback
 
-print("DEBUG: Starting KLayout")
 
-gds_path  = os.environ.get("KLAYOUT_GDS")
-png_path  = os.environ.get("KLAYOUT_PNG")
-meta_path = os.environ.get("KLAYOUT_META")
-
-if not gds_path:
-    raise RuntimeError("KLAYOUT_GDS not set")
-
-try:
+def extract(gds_path, png_path=None, meta_path=None, png_size=2000):
     # -------------------------
     # Load layout
     # -------------------------
@@ -30,23 +22,148 @@ try:
         view = pya.LayoutView()
         view.load_layout(gds_path, 0)
         view.max_hier()
-        view.save_image(png_path, 2000, 2000)
+        view.save_image(png_path, png_size, png_size)
 
     # -------------------------
-    # Write metadata
+    # Write metadata (+ cells.json next to it)
     # -------------------------
     if meta_path:
         meta = {
             "cells": layout.cells(),
             "layers": layout.layers(),
-            "top_cell": top.name
+            "top_cell": top.name,
+            "dbu": layout.dbu,
+            "bbox": box_list(top.dbbox()),
+            "layer_stats": layer_stats(layout, top),
         }
         with open(meta_path, "w", encoding="utf-8") as f:
             json.dump(meta, f, indent=2)
 
-    print("KLayout extraction completed successfully")
+        cells_path = os.path.join(os.path.dirname(meta_path), "cells.json")
+        with open(cells_path, "w", encoding="utf-8") as f:
+            json.dump(cell_stats(layout), f)
+
+
+def box_list(box):
+    return None if box.empty() else [box.left, box.bottom, box.right, box.top]
+
+
+def layer_stats(layout, top):
+    """
+    Flattened shape count and drawn area (um^2, overlaps counted
+    twice) per layer. Each cell's shapes are counted and measured once
+    (Shapes.size / Region.area, in C++) and weighted by how often the
+    cell is placed under the top cell, so arrays and repeated cells are
+    never expanded shape by shape.
+    """
+    layer_indexes = list(layout.layer_indexes())
+    shapes = dict.fromkeys(layer_indexes, 0)
+    area = dict.fromkeys(layer_indexes, 0.0)
+
+    # Per cell: flat placement count, and the sum of mag^2 over them
+    placements = {top.cell_index(): 1}
+    scale = {top.cell_index(): 1.0}
+    for ci in layout.each_cell_top_down():
+        if ci not in placements:
+            continue
+        for inst in layout.cell(ci).each_inst():
+            arr = inst.cell_inst
+            child = inst.cell_index
+            placements[child] = placements.get(child, 0) + placements[ci] * arr.size()
+            scale[child] = scale.get(child, 0.0) + scale[ci] * arr.size() * arr.cplx_trans.mag ** 2
+
+    for ci, count in placements.items():
+        cell = layout.cell(ci)
+        for li in layer_indexes:
+            local = cell.shapes(li)
+            if local.is_empty():
+                continue
+            shapes[li] += local.size() * count
+
+            region = pya.Region(local)
+            region.merged_semantics = False
+            area[li] += region.area() * scale[ci]
+
+    stats = []
+    for li in layer_indexes:
+        info = layout.get_info(li)
+        stats.append({
+            "layer": info.layer,
+            "datatype": info.datatype,
+            "name": info.name,
+            "shapes": shapes[li],
+            "area": area[li] * layout.dbu ** 2,
+            "bbox": box_list(top.dbbox_per_layer(li)),
+        })
+    return stats
+
+
+def cell_stats(layout):
+    """
+    Per cell: direct child instances, placements in parent cells,
+    local shapes (all layers) and bbox.
+    """
+    layer_indexes = list(layout.layer_indexes())
+
+    return [
+        {
+            "name": cell.name,
+            "instances": cell.child_instances(),
+            "placements": sum(1 for _ in cell.each_parent_inst()),
+            "shapes": sum(cell.shapes(li).size() for li in layer_indexes),
+            "bbox": box_list(cell.dbbox()),
+        }
+        for cell in layout.each_cell()
+    ]
+
+
+def load_view(gds_path):
+    view = pya.LayoutView()
+    view.load_layout(gds_path, 0)
+    view.max_hier()
+    return view
+
+
+def render_region(view, png_path, box, width, height):
+    """
+    Render only the [left, bottom, right, top] window (microns).
+    """
+    target = pya.DBox(*box)
+    view.save_image_with_options(png_path, width, height, 0, 0, 0, target, False)
+
+
+def render_tile(view, png_path, z, x, y, tile_size=256):
+    """
+    Deep-zoom tile (z, x, y): level z splits the square around the top
+    cell's bbox into 2^z x 2^z tiles, y = 0 at the top.
+    """
+    box = view.active_cellview().cell.dbbox()
+    side = max(box.width(), box.height()) or 1.0
+    step = side / (1 << z)
+
+    # Centre the layout inside the square pyramid extent
+    left = box.left - (side - box.width()) / 2 + x * step
+    top = box.top + (side - box.height()) / 2 - y * step
+
+    render_region(view, png_path, [left, top - step, left + step, top], tile_size, tile_size)
+
+
+# Imported by klayout_server.py → only define extract()
+if __name__ != "klayout_extract":
+    print("DEBUG: Starting KLayout")
+
+    gds_path  = os.environ.get("KLAYOUT_GDS")
+    png_path  = os.environ.get("KLAYOUT_PNG")
+    meta_path = os.environ.get("KLAYOUT_META")
+    png_size  = int(os.environ.get("KLAYOUT_PNG_SIZE", "2000"))
+
+    if not gds_path:
+        raise RuntimeError("KLAYOUT_GDS not set")
 
-except Exception as e:
-    print("ERROR:", str(e))
-    traceback.print_exc()
+    try:
+        extract(gds_path, png_path, meta_path, png_size)
+        print("KLayout extraction completed successfully")
 
+    except Exception as e:
+        print("ERROR:", str(e))
+        traceback.print_exc()
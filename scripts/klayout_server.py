@@ -0,0 +1,109 @@
+"""
+Long-lived KLayout batch worker.
+
+Run with:  klayout -b -rd max_views=1 -r scripts/klayout_server.py
+
+Reads one JSON job per line on stdin and answers with one line on
+stdout prefixed by "@@RESULT ". While a job runs, its prints go to the
+job's log file, so stdout only carries protocol lines.
+
+    {"op": "ping"}
+    {"op": "extract", "gds": ..., "png": ..., "meta": ..., "log": ..., "size": 2000}
+    {"op": "tile", "gds": ..., "png": ..., "z": 3, "x": 1, "y": 5, "size": 256}
+    {"op": "render", "gds": ..., "png": ..., "box": [l, b, r, t], "width": 512, "height": 512}
+    {"op": "drop"}
+
+Tile and region requests keep the last `max_views` layouts loaded, so
+panning around one design only reads its GDS once; "drop" unloads them.
+"""
+import os
+import sys
+import json
+import time
+import traceback
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from klayout_extract import extract, load_view, render_region, render_tile  # noqa: E402
+
+RESULT = "@@RESULT "
+
+# -rd max_views=N (klayout_pool passes EDA_KLAYOUT_TILE_VIEWS to tile workers)
+MAX_VIEWS = max(1, int(globals().get("max_views", 1)))
+views = {}  # gds path → LayoutView, oldest first
+
+
+def reply(**data):
+    sys.stdout.write(RESULT + json.dumps(data) + "\n")
+    sys.stdout.flush()
+
+
+def cached_view(gds):
+    view = views.pop(gds, None) or load_view(gds)
+    views[gds] = view
+    while len(views) > MAX_VIEWS:
+        views.pop(next(iter(views)))
+    return view
+
+
+def tile(job):
+    view = cached_view(job["gds"])
+    render_tile(view, job["png"], int(job["z"]), int(job["x"]), int(job["y"]), int(job.get("size", 256)))
+    return {"ok": True}
+
+
+def render(job):
+    view = cached_view(job["gds"])
+    render_region(view, job["png"], [float(v) for v in job["box"]], int(job["width"]), int(job["height"]))
+    return {"ok": True}
+
+
+def handle(job):
+    if job.get("op") == "ping":
+        return {"ok": True, "pid": os.getpid()}
+
+    if job.get("op") == "drop":
+        views.clear()
+        return {"ok": True}
+
+    if job.get("op") == "tile":
+        return tile(job)
+
+    if job.get("op") == "render":
+        return render(job)
+
+    if job.get("op") != "extract":
+        return {"ok": False, "error": f"unknown op {job.get('op')!r}"}
+
+    started = time.time()
+
+    with open(job["log"], "a", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        print("DEBUG: KLayout worker", os.getpid(), "extracting", job["gds"])
+        try:
+            extract(job["gds"], job.get("png"), job.get("meta"), int(job.get("size", 2000)))
+            print("KLayout extraction completed successfully")
+        except Exception as e:
+            print("ERROR:", str(e))
+            traceback.print_exc()
+            return {"ok": False, "error": str(e)}
+
+    return {"ok": True, "seconds": round(time.time() - started, 3)}
+
+
+reply(ok=True, ready=True, pid=os.getpid())
+
+for line in sys.stdin:
+    line = line.strip()
+    if not line:
+        continue
+
+    try:
+        job = json.loads(line)
+        if job.get("op") == "quit":
+            reply(ok=True)
+            break
+        reply(**handle(job))
+    except Exception as e:
+        reply(ok=False, error=str(e))